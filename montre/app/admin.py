@@ -16,7 +16,7 @@ from django.contrib.admin.widgets import FilteredSelectMultiple
 
 @admin.register(ProductImage)
 class ProductImageAdmin(admin.ModelAdmin):
-    list_display = ['product', 'image', 'created_at', 'updated_at']
+    list_display = ['product', 'image', 'is_featured', 'position', 'created_at', 'updated_at']
     list_filter = ['product', 'created_at']
     search_fields = ['product__name', 'product__slug']
     readonly_fields = ['created_at', 'updated_at']
@@ -292,7 +292,7 @@ class ContactedFilter(admin.SimpleListFilter):
 class ProductImageInline(admin.TabularInline):
     model = ProductImage
     extra = 1
-    fields = ['image', 'alt_text', 'is_featured', 'image_preview']
+    fields = ['image', 'alt_text', 'is_featured', 'position', 'image_preview']
     readonly_fields = ['image_preview']
     
     def image_preview(self, obj):
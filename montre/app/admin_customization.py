@@ -4,18 +4,20 @@ from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django.contrib import messages
 from django.utils.translation import ngettext
+from django.db import transaction
 from .models import (
     Product,
     Order, CustomerLead, ProductImage, Review, Comment,
     Category, SubCategory
 )
+from . import ratings
 
 
 
 class ProductImageInline(admin.TabularInline):
     model = ProductImage
     extra = 1
-    fields = ('image', 'alt_text', 'is_featured', 'image_preview')
+    fields = ('image', 'alt_text', 'is_featured', 'position', 'image_preview')
     readonly_fields = ('image_preview',)
 
     def image_preview(self, obj):
@@ -115,7 +117,11 @@ class ReviewAdmin(admin.ModelAdmin):
     rating_stars.admin_order_field = 'rating'
 
     def approve_reviews(self, request, queryset):
-        updated = queryset.update(is_approved=True)
+        # queryset.update ne déclenche pas les signaux : les résumés des avis sont resynchronisés
+        product_ids = set(queryset.values_list('product_id', flat=True))
+        with transaction.atomic():
+            updated = queryset.update(is_approved=True)
+            ratings.reviews_changed(product_ids)
         self.message_user(
             request, 
             ngettext(
@@ -128,7 +134,11 @@ class ReviewAdmin(admin.ModelAdmin):
     approve_reviews.short_description = "Approuver les avis sélectionnés"
     
     def disapprove_reviews(self, request, queryset):
-        updated = queryset.update(is_approved=False)
+        # queryset.update ne déclenche pas les signaux : les résumés des avis sont resynchronisés
+        product_ids = set(queryset.values_list('product_id', flat=True))
+        with transaction.atomic():
+            updated = queryset.update(is_approved=False)
+            ratings.reviews_changed(product_ids)
         self.message_user(
             request,
             ngettext(
@@ -0,0 +1,245 @@
+"""
+Panier des visiteurs anonymes.
+
+Un visiteur non connecté qui remplit son panier ne crée ni session ni ligne
+Cart en base (robots, simples visiteurs) : les articles sont conservés dans un
+cookie signé compact ("12:2|15:1" : produit:quantité). Les produits ne sont
+chargés qu'à l'affichage, en une seule requête in_bulk. Le panier n'est
+enregistré en base (Cart/CartItem) qu'à la connexion ou au passage en caisse
+(persist()).
+
+get_cart() retourne ce panier ou le panier Cart de l'utilisateur connecté ;
+les deux exposent la même interface (item_count, subtotal, lines, add_item,
+update_line, remove_line...). CartCookieMiddleware écrit le cookie modifié
+sur la réponse.
+
+get_cart_summary() fournit au contexte des gabarits (context_processors.py) le
+nombre d'articles et le sous-total : mémorisé pour la requête et, pour un
+utilisateur connecté, lu dans les totaux enregistrés du panier puis mis en
+cache (invalidé par Cart.invalidate_summary() à chaque modification).
+get_cart_count() donne le nombre seul, sans charger les produits d'un panier
+de cookie.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Product
+from .models_cart import Cart
+
+COOKIE_SALT = 'app.cart'
+
+
+def get_cart(request):
+    """
+    Panier de la requête : celui de l'utilisateur connecté, un panier de session
+    déjà enregistré, sinon le panier du cookie (aucune écriture en base).
+    """
+    if request.user.is_authenticated:
+        cart, created = Cart.objects.get_or_create(user=request.user)
+        return cart
+    session_key = request.session.session_key
+    if session_key:
+        cart = Cart.objects.filter(session_key=session_key, user=None).first()
+        if cart is not None:
+            return cart
+    return get_cookie_cart(request)
+
+
+def get_cart_summary(request):
+    """(nombre d'articles, sous-total) du panier de la requête, calculé une seule fois par requête"""
+    if not hasattr(request, '_cart_summary'):
+        request._cart_summary = _cart_summary(request)
+    return request._cart_summary
+
+
+def get_cart_count(request):
+    """Nombre d'articles du panier ; pour un visiteur, lu dans le cookie sans charger les produits"""
+    if request.user.is_authenticated:
+        return get_cart_summary(request)[0]
+    return get_cart(request).item_count
+
+
+def _cart_summary(request):
+    if request.user.is_authenticated:
+        key = Cart.SUMMARY_CACHE_KEY % request.user.pk
+        summary = cache.get(key)
+        if summary is None:
+            # Pas de get_or_create : afficher le compteur ne crée pas de panier
+            summary = Cart.objects.filter(user=request.user).values_list('item_count', 'subtotal').first()
+            summary = summary or (0, Decimal('0.00'))
+            cache.set(key, summary, settings.CART_SUMMARY_CACHE_TIMEOUT)
+        return summary
+    cart = get_cart(request)
+    return cart.item_count, cart.subtotal
+
+
+def get_cookie_cart(request):
+    """Panier du cookie de la requête (lu une seule fois par requête)"""
+    if not hasattr(request, '_cookie_cart'):
+        request._cookie_cart = CookieCart(request)
+    return request._cookie_cart
+
+
+def persist_cart(request, user=None):
+    """
+    Enregistre en base le panier du cookie (connexion, caisse) et retourne le
+    panier Cart correspondant. Sans article dans le cookie, retourne get_cart().
+    """
+    cookie_cart = get_cookie_cart(request)
+    if not cookie_cart.quantities:
+        return get_cart(request)
+    return cookie_cart.persist(user or (request.user if request.user.is_authenticated else None))
+
+
+class CartLine:
+    """Article du panier du cookie (mêmes attributs que CartItem pour les gabarits)"""
+
+    def __init__(self, product, quantity):
+        self.id = product.pk
+        self.product = product
+        self.quantity = quantity
+        self.price = product.price
+
+    @property
+    def total_price(self):
+        return self.price * self.quantity
+
+    @property
+    def has_stock(self):
+        if not self.product.track_inventory:
+            return True
+        return self.quantity <= self.product.in_stock
+
+
+class CookieCart:
+    """Panier d'un visiteur anonyme conservé dans un cookie signé"""
+
+    def __init__(self, request):
+        self.request = request
+        self.modified = False
+        self._lines = None
+        try:
+            value = request.get_signed_cookie(
+                settings.CART_COOKIE_NAME, default='', salt=COOKIE_SALT, max_age=settings.CART_COOKIE_AGE
+            )
+        except Exception:
+            value = ''
+        self.quantities = self.decode(value)
+
+    @staticmethod
+    def decode(value):
+        """"12:2|15:1" -> {12: 2, 15: 1} (les entrées invalides sont ignorées)"""
+        quantities = {}
+        for entry in value.split('|') if value else []:
+            product_id, _, quantity = entry.partition(':')
+            if product_id.isdigit() and quantity.isdigit() and int(quantity) > 0:
+                quantities[int(product_id)] = int(quantity)
+        return quantities
+
+    def encode(self):
+        return '|'.join(f'{product_id}:{quantity}' for product_id, quantity in self.quantities.items())
+
+    def write(self, response):
+        """Écrit (ou supprime, si vide) le cookie du panier sur la réponse"""
+        if self.quantities:
+            response.set_signed_cookie(
+                settings.CART_COOKIE_NAME, self.encode(), salt=COOKIE_SALT,
+                max_age=settings.CART_COOKIE_AGE, secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True, samesite='Lax',
+            )
+        else:
+            response.delete_cookie(settings.CART_COOKIE_NAME, samesite='Lax')
+
+    def _changed(self):
+        self.modified = True
+        self._lines = None
+
+    @property
+    def lines(self):
+        """Articles avec leurs produits, chargés en une seule requête"""
+        if self._lines is None:
+            products = Product.objects.filter(is_active=True).select_related('primary_image').in_bulk(list(self.quantities))
+            self._lines = [
+                CartLine(products[product_id], quantity)
+                for product_id, quantity in self.quantities.items()
+                if product_id in products
+            ]
+            if len(self._lines) != len(self.quantities):
+                # Produits supprimés ou désactivés depuis l'ajout : retirés du cookie
+                self.quantities = {line.id: line.quantity for line in self._lines}
+                self.modified = True
+        return self._lines
+
+    @property
+    def item_count(self):
+        return sum(self.quantities.values())
+
+    total_items = item_count
+
+    @property
+    def subtotal(self):
+        return sum((line.total_price for line in self.lines), Decimal('0'))
+
+    @property
+    def shipping_cost(self):
+        return 0
+
+    @property
+    def total(self):
+        return self.subtotal + self.shipping_cost
+
+    def add_item(self, product, quantity=1, update_quantity=False):
+        """Ajoute un produit au panier ou met à jour sa quantité (bornée au stock)"""
+        if update_quantity:
+            new_quantity = quantity
+        else:
+            new_quantity = self.quantities.get(product.pk, 0) + quantity
+        if product.track_inventory:
+            new_quantity = min(new_quantity, product.in_stock)
+        if new_quantity <= 0:
+            self.quantities.pop(product.pk, None)
+        elif product.pk in self.quantities or len(self.quantities) < settings.CART_COOKIE_MAX_LINES:
+            self.quantities[product.pk] = new_quantity
+        self._changed()
+        return CartLine(product, new_quantity)
+
+    def get_line(self, line_id):
+        return next((line for line in self.lines if line.id == line_id), None)
+
+    def update_line(self, line_id, quantity):
+        """Modifie la quantité d'un article ; retourne l'article ou None"""
+        line = self.get_line(line_id)
+        if line is not None:
+            line = self.add_item(line.product, quantity, update_quantity=True)
+        return line
+
+    def remove_line(self, line_id):
+        """Retire un article ; retourne l'article retiré ou None"""
+        line = self.get_line(line_id)
+        if line is not None:
+            self.remove_item(line.product)
+        return line
+
+    def remove_item(self, product):
+        if self.quantities.pop(product.pk, None) is not None:
+            self._changed()
+
+    def clear(self):
+        self.quantities = {}
+        self._changed()
+
+    def persist(self, user=None):
+        """Enregistre les articles dans le panier Cart de l'utilisateur (ou un panier de session) puis vide le cookie"""
+        with transaction.atomic():
+            if user is not None:
+                cart, created = Cart.objects.get_or_create(user=user)
+            else:
+                if not self.request.session.session_key:
+                    self.request.session.create()
+                cart, created = Cart.objects.get_or_create(session_key=self.request.session.session_key, user=None)
+            cart.add_quantities(self.quantities)
+        self.clear()
+        return cart
@@ -0,0 +1,92 @@
+"""
+Version globale du catalogue.
+
+Les données mises en cache à partir du catalogue (facettes, fragments HTML...)
+incluent ce numéro dans leur clé : l'incrémenter suffit à les invalider toutes.
+
+Chaque produit a également sa propre version, incrémentée lorsque le produit,
+ses images, ses avis ou leurs commentaires changent (fiche rapide voir_product).
+
+Les incréments n'ont lieu qu'après la validation de la transaction en cours
+(transaction.on_commit) : sinon une requête concurrente pourrait construire
+un fragment à partir des données d'avant la modification et l'enregistrer
+sous la nouvelle version, sans plus jamais être invalidé.
+
+Les compteurs sont conservés dans le cache « counters » (settings.CACHES),
+distinct du cache des fragments : la purge de ce dernier lorsqu'il est plein
+ne les supprime pas. Limite : sans Redis, incr() y est une lecture suivie
+d'une écriture, non atomique. Deux incréments simultanés peuvent n'en compter
+qu'un ; un fragment construit entre les deux garderait alors les données de
+la première modification seulement.
+"""
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.connection import ConnectionProxy
+
+CATALOG_VERSION_KEY = 'catalog_version'
+CATALOG_MODIFIED_KEY = 'catalog_modified'
+PRODUCT_VERSION_KEY = 'product_version:%s'
+
+# Cache dédié aux compteurs, jamais purgé avec les fragments (voir settings.CACHES)
+cache = ConnectionProxy(caches, 'counters')
+
+
+def get_catalog_version():
+    """Retourne la version courante du catalogue"""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Partir de l'horodatage évite de réutiliser une ancienne version après un vidage du cache
+        cache.add(CATALOG_VERSION_KEY, int(time.time()), None)
+        version = cache.get(CATALOG_VERSION_KEY, int(time.time()))
+    return version
+
+
+def get_catalog_modified():
+    """Retourne l'horodatage (en secondes) de la dernière modification du catalogue"""
+    modified = cache.get(CATALOG_MODIFIED_KEY)
+    if modified is None:
+        cache.add(CATALOG_MODIFIED_KEY, int(time.time()), None)
+        modified = cache.get(CATALOG_MODIFIED_KEY, int(time.time()))
+    return modified
+
+
+def bump_catalog_version():
+    """Invalide toutes les données mises en cache à partir du catalogue (après validation)"""
+    transaction.on_commit(_bump_catalog_version)
+
+
+def _bump_catalog_version():
+    cache.set(CATALOG_MODIFIED_KEY, int(time.time()), None)
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        version = int(time.time())
+        cache.set(CATALOG_VERSION_KEY, version, None)
+        return version
+
+
+def get_product_version(product_id):
+    """Retourne la version courante d'un produit"""
+    key = PRODUCT_VERSION_KEY % product_id
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time()), None)
+        version = cache.get(key, int(time.time()))
+    return version
+
+
+def bump_product_version(product_id):
+    """Invalide les données mises en cache pour un produit (après validation)"""
+    transaction.on_commit(lambda: _bump_product_version(product_id))
+
+
+def _bump_product_version(product_id):
+    key = PRODUCT_VERSION_KEY % product_id
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = int(time.time())
+        cache.set(key, version, None)
+        return version
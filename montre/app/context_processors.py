@@ -1,41 +1,28 @@
+from django.utils.functional import SimpleLazyObject, new_method_proxy
+
+
+class LazyValue(SimpleLazyObject):
+    """Valeur calculée au premier usage, y compris par la mise en forme des nombres"""
+    __format__ = new_method_proxy(format)
+
+
 def cart_context(request):
-    """Ajoute le contenu du panier au contexte global."""
-    cart = {}
-    cart_count = 0
-    cart_total = 0
-    
-    if hasattr(request, 'user') and request.user.is_authenticated:
-        # Si l'utilisateur est connecté, récupérez le panier depuis la base de données
-        from .models import Order, CustomerLead
-        
-        try:
-            # Récupérer le lead associé à l'utilisateur
-            lead = CustomerLead.objects.get(email=request.user.email)
-            
-            # Récupérer les éléments du panier pour ce lead
-            cart_items = Order.objects.filter(
-                lead=lead,
-                status='in_cart'
-            )
-            
-            cart_count = cart_items.count()
-            cart_total = sum(item.total_price for item in cart_items if item.total_price is not None)
-            
-            cart = {
-                'items': cart_items,
-                'count': cart_count,
-                'total': cart_total
-            }
-        except CustomerLead.DoesNotExist:
-            # Si aucun lead n'est trouvé pour cet utilisateur, le panier reste vide
-            pass
-    
+    """
+    Ajoute le panier au contexte global. Rien n'est calculé tant qu'un gabarit
+    n'utilise pas cart, cart_count ou cart_total (voir cart.get_cart_summary).
+    """
+    if not hasattr(request, 'user'):
+        return {'cart': None, 'cart_count': 0, 'cart_total': 0}
+
+    from .cart import get_cart, get_cart_count, get_cart_summary
+
     return {
-        'cart': cart,
-        'cart_count': cart_count,
-        'cart_total': cart_total
+        'cart': SimpleLazyObject(lambda: get_cart(request)),
+        'cart_count': LazyValue(lambda: get_cart_count(request)),
+        'cart_total': LazyValue(lambda: get_cart_summary(request)[1]),
     }
-    
+
+
 # from django.conf import settings
 
 # def site_urls(request):
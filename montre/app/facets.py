@@ -0,0 +1,140 @@
+"""
+Facettes de la boutique : nombre de produits par tranche de prix, par statut
+et par catégorie/sous-catégorie pour les filtres courants.
+
+Les compteurs sont calculés en une seule requête (une ligne compacte par
+produit) puis en un seul passage en Python, et mis en cache par combinaison
+de filtres normalisée et par version du catalogue.
+"""
+import hashlib
+import json
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from .catalog import get_catalog_version
+from .models import Product
+from . import search
+
+# Tranches de prix (clé, libellé, borne basse incluse, borne haute exclue)
+PRICE_BUCKETS = [
+    ('0-50000', 'Moins de 50 000 FCFA', None, Decimal('50000')),
+    ('50000-100000', '50 000 - 100 000 FCFA', Decimal('50000'), Decimal('100000')),
+    ('100000-200000', '100 000 - 200 000 FCFA', Decimal('100000'), Decimal('200000')),
+    ('200000-500000', '200 000 - 500 000 FCFA', Decimal('200000'), Decimal('500000')),
+    ('500000-', 'Plus de 500 000 FCFA', Decimal('500000'), None),
+]
+PRICE_LABELS = {key: label for key, label, low, high in PRICE_BUCKETS}
+
+# Statuts filtrables (clé, libellé, champ booléen du produit)
+STATUSES = [
+    ('new', 'Nouveautés', 'is_new'),
+    ('bestseller', 'Meilleures ventes', 'is_bestseller'),
+    ('featured', 'En vedette', 'is_featured'),
+]
+STATUS_LABELS = {key: label for key, label, field in STATUSES}
+STATUS_FIELDS = {key: field for key, label, field in STATUSES}
+
+FACETS_TIMEOUT = 60 * 60
+
+
+def price_filter(key):
+    """Retourne le filtre correspondant à une tranche de prix (ou None si inconnue)"""
+    for bucket_key, label, low, high in PRICE_BUCKETS:
+        if bucket_key == key:
+            q = Q()
+            if low is not None:
+                q &= Q(price__gte=low)
+            if high is not None:
+                q &= Q(price__lt=high)
+            return q
+    return None
+
+
+def price_bucket(price):
+    """Retourne la clé de la tranche contenant un prix"""
+    for key, label, low, high in PRICE_BUCKETS:
+        if (low is None or price >= low) and (high is None or price < high):
+            return key
+    return None
+
+
+def normalize_filters(query='', status='', price='', category_id=None, subcategory_id=None):
+    """Normalise les filtres pour qu'une même sélection donne toujours la même clé"""
+    return {
+        'q': ' '.join(search.tokenize((query or '').lower())),
+        'status': status if status in STATUS_FIELDS else '',
+        'price': price if price in PRICE_LABELS else '',
+        'category': category_id,
+        'subcategory': subcategory_id,
+    }
+
+
+def compute_facets(filters):
+    """
+    Calcule les facettes pour des filtres normalisés.
+    Chaque dimension est comptée avec les filtres des autres dimensions, de sorte
+    que la sidebar indique ce que donnerait la sélection d'une autre valeur.
+    """
+    queryset = Product.objects.filter(is_active=True)
+    if filters['q']:
+        queryset = search.filter_queryset(queryset, filters['q'])
+    rows = queryset.order_by().values_list(
+        'price', 'is_new', 'is_bestseller', 'is_featured', 'category_id', 'subcategory_id'
+    )
+
+    status_index = {'new': 1, 'bestseller': 2, 'featured': 3}.get(filters['status'])
+    price_counts = {key: 0 for key, label, low, high in PRICE_BUCKETS}
+    status_counts = {key: 0 for key, label, field in STATUSES}
+    category_counts = {}
+    subcategory_counts = {}
+    total = 0
+
+    for row in rows:
+        bucket = price_bucket(row[0])
+        in_status = status_index is None or row[status_index]
+        in_price = not filters['price'] or bucket == filters['price']
+        in_category = filters['category'] is None or row[4] == filters['category']
+        in_subcategory = filters['subcategory'] is None or row[5] == filters['subcategory']
+
+        if in_status and in_price:
+            if in_subcategory and row[4] is not None:
+                key = str(row[4])
+                category_counts[key] = category_counts.get(key, 0) + 1
+            if in_category and row[5] is not None:
+                key = str(row[5])
+                subcategory_counts[key] = subcategory_counts.get(key, 0) + 1
+        if not (in_category and in_subcategory):
+            continue
+        if in_status and bucket is not None:
+            price_counts[bucket] += 1
+        if in_price:
+            for index, (key, label, field) in enumerate(STATUSES, start=1):
+                if row[index]:
+                    status_counts[key] += 1
+        if in_status and in_price:
+            total += 1
+
+    return {
+        'total': total,
+        'price': [
+            {'key': key, 'label': label, 'count': price_counts[key]}
+            for key, label, low, high in PRICE_BUCKETS
+        ],
+        'status': status_counts,
+        'categories': category_counts,
+        'subcategories': subcategory_counts,
+    }
+
+
+def get_facets(**filters):
+    """Retourne les facettes pour les filtres donnés, depuis le cache si possible"""
+    filters = normalize_filters(**filters)
+    digest = hashlib.md5(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+    key = f'facets:{get_catalog_version()}:{digest}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(filters)
+        cache.set(key, facets, FACETS_TIMEOUT)
+    return facets
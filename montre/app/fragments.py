@@ -0,0 +1,83 @@
+"""
+Cache de fragments HTML versionné.
+
+Un fragment est identifié par un nom, des paramètres normalisés et la version
+du catalogue (voir catalog.py) : l'incrémentation de la version invalide tous
+les fragments. Le HTML est stocké compressé (gzip) et servi avec un ETag
+dérivé de la clé, ce qui permet de répondre 304 sans rendu ni accès au cache
+lorsque le client possède déjà la bonne version. La date de dernière
+modification du catalogue est également envoyée (Last-Modified), sauf pour
+les fragments versionnés aussi par produit : cette date ne suit pas leurs
+modifications, seul l'ETag sert alors à la revalidation.
+"""
+import gzip
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .catalog import get_catalog_modified, get_catalog_version
+
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+
+def fragment_key(name, params, version=None):
+    """Clé de cache (et ETag) d'un fragment pour une version du catalogue"""
+    if version is None:
+        version = get_catalog_version()
+    digest = hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    return f'fragment:{name}:{version}:{digest}'
+
+
+def etag_for(key):
+    return '"%s"' % hashlib.md5(key.encode()).hexdigest()
+
+
+def accepts_gzip(request):
+    return 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+
+
+def cached_fragment(request, name, params, render, vary=(), send_last_modified=True):
+    """
+    Retourne la réponse d'un fragment, en ne le rendant qu'en cas d'absence du cache.
+    `render` est appelé sans argument et doit retourner une HttpResponse ; ses
+    en-têtes X-* sont conservés avec le fragment. `send_last_modified=False`
+    pour un fragment dont les paramètres portent une version propre (ex. produit).
+    """
+    key = fragment_key(name, params)
+    etag = etag_for(key)
+    last_modified = get_catalog_modified() if send_last_modified else None
+
+    # 304 si If-None-Match (ou à défaut If-Modified-Since) correspond
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        cached = cache.get(key)
+        if cached is None:
+            rendered = render()
+            if rendered.status_code != 200:
+                return rendered
+            cached = {
+                'content': gzip.compress(rendered.content),
+                'content_type': rendered['Content-Type'],
+                'headers': {k: v for k, v in rendered.items() if k.startswith('X-')},
+            }
+            cache.set(key, cached, FRAGMENT_TIMEOUT)
+
+        if accepts_gzip(request):
+            response = HttpResponse(cached['content'], content_type=cached['content_type'])
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(gzip.decompress(cached['content']), content_type=cached['content_type'])
+        for header, value in cached['headers'].items():
+            response[header] = value
+
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Le navigateur revalide à chaque fois : un 304 ne coûte qu'une comparaison d'ETag
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ('Accept-Encoding',) + tuple(vary))
+    return response
@@ -115,9 +115,9 @@ class GoogleSheetsService:
             # Récupérer l'image du produit
             image_url = None
             if hasattr(order, 'product') and order.product:
-                if hasattr(order.product, 'images') and order.product.images.exists():
-                    image_file = order.product.images.first().image
-                    image_url = f"{settings.SITE_URL.rstrip('/')}{image_file.url}"
+                if getattr(order.product, 'primary_image', None):
+                    # Déclinaison JPEG plutôt que l'original (poids, métadonnées EXIF)
+                    image_url = f"{settings.SITE_URL.rstrip('/')}{order.product.primary_image.derivative_url(640)}"
                 elif hasattr(order.product, 'image') and order.product.image:
                     image_file = order.product.image
                     image_url = f"{settings.SITE_URL.rstrip('/')}{image_file.url}"
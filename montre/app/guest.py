@@ -0,0 +1,70 @@
+"""
+Reprise des données d'un visiteur dans son compte à la connexion.
+
+Un visiteur non connecté peut avoir un panier (cookie, voir cart.py, ou ancien
+panier de session), des favoris (session['favorites'], voir toggle_favorite)
+et des commandes récentes (session['recent_orders'], voir
+RecentOrdersMiddleware). À la connexion, tout est rattaché au compte en une
+seule transaction et en requêtes groupées : une insertion avec mise à jour en
+cas de conflit pour les articles du panier, une insertion ignorant les doublons
+pour les favoris, une mise à jour pour les commandes.
+
+login() change la clé de session (cycle_key) avant d'émettre user_logged_in :
+le panier de session est donc recherché avec la clé d'avant la connexion,
+celle du cookie de session envoyé avec la requête.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .cart import get_cookie_cart
+from .models import CustomerLead, Order, Product
+from .models_cart import Cart
+from .models_favorite import Favorite
+
+
+def migrate_guest_session(request, user):
+    """Rattache au compte `user` le panier, les favoris et les commandes du visiteur"""
+    cookie_cart = get_cookie_cart(request)
+    session = request.session
+    favorite_ids = [int(pk) for pk in session.get('favorites', []) if str(pk).isdigit()]
+    order_ids = [pk for pk in session.get('recent_orders', []) if isinstance(pk, int)]
+    session_cart = None
+    guest_session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if guest_session_key:
+        session_cart = Cart.objects.filter(session_key=guest_session_key, user=None).first()
+    if not (cookie_cart.quantities or session_cart or favorite_ids or order_ids):
+        return
+
+    with transaction.atomic():
+        if cookie_cart.quantities or session_cart:
+            quantities = dict(cookie_cart.quantities)
+            if session_cart:
+                for product_id, quantity in session_cart.items.values_list('product_id', 'quantity'):
+                    quantities[product_id] = quantities.get(product_id, 0) + quantity
+                session_cart.delete()
+            cart, created = Cart.objects.get_or_create(user=user)
+            cart.add_quantities(quantities)
+
+        if favorite_ids:
+            # Produits encore existants seulement (la contrainte de clé étrangère échouerait sinon)
+            product_ids = Product.objects.filter(pk__in=favorite_ids).values_list('pk', flat=True)
+            Favorite.objects.bulk_create(
+                [Favorite(user=user, product_id=product_id) for product_id in product_ids],
+                ignore_conflicts=True,
+            )
+
+        if order_ids and user.email:
+            lead, created = CustomerLead.objects.get_or_create(
+                email=user.email,
+                defaults={'first_name': user.first_name, 'last_name': user.last_name},
+            )
+            # Seules les commandes passées sans compte sont rattachées
+            if Order.objects.filter(pk__in=order_ids, lead__isnull=True).update(lead=lead):
+                lead.update_customer_stats()
+
+    # Les données sont désormais portées par le compte
+    if cookie_cart.quantities:
+        cookie_cart.clear()
+    session.pop('favorites', None)
+    if user.email:
+        session.pop('recent_orders', None)
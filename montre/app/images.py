@@ -0,0 +1,294 @@
+"""
+Déclinaisons des images produits.
+
+À l'enregistrement d'une ProductImage, l'original est décliné en plusieurs
+largeurs, en WebP et en JPEG, orientation EXIF appliquée et métadonnées
+supprimées. Le traitement (Pillow) s'exécute dans un pool de processus pour
+ne pas bloquer la requête ; les chemins produits sont enregistrés dans
+ProductImage.derivatives :
+
+    {
+        'source': 'products/montre.jpg',
+        'webp': [[320, 'derivatives/products/montre/320.webp'], ...],
+        'jpeg': [[320, 'derivatives/products/montre/320.jpg'], ...],
+    }
+
+Les déclinaisons de la bibliothèque existante sont générées par la commande
+build_image_derivatives.
+
+Dès l'envoi, les images (ProductImage, Category.image, VideoBanner.thumbnail)
+reçoivent aussi leurs dimensions, leur couleur dominante et un aperçu flou en
+data URI : la page réserve la bonne place et affiche l'aperçu sans requête
+supplémentaire (backfill : commande build_image_placeholders). Le rendu utilise la balise {% picture %} de
+templatetags/responsive_images.py.
+"""
+import atexit
+import base64
+import io
+import logging
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# Largeurs générées (px) ; l'original n'est jamais agrandi
+WIDTHS = (320, 640, 960, 1280)
+
+# Format -> (extension, format Pillow, options d'enregistrement)
+FORMATS = {
+    'webp': ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+DERIVATIVES_DIR = 'derivatives'
+
+_executor = None
+
+
+def derivative_dir(name):
+    """Dossier (relatif à MEDIA_ROOT) des déclinaisons d'une image"""
+    stem, _ = os.path.splitext(name)
+    return os.path.join(DERIVATIVES_DIR, stem)
+
+
+def target_widths(width):
+    """Largeurs à générer pour une image de largeur `width`"""
+    widths = [w for w in WIDTHS if w < width]
+    if len(widths) < len(WIDTHS):
+        # L'original, plus étroit que la plus grande déclinaison, sert de dernière largeur
+        widths.append(width)
+    return widths
+
+
+def render_derivatives(name, media_root):
+    """
+    Génère les déclinaisons de l'image `name` (relative à `media_root`).
+    Exécutée dans un processus du pool : n'utilise ni l'ORM ni les réglages Django.
+    """
+    from PIL import Image, ImageOps
+
+    source = os.path.join(media_root, name)
+    directory = derivative_dir(name)
+    os.makedirs(os.path.join(media_root, directory), exist_ok=True)
+
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        if image.mode == 'RGBA':
+            # JPEG ne gère pas la transparence : fond blanc
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+
+        result = {'source': name}
+        for width in target_widths(image.width):
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            for key, (extension, pil_format, options) in FORMATS.items():
+                path = os.path.join(directory, f'{width}.{extension}')
+                # Sans paramètre exif/icc_profile, Pillow n'écrit aucune métadonnée
+                resized.save(os.path.join(media_root, path), pil_format, **options)
+                result.setdefault(key, []).append([width, path.replace(os.sep, '/')])
+    return result
+
+
+def delete_derivatives(name):
+    """Supprime les déclinaisons d'une image"""
+    if name:
+        shutil.rmtree(os.path.join(settings.MEDIA_ROOT, derivative_dir(name)), ignore_errors=True)
+
+
+def release_derivatives(name):
+    """
+    Supprime les déclinaisons d'un fichier qu'aucune image ne référence plus
+    (un même fichier peut être partagé, voir storage.ContentAddressedStorage).
+    """
+    from .models import ProductImage
+
+    if name and not ProductImage.objects.filter(image=name).exists():
+        delete_derivatives(name)
+
+
+def get_executor():
+    """Pool de processus partagé, créé à la première utilisation"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2))
+        atexit.register(_executor.shutdown, wait=False)
+    return _executor
+
+
+def save_derivatives(image_id, derivatives):
+    """Enregistre les déclinaisons d'une image et invalide les caches du produit"""
+    from .catalog import bump_catalog_version, bump_product_version
+    from .models import ProductImage
+    from .models_card import ProductCard
+
+    # Si l'image a été remplacée entre-temps, ce résultat est périmé
+    updated = ProductImage.objects.filter(pk=image_id, image=derivatives['source']).update(derivatives=derivatives)
+    if not updated:
+        return False
+    product_id = ProductImage.objects.filter(pk=image_id).values_list('product_id', flat=True).first()
+    ProductCard.refresh(product_id, create=False)
+    bump_catalog_version()
+    bump_product_version(product_id)
+    return True
+
+
+def build_derivatives(image):
+    """Génère et enregistre immédiatement les déclinaisons d'une ProductImage"""
+    derivatives = render_derivatives(image.image.name, settings.MEDIA_ROOT)
+    save_derivatives(image.pk, derivatives)
+    image.derivatives = derivatives
+    return derivatives
+
+
+def _on_done(image_id, future):
+    """Rappel du pool (thread du processus web) : enregistre le résultat"""
+    close_old_connections()
+    try:
+        save_derivatives(image_id, future.result())
+    except Exception as e:
+        logger.error(f"Déclinaisons de l'image {image_id} impossibles : {str(e)}")
+    finally:
+        connection.close()
+
+
+def schedule(image):
+    """
+    Planifie la génération des déclinaisons d'une ProductImage après la validation
+    de la transaction (en arrière-plan, sauf si IMAGE_DERIVATIVES_ASYNC est False).
+    """
+    from .models import ProductImage
+
+    image_id, name = image.pk, image.image.name
+    if not name:
+        return
+
+    # Fichier déjà utilisé par une autre image (contenu identique) : ses déclinaisons servent telles quelles
+    shared = (
+        ProductImage.objects.filter(image=name, derivatives__source=name)
+        .exclude(pk=image_id).values_list('derivatives', flat=True).first()
+    )
+    if shared:
+        transaction.on_commit(lambda: save_derivatives(image_id, shared))
+        return
+
+    def submit():
+        if not getattr(settings, 'IMAGE_DERIVATIVES_ASYNC', True):
+            try:
+                save_derivatives(image_id, render_derivatives(name, settings.MEDIA_ROOT))
+            except Exception as e:
+                logger.error(f"Déclinaisons de l'image {image_id} impossibles : {str(e)}")
+            return
+        future = get_executor().submit(render_derivatives, name, settings.MEDIA_ROOT)
+        future.add_done_callback(lambda f: _on_done(image_id, f))
+
+    transaction.on_commit(submit)
+
+
+def derivative_url(derivatives, width, fmt='jpeg'):
+    """
+    URL de la plus petite déclinaison au moins aussi large que `width`
+    (ou de la plus grande disponible) ; None si l'image n'a pas de déclinaison.
+    """
+    candidates = (derivatives or {}).get(fmt)
+    if not candidates:
+        return None
+    path = next((p for w, p in candidates if w >= width), candidates[-1][1])
+    return settings.MEDIA_URL + path
+
+
+def srcset(derivatives, fmt='jpeg'):
+    """Attribut srcset d'un format ("url 320w, url 640w, ...")"""
+    return ', '.join(f'{settings.MEDIA_URL}{path} {width}w' for width, path in (derivatives or {}).get(fmt, []))
+
+
+# Aperçu flou : vignette de quelques pixels encodée en data URI, agrandie par le navigateur
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 40
+
+
+def image_metadata(field_file):
+    """
+    Dimensions (orientation EXIF appliquée), couleur dominante et aperçu flou
+    (data URI base64) d'un fichier image, envoyé ou déjà enregistré.
+    Retourne None si le fichier est absent ou illisible.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    if not field_file:
+        return None
+    source = None
+    try:
+        if field_file._committed:
+            field_file.open('rb')
+        source = field_file.file
+        source.seek(0)
+        with Image.open(source) as original:
+            width, height = original.size
+            if original.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+                width, height = height, width
+            # Décodage JPEG directement à taille réduite : inutile de charger l'image entière
+            original.draft('RGB', (PLACEHOLDER_SIZE * 8, PLACEHOLDER_SIZE * 8))
+            if original.mode in ('RGBA', 'LA', 'PA') or 'transparency' in original.info:
+                image = ImageOps.exif_transpose(original).convert('RGBA')
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            else:
+                image = ImageOps.exif_transpose(original).convert('RGB')
+    except (OSError, ValueError, UnidentifiedImageError) as e:
+        logger.warning(f"Métadonnées de l'image {field_file.name} illisibles : {str(e)}")
+        return None
+    finally:
+        if field_file._committed:
+            field_file.close()
+        elif source is not None:
+            # Le fichier envoyé sera ensuite lu par le stockage depuis le début
+            source.seek(0)
+
+    # Couleur dominante : couleur la plus fréquente d'une palette réduite
+    palette = image.resize((64, 64)).quantize(colors=5)
+    _, index = max(palette.getcolors())
+    red, green, blue = palette.getpalette()[index * 3:index * 3 + 3]
+
+    image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    buffer = io.BytesIO()
+    image.save(buffer, 'WEBP', quality=PLACEHOLDER_QUALITY)
+
+    return {
+        'width': width,
+        'height': height,
+        'dominant_color': f'#{red:02x}{green:02x}{blue:02x}',
+        'placeholder': 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii'),
+    }
+
+
+def update_image_metadata(instance, field_name, prefix=''):
+    """
+    Renseigne les champs <prefix>width/height/dominant_color/placeholder d'une
+    instance à partir de son champ image `field_name`, lorsque le fichier vient
+    d'être envoyé ou que les métadonnées manquent. Retourne True si modifiés.
+    """
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        changed = getattr(instance, f'{prefix}width') is not None
+        for key in ('width', 'height'):
+            setattr(instance, f'{prefix}{key}', None)
+        for key in ('dominant_color', 'placeholder'):
+            setattr(instance, f'{prefix}{key}', '')
+        return changed
+    if field_file._committed and getattr(instance, f'{prefix}width') is not None:
+        return False
+    metadata = image_metadata(field_file)
+    if metadata is None:
+        return False
+    for key, value in metadata.items():
+        setattr(instance, f'{prefix}{key}', value)
+    return True
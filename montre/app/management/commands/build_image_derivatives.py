@@ -0,0 +1,62 @@
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app import images
+from app.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = "Génère les déclinaisons WebP/JPEG des images produits existantes (en parallèle)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 2,
+            help="Nombre de processus de traitement"
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Régénère aussi les images qui ont déjà leurs déclinaisons"
+        )
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        pending = [
+            (pk, name)
+            for pk, name, derivatives in ProductImage.objects.exclude(image='').values_list('id', 'image', 'derivatives')
+            if options['force'] or (derivatives or {}).get('source') != name
+        ]
+        if not pending:
+            self.stdout.write("Toutes les images ont déjà leurs déclinaisons")
+            return
+
+        # Un fichier partagé par plusieurs images (même contenu) n'est décliné qu'une fois
+        image_ids = defaultdict(list)
+        for pk, name in pending:
+            image_ids[name].append(pk)
+
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {
+                executor.submit(images.render_derivatives, name, settings.MEDIA_ROOT): name
+                for name in image_ids
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    derivatives = future.result()
+                    for pk in image_ids[name]:
+                        images.save_derivatives(pk, derivatives)
+                    done += len(image_ids[name])
+                except Exception as e:
+                    failed += len(image_ids[name])
+                    self.stderr.write(f"{name} : {str(e)}")
+
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"{done} image(s) déclinée(s) en {elapsed:.2f}s ({done / elapsed:.1f} image(s)/s), {failed} échec(s)"
+        ))
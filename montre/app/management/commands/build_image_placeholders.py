@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import images
+from app.catalog import bump_catalog_version, bump_product_version
+from app.models import Category, ProductImage
+from app.models_banner import VideoBanner
+from app.models_card import ProductCard
+
+# Modèle -> (champ image, préfixe des champs de métadonnées)
+SOURCES = (
+    (ProductImage, 'image', ''),
+    (Category, 'image', 'image_'),
+    (VideoBanner, 'thumbnail', 'thumbnail_'),
+)
+
+METADATA_FIELDS = ('width', 'height', 'dominant_color', 'placeholder')
+
+
+class Command(BaseCommand):
+    help = "Calcule dimensions, couleur dominante et aperçu flou des images existantes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Recalcule aussi les images qui ont déjà leurs métadonnées"
+        )
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        product_ids = set()
+        for model, field_name, prefix in SOURCES:
+            queryset = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            if not options['force']:
+                queryset = queryset.filter(**{f'{prefix}width__isnull': True})
+            fields = [f'{prefix}{name}' for name in METADATA_FIELDS]
+            done = 0
+            for instance in queryset.iterator():
+                if options['force']:
+                    setattr(instance, f'{prefix}width', None)
+                if not images.update_image_metadata(instance, field_name, prefix=prefix):
+                    continue
+                # update() plutôt que save() : pas de signaux (déclinaisons, cartes) par image
+                model.objects.filter(pk=instance.pk).update(**{name: getattr(instance, name) for name in fields})
+                if model is ProductImage:
+                    product_ids.add(instance.product_id)
+                done += 1
+            self.stdout.write(f"{model._meta.verbose_name_plural} : {done} image(s) traitée(s)")
+
+        for product_id in product_ids:
+            ProductCard.refresh(product_id, create=False)
+            bump_product_version(product_id)
+        if product_ids:
+            bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(f"Terminé en {time.monotonic() - start:.2f}s"))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import recommendations
+
+
+class Command(BaseCommand):
+    help = "Recalcule les recommandations « Vous aimerez aussi » (co-achats, co-favoris, catégories)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k', type=int, default=recommendations.TOP_K,
+            help="Nombre de recommandations conservées par produit"
+        )
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        count = recommendations.rebuild_recommendations(top_k=options['top_k'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{count} recommandation(s) enregistrée(s) en {time.monotonic() - start:.2f}s"
+        ))
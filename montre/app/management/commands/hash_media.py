@@ -0,0 +1,103 @@
+import re
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from app import images
+from app.catalog import bump_catalog_version, bump_product_version
+from app.models import ProductImage
+from app.models_card import ProductCard
+
+HASHED_NAME_RE = re.compile(r'(^|/)[0-9a-f]{32}\.[^./]+$')
+
+
+class Command(BaseCommand):
+    help = (
+        "Renomme les médias existants d'après l'empreinte de leur contenu "
+        "(ContentAddressedStorage) et supprime les doublons devenus inutiles"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Affiche ce qui serait fait sans rien modifier"
+        )
+
+    def file_fields(self):
+        """(modèle, nom du champ) de chaque FileField/ImageField de l'application"""
+        for model in apps.get_app_config('app').get_models():
+            for field in model._meta.get_fields():
+                if isinstance(field, models.FileField):
+                    yield model, field.name
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, 'hashed_name'):
+            self.stderr.write("Le stockage par défaut n'est pas ContentAddressedStorage")
+            return
+
+        start = time.monotonic()
+        dry_run = options['dry_run']
+        renamed = {}  # ancien nom -> nouveau nom
+        product_ids = set()
+        for model, field_name in self.file_fields():
+            rows = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            count = 0
+            for pk, name in rows.values_list('pk', field_name).iterator():
+                if HASHED_NAME_RE.search(name):
+                    continue
+                if name not in renamed:
+                    if not default_storage.exists(name):
+                        self.stderr.write(f"{model.__name__} {pk} : fichier {name} introuvable")
+                        continue
+                    with default_storage.open(name) as content:
+                        if dry_run:
+                            renamed[name] = default_storage.hashed_name(name, File(content, name))
+                        else:
+                            renamed[name] = default_storage.save(name, File(content, name))
+                if not dry_run:
+                    # update() : pas de signaux (nouvel envoi, déclinaisons...) pour un simple renommage
+                    model.objects.filter(pk=pk).update(**{field_name: renamed[name]})
+                if model is ProductImage:
+                    product_ids.add(ProductImage.objects.filter(pk=pk).values_list('product_id', flat=True).first())
+                count += 1
+            if count:
+                self.stdout.write(f"{model.__name__}.{field_name} : {count} fichier(s) renommé(s)")
+
+        # Doublons : plusieurs anciens noms pour un même contenu
+        targets = defaultdict(list)
+        for old, new in renamed.items():
+            targets[new].append(old)
+        duplicates = sum(len(olds) - 1 for olds in targets.values())
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(
+                f"{len(renamed)} fichier(s) à renommer, {duplicates} doublon(s) (aucune modification)"
+            ))
+            return
+
+        # Espace libéré : chaque doublon n'est plus stocké qu'une fois
+        reclaimed = sum(default_storage.size(new) * (len(olds) - 1) for new, olds in targets.items())
+
+        # Anciens fichiers : plus aucun enregistrement ne les référence
+        for old in renamed:
+            default_storage.delete(old)
+            images.release_derivatives(old)
+
+        # Cartes (URL de l'image principale) et déclinaisons des nouveaux noms
+        for product_id in product_ids:
+            ProductCard.refresh(product_id, create=False)
+            bump_product_version(product_id)
+        if product_ids:
+            bump_catalog_version()
+            call_command('build_image_derivatives', stdout=self.stdout, stderr=self.stderr)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(renamed)} fichier(s) renommé(s) dont {duplicates} doublon(s), "
+            f"{reclaimed / 1024:.0f} Ko libérés en {time.monotonic() - start:.2f}s"
+        ))
@@ -0,0 +1,87 @@
+import time
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from app.models_cart import Cart
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime par lots les paniers anonymes abandonnés et les sessions expirées "
+        "(à planifier, ex. chaque nuit)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.SESSION_COOKIE_AGE // 86400,
+            help="Âge (jours sans modification) à partir duquel un panier anonyme est abandonné "
+                 "(par défaut, la durée de vie d'une session)"
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--pause', type=float, default=0.2,
+            help="Pause (secondes) entre deux lots, pour libérer le verrou d'écriture SQLite"
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Affiche ce qui serait supprimé sans rien modifier"
+        )
+
+    def purge(self, queryset, order_by, batch_size, pause):
+        """
+        Supprime les lignes du queryset par lots (les plus anciennes d'abord, en
+        suivant l'index de `order_by`), chaque lot dans sa propre transaction.
+        Retourne le nombre de lignes supprimées par modèle.
+        """
+        deleted = {}
+        while True:
+            batch = list(queryset.order_by(order_by, 'pk').values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                return deleted
+            with transaction.atomic():
+                total, per_model = queryset.model.objects.filter(pk__in=batch).delete()
+            for label, count in per_model.items():
+                deleted[label] = deleted.get(label, 0) + count
+            if len(batch) < batch_size:
+                return deleted
+            time.sleep(pause)
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        now = timezone.now()
+        carts = Cart.objects.filter(user=None, updated_at__lt=now - timedelta(days=options['days']))
+        db_sessions = settings.SESSION_ENGINE == 'django.contrib.sessions.backends.db'
+        sessions = Session.objects.filter(expire_date__lt=now)
+
+        if options['dry_run']:
+            session_count = sessions.count() if db_sessions else 0
+            self.stdout.write(self.style.WARNING(
+                f"{carts.count()} panier(s) anonyme(s) abandonné(s), "
+                f"{session_count} session(s) expirée(s) à supprimer (aucune modification)"
+            ))
+            return
+
+        batch_size, pause = options['batch_size'], options['pause']
+        deleted = self.purge(carts, 'updated_at', batch_size, pause)
+        cart_count = deleted.get(Cart._meta.label, 0)
+        item_count = deleted.get('app.CartItem', 0)
+
+        if db_sessions:
+            session_count = self.purge(sessions, 'expire_date', batch_size, pause).get(Session._meta.label, 0)
+        else:
+            # Autres moteurs (cache, fichiers...) : leur propre nettoyage
+            import_module(settings.SESSION_ENGINE).SessionStore.clear_expired()
+            session_count = 0
+
+        elapsed = time.monotonic() - start
+        rows = cart_count + item_count + session_count
+        self.stdout.write(self.style.SUCCESS(
+            f"{cart_count} panier(s) ({item_count} article(s)) et {session_count} session(s) supprimé(s) "
+            f"en {elapsed:.2f}s ({rows / elapsed:.0f} ligne(s)/s)"
+        ))
@@ -0,0 +1,52 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+from app.models_cart import Cart
+
+
+class Command(BaseCommand):
+    help = "Recalcule les totaux dénormalisés des paniers (item_count, subtotal) et corrige les écarts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Affiche les paniers en écart sans les corriger"
+        )
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        carts = Cart.objects.annotate(
+            actual_count=Coalesce(Sum('items__quantity'), 0),
+            actual_subtotal=Coalesce(
+                Sum(F('items__price') * F('items__quantity'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+                Value(Decimal('0')), output_field=DecimalField(max_digits=12, decimal_places=2)
+            ),
+        ).values_list('pk', 'item_count', 'subtotal', 'actual_count', 'actual_subtotal')
+
+        checked = 0
+        drifted = []
+        for pk, item_count, subtotal, actual_count, actual_subtotal in carts.iterator():
+            checked += 1
+            actual_subtotal = Decimal(actual_subtotal).quantize(Decimal('0.01'))
+            if item_count != actual_count or subtotal != actual_subtotal:
+                drifted.append(pk)
+                self.stdout.write(
+                    f"Panier {pk} : {item_count} article(s) / {subtotal} enregistrés, "
+                    f"{actual_count} / {actual_subtotal} réels"
+                )
+
+        if drifted and not options['dry_run']:
+            for pk in drifted:
+                # Recalcul sous verrou : un article ajouté entre-temps est pris en compte
+                with transaction.atomic():
+                    Cart.objects.select_for_update().get(pk=pk).refresh_totals()
+
+        action = "à corriger" if options['dry_run'] else "corrigé(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{checked} panier(s) vérifié(s), {len(drifted)} {action} en {time.monotonic() - start:.2f}s"
+        ))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import popularity
+from app.catalog import bump_catalog_version
+
+
+class Command(BaseCommand):
+    help = "Recalcule le score de popularité des produits (à planifier, ex. toutes les heures)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--product', type=int, action='append', dest='products',
+            help="Limiter le calcul à ce produit (option répétable)"
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        updated = popularity.update_scores(options['products'], batch_size=options['batch_size'])
+        if updated:
+            # L'ordre du tri « popularité » a changé
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"{updated} produit(s) mis à jour en {time.monotonic() - start:.2f}s"
+        ))
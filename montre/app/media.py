@@ -0,0 +1,190 @@
+"""
+Service des fichiers envoyés (MEDIA_URL).
+
+Remplace django.conf.urls.static.static(), qui relit le fichier entier à
+chaque requête, ignore l'en-tête Range (la vidéo de la bannière ne peut pas
+être parcourue sans la retélécharger) et n'envoie aucun en-tête de cache.
+
+- Range : réponses 206 partielles (une seule plage ; If-Range respecté) ;
+- ETag / Last-Modified : revalidation en 304 sans renvoyer le fichier ;
+- transmission sans copie : le fichier ouvert est confié au serveur WSGI
+  (wsgi.file_wrapper, soit sendfile() sous gunicorn), y compris pour une
+  plage ; avec MEDIA_ACCEL_REDIRECT, l'envoi est délégué à nginx
+  (X-Accel-Redirect vers une location interne) ;
+- cache : les noms contenant une empreinte du contenu (voir
+  storage.ContentAddressedStorage) sont immuables (un an), les autres sont
+  revalidés après MEDIA_CACHE_MAX_AGE secondes.
+
+Branché par MediaMiddleware (middleware.py) avant les sessions et
+l'authentification.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, HttpResponseNotAllowed, HttpResponseNotFound, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+
+# Empreinte hexadécimale dans le nom (ex. montre.3f2a1c9d8e7b.jpg), ou nom/dossier
+# attribué par ContentAddressedStorage (ex. products/<empreinte>.jpg,
+# derivatives/products/<empreinte>/320.webp) : contenu immuable
+IMMUTABLE_NAME_RE = re.compile(r'\.[0-9a-f]{12,}\.[^./]+$|(^|/)[0-9a-f]{32}[./]')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    """La plage demandée est hors du fichier (réponse 416)"""
+
+
+class FileRange:
+    """
+    Portion d'un fichier ouvert : la lecture s'arrête à la fin de la plage,
+    tandis que fileno() et la position courante permettent au serveur WSGI
+    d'utiliser sendfile() sur la portion (longueur donnée par Content-Length).
+    """
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(stats):
+    """ETag d'un fichier à partir de sa taille et de sa date de modification"""
+    return f'"{stats.st_size:x}-{stats.st_mtime_ns:x}"'
+
+
+def cache_control(path):
+    """En-tête Cache-Control d'un fichier selon que son nom est versionné ou non"""
+    if IMMUTABLE_NAME_RE.search(path):
+        return IMMUTABLE_CACHE_CONTROL
+    return f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', 86400)}"
+
+
+def parse_range(header, size):
+    """
+    Retourne la plage (début, fin incluse) demandée par l'en-tête Range, ou None
+    si l'en-tête est absent, invalide ou multiple (le fichier entier est alors envoyé).
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffixe : les N derniers octets
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def not_modified(request, etag, mtime):
+    """Indique si la copie du client (If-None-Match, sinon If-Modified-Since) est à jour"""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and int(mtime) <= since
+
+
+def range_applies(request, etag, mtime):
+    """If-Range : la plage ne vaut que si le fichier n'a pas changé depuis la copie du client"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(mtime)
+
+
+def serve(request, path):
+    """Sert le fichier `path` (relatif à MEDIA_ROOT)"""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        stats = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        stats = None
+    if stats is None or not stat.S_ISREG(stats.st_mode):
+        # Réponse brute : la page 404 du site a besoin de la session et de l'utilisateur
+        return HttpResponseNotFound()
+
+    etag = file_etag(stats)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stats.st_mtime),
+        'Cache-Control': cache_control(path),
+        'Accept-Ranges': 'bytes',
+    }
+    if not_modified(request, etag, stats.st_mtime):
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response.headers[header] = value
+        return response
+
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    if encoding:
+        # Ne pas laisser le navigateur décompresser un fichier .gz envoyé tel quel
+        content_type = 'application/octet-stream'
+    content_type = content_type or 'application/octet-stream'
+
+    accel_prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT', None)
+    if accel_prefix:
+        # nginx lit le fichier lui-même (sendfile, plages, HEAD)
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(path.replace(os.sep, '/'))
+        return response
+
+    start, end = 0, stats.st_size - 1
+    status = 200
+    if range_applies(request, etag, stats.st_mtime):
+        try:
+            requested = parse_range(request.META.get('HTTP_RANGE'), stats.st_size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416, headers=headers)
+            response['Content-Range'] = f'bytes */{stats.st_size}'
+            return response
+        if requested:
+            start, end = requested
+            status = 206
+            headers['Content-Range'] = f'bytes {start}-{end}/{stats.st_size}'
+    length = max(0, end - start + 1)
+
+    if request.method == 'HEAD':
+        response = HttpResponse(status=status, content_type=content_type, headers=headers)
+    else:
+        response = FileResponse(
+            FileRange(open(fullpath, 'rb'), start, length),
+            status=status, content_type=content_type, headers=headers
+        )
+    response['Content-Length'] = length
+    return response
@@ -1,8 +1,10 @@
 """
 Middleware pour gérer les fonctionnalités personnalisées de l'application.
 """
+from django.conf import settings
 from django.http import HttpRequest
 from .models import Order
+from . import media
 
 
 class RecentOrdersMiddleware:
@@ -52,3 +54,36 @@ class RecentOrdersMiddleware:
         Appelé juste après que la vue a été exécutée, si la réponse est un TemplateResponse.
         """
         return response
+
+
+class MediaMiddleware:
+    """
+    Sert les fichiers de MEDIA_URL (plages, ETag, cache, sendfile : voir media.py)
+    avant le reste de la pile : ni session, ni authentification, ni requête SQL.
+    Désactivé avec SERVE_MEDIA = False lorsque le serveur web sert lui-même /media/.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.MEDIA_URL
+
+    def __call__(self, request: HttpRequest):
+        if settings.SERVE_MEDIA and request.path_info.startswith(self.prefix):
+            return media.serve(request, request.path_info[len(self.prefix):])
+        return self.get_response(request)
+
+
+class CartCookieMiddleware:
+    """
+    Écrit sur la réponse le cookie du panier anonyme (voir cart.py) lorsqu'il a
+    été modifié pendant la requête ; le supprime une fois le panier vidé ou
+    enregistré en base.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest):
+        response = self.get_response(request)
+        cookie_cart = getattr(request, '_cookie_cart', None)
+        if cookie_cart is not None and cookie_cart.modified:
+            cookie_cart.write(response)
+        return response
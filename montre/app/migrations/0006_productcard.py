@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-16 20:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Avg, Count
+
+
+def build_product_cards(apps, schema_editor):
+    """Construit les cartes des produits existants"""
+    Product = apps.get_model('app', 'Product')
+    ProductCard = apps.get_model('app', 'ProductCard')
+    cards = []
+    for product in Product.objects.select_related('category'):
+        image = product.images.order_by('-is_featured', 'created_at').first()
+        stats = product.reviews.aggregate(avg=Avg('rating'), count=Count('id'))
+        discount = 0
+        if product.old_price is not None and product.old_price > product.price:
+            discount = int(((product.old_price - product.price) / product.old_price) * 100)
+        cards.append(ProductCard(
+            product=product,
+            image_url=image.image.url if image and image.image else '',
+            image_alt=(image.alt_text if image else '') or product.name,
+            average_rating=stats['avg'] or 0,
+            review_count=stats['count'],
+            likes_count=product.favorited_by.count(),
+            category_name=product.category.name if product.category else '',
+            discount_percentage=discount,
+        ))
+    ProductCard.objects.bulk_create(cards, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_legalpage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCard',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='app.product', verbose_name='Produit')),
+                ('image_url', models.CharField(blank=True, max_length=500, verbose_name="URL de l'image principale")),
+                ('image_alt', models.CharField(blank=True, max_length=200, verbose_name='Texte alternatif')),
+                ('average_rating', models.FloatField(default=0, verbose_name='Note moyenne')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name="Nombre d'avis")),
+                ('likes_count', models.PositiveIntegerField(default=0, verbose_name='Nombre de favoris')),
+                ('category_name', models.CharField(blank=True, max_length=100, verbose_name='Catégorie')),
+                ('discount_percentage', models.PositiveSmallIntegerField(default=0, verbose_name='Réduction (%)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernière mise à jour')),
+            ],
+            options={
+                'verbose_name': 'Carte produit',
+                'verbose_name_plural': 'Cartes produits',
+            },
+        ),
+        migrations.RunPython(build_product_cards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """Crée et remplit l'index plein texte des produits selon la base utilisée"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE app_product_search USING fts5('
+            'name, description, category, tokenize="unicode61 remove_diacritics 2")'
+        )
+        schema_editor.execute(
+            "INSERT INTO app_product_search (rowid, name, description, category) "
+            "SELECT p.id, p.name, p.description, COALESCE(c.name, '') "
+            "FROM app_product p LEFT JOIN app_category c ON c.id = p.category_id"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+        schema_editor.execute(
+            'CREATE TABLE app_product_search ('
+            'product_id bigint PRIMARY KEY REFERENCES app_product (id) ON DELETE CASCADE, '
+            'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            'CREATE INDEX app_product_search_document_idx ON app_product_search USING GIN (document)'
+        )
+        schema_editor.execute(
+            "INSERT INTO app_product_search (product_id, document) "
+            "SELECT p.id, "
+            "setweight(to_tsvector('french', unaccent(p.name)), 'A') || "
+            "setweight(to_tsvector('french', unaccent(COALESCE(c.name, ''))), 'B') || "
+            "setweight(to_tsvector('french', unaccent(p.description)), 'C') "
+            "FROM app_product p LEFT JOIN app_category c ON c.id = p.category_id"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE IF EXISTS app_product_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_productcard'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
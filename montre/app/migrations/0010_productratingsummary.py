@@ -0,0 +1,72 @@
+# Generated by Django 5.2.7 on 2026-10-16 20:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Avg, Count, Q, Sum
+
+
+def build_rating_summaries(apps, schema_editor):
+    """Construit les résumés des avis approuvés et recalcule les cartes en conséquence"""
+    Product = apps.get_model('app', 'Product')
+    Review = apps.get_model('app', 'Review')
+    ProductCard = apps.get_model('app', 'ProductCard')
+    ProductRatingSummary = apps.get_model('app', 'ProductRatingSummary')
+    stats = {
+        row['product_id']: row
+        for row in Review.objects.filter(is_approved=True)
+        .values('product_id')
+        .annotate(
+            count=Count('id'),
+            rating_sum=Sum('rating'),
+            average=Avg('rating'),
+            **{f'stars_{star}': Count('id', filter=Q(rating=star)) for star in range(1, 6)}
+        )
+    }
+    summaries = []
+    for product_id in Product.objects.values_list('pk', flat=True):
+        row = stats.get(product_id, {})
+        summaries.append(ProductRatingSummary(
+            product_id=product_id,
+            count=row.get('count', 0),
+            rating_sum=row.get('rating_sum') or 0,
+            **{f'stars_{star}': row.get(f'stars_{star}', 0) for star in range(1, 6)}
+        ))
+        ProductCard.objects.filter(product_id=product_id).update(
+            average_rating=row.get('average') or 0,
+            review_count=row.get('count', 0),
+        )
+    ProductRatingSummary.objects.bulk_create(summaries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_productrecommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRatingSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_summary', serialize=False, to='app.product', verbose_name='Produit')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name="Nombre d'avis approuvés")),
+                ('rating_sum', models.PositiveIntegerField(default=0, verbose_name='Somme des notes')),
+                ('stars_1', models.PositiveIntegerField(default=0, verbose_name='1 étoile')),
+                ('stars_2', models.PositiveIntegerField(default=0, verbose_name='2 étoiles')),
+                ('stars_3', models.PositiveIntegerField(default=0, verbose_name='3 étoiles')),
+                ('stars_4', models.PositiveIntegerField(default=0, verbose_name='4 étoiles')),
+                ('stars_5', models.PositiveIntegerField(default=0, verbose_name='5 étoiles')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernière mise à jour')),
+            ],
+            options={
+                'verbose_name': 'Résumé des avis',
+                'verbose_name_plural': 'Résumés des avis',
+            },
+        ),
+        migrations.AlterField(
+            model_name='productcard',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, verbose_name="Nombre d'avis approuvés"),
+        ),
+        migrations.RunPython(build_rating_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-16 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_productratingsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productcard',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, verbose_name="Déclinaisons de l'image"),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Déclinaisons'),
+        ),
+    ]
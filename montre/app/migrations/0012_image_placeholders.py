@@ -0,0 +1,93 @@
+# Generated by Django 5.2.7 on 2026-10-16 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='image_dominant_color',
+            field=models.CharField(blank=True, editable=False, max_length=7),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='image_placeholder',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='productcard',
+            name='image_dominant_color',
+            field=models.CharField(blank=True, max_length=7, verbose_name='Couleur dominante'),
+        ),
+        migrations.AddField(
+            model_name='productcard',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name="Hauteur de l'image"),
+        ),
+        migrations.AddField(
+            model_name='productcard',
+            name='image_placeholder',
+            field=models.TextField(blank=True, verbose_name='Aperçu flou'),
+        ),
+        migrations.AddField(
+            model_name='productcard',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name="Largeur de l'image"),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='dominant_color',
+            field=models.CharField(blank=True, editable=False, max_length=7, verbose_name='Couleur dominante'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Hauteur'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='placeholder',
+            field=models.TextField(blank=True, editable=False, verbose_name='Aperçu flou'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Largeur'),
+        ),
+        migrations.AddField(
+            model_name='videobanner',
+            name='thumbnail_dominant_color',
+            field=models.CharField(blank=True, editable=False, max_length=7),
+        ),
+        migrations.AddField(
+            model_name='videobanner',
+            name='thumbnail_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='videobanner',
+            name='thumbnail_placeholder',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='videobanner',
+            name='thumbnail_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
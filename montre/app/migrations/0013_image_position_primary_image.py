@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-16 21:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def number_images(apps, schema_editor):
+    """Numérote les images de chaque produit (mise en avant d'abord) et renseigne l'image principale"""
+    Product = apps.get_model('app', 'Product')
+    ProductImage = apps.get_model('app', 'ProductImage')
+    images = []
+    primary = {}
+    positions = {}
+    for image in ProductImage.objects.order_by('product_id', '-is_featured', 'created_at', 'id'):
+        image.position = positions.get(image.product_id, 0)
+        positions[image.product_id] = image.position + 1
+        primary.setdefault(image.product_id, image.pk)
+        images.append(image)
+    ProductImage.objects.bulk_update(images, ['position'], batch_size=500)
+    for product_id, image_id in primary.items():
+        Product.objects.filter(pk=product_id).update(primary_image_id=image_id)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_image_placeholders'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='productimage',
+            options={'ordering': ['-is_featured', 'position', 'id']},
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='primary_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.productimage', verbose_name='Image principale'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='position',
+            field=models.PositiveIntegerField(default=0, verbose_name='Position'),
+        ),
+        migrations.AddIndex(
+            model_name='productimage',
+            index=models.Index(fields=['product', 'position'], name='productimage_position_idx'),
+        ),
+        migrations.RunPython(number_images, migrations.RunPython.noop),
+    ]
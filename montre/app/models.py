@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.utils.text import slugify
 from django.contrib.auth import get_user_model
 from django.db.models.signals import post_migrate
@@ -6,6 +7,7 @@ from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 import os
 from django.utils import timezone
+from django.core.exceptions import ObjectDoesNotExist
 
 def get_upload_path(instance, filename):
     """
@@ -30,6 +32,11 @@ class Category(models.Model):
     slug = models.SlugField(unique=True)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
+    # Renseignés à l'envoi de l'image (voir images.update_image_metadata)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_dominant_color = models.CharField(max_length=7, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -66,6 +73,26 @@ class SubCategory(models.Model):
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
 
+class ProductQuerySet(models.QuerySet):
+    def for_cards(self, images=True):
+        """
+        Produits prêts pour l'affichage en carte : catégorie, carte (ProductCard)
+        et image principale jointes, images préchargées, note moyenne et
+        nombres d'avis et de favoris annotés depuis la carte. Les propriétés
+        main_image, average_rating, review_count et likes_count n'exécutent
+        alors aucune requête. Avec images=False, les images ne sont pas
+        préchargées (la carte contient déjà l'URL de l'image principale).
+        """
+        queryset = self.select_related('category', 'card', 'primary_image')
+        if images:
+            queryset = queryset.prefetch_related('images')
+        return queryset.annotate(
+            avg_rating=models.F('card__average_rating'),
+            num_reviews=Coalesce('card__review_count', 0),
+            num_likes=Coalesce('card__likes_count', 0),
+        )
+
+
 class Product(models.Model):
     # Informations de base
     name = models.CharField('Nom', max_length=200)
@@ -103,6 +130,16 @@ class Product(models.Model):
     low_stock_threshold = models.PositiveIntegerField('Seuil d\'alerte de stock', default=5)
     track_inventory = models.BooleanField('Gérer les stocks', default=True)
     
+    # Score de popularité (commandes, favoris, avis), recalculé par app.popularity
+    popularity = models.FloatField('Popularité', default=0, editable=False)
+    
+    # Image de couverture (première image dans l'ordre de ProductImage), maintenue
+    # par les signaux de ProductImage : cartes et emails la lisent sans requête
+    primary_image = models.ForeignKey('ProductImage', on_delete=models.SET_NULL, null=True, blank=True,
+                                      related_name='+', editable=False, verbose_name='Image principale')
+    
+    objects = ProductQuerySet.as_manager()
+    
     # Métadonnées
     meta_title = models.CharField('Titre SEO', max_length=70, blank=True,
                                 help_text="Titre pour les moteurs de recherche (max 70 caractères)")
@@ -170,19 +207,16 @@ class Product(models.Model):
     
     @property
     def main_image(self):
-        """Retourne l'image principale du produit"""
-        return self.images.filter(is_featured=True).first() or self.images.first()
-    
-    @property
-    def average_rating(self):
-        """Calcule la note moyenne des avis"""
-        from django.db.models import Avg
-        return self.reviews.aggregate(Avg('rating'))['rating__avg']
-    
-    @property
-    def review_count(self):
-        """Retourne le nombre d'avis"""
-        return self.reviews.count()
+        """Retourne l'image principale du produit (jointe par for_cards())"""
+        return self.primary_image
+
+    @classmethod
+    def refresh_primary_image(cls, product_id):
+        """Recalcule l'image de couverture après l'ajout, la modification ou la suppression d'une image"""
+        image_id = ProductImage.objects.filter(product_id=product_id).values_list('id', flat=True).first()
+        # update() : ni signaux ni écrasement des autres champs
+        cls.objects.filter(pk=product_id).update(primary_image_id=image_id)
+        return image_id
     
     @property
     def in_stock_status(self):
@@ -208,20 +242,35 @@ class Product(models.Model):
         ordering = ['-created_at']
         verbose_name = "Montre"
         verbose_name_plural = "Montres"
+        indexes = [
+            models.Index(fields=['popularity', 'id'], name='product_popularity_idx'),
+        ]
 
     def __str__(self):
         return self.name
         
     @property
     def average_rating(self):
-        """Retourne la note moyenne du produit"""
-        from django.db.models import Avg
-        return self.reviews.aggregate(Avg('rating'))['rating__avg'] or 0
+        """Retourne la note moyenne des avis approuvés"""
+        if hasattr(self, 'avg_rating'):
+            return self.avg_rating or 0
+        summary = self.get_rating_summary()
+        return summary.average if summary else 0
         
     @property
     def review_count(self):
-        """Retourne le nombre d'avis"""
-        return self.reviews.count()
+        """Retourne le nombre d'avis approuvés"""
+        if hasattr(self, 'num_reviews'):
+            return self.num_reviews
+        summary = self.get_rating_summary()
+        return summary.count if summary else 0
+    
+    def get_rating_summary(self):
+        """Retourne le résumé des avis approuvés (ProductRatingSummary) ou None"""
+        try:
+            return self.rating_summary
+        except ObjectDoesNotExist:
+            return None
         
     def is_favorite(self, user):
         """Vérifie si le produit est dans les favoris de l'utilisateur"""
@@ -232,6 +281,8 @@ class Product(models.Model):
     @property
     def likes_count(self):
         """Retourne le nombre total de favoris pour ce produit"""
+        if hasattr(self, 'num_likes'):
+            return self.num_likes
         return self.favorited_by.count()
         
     def get_absolute_url(self):
@@ -281,15 +332,39 @@ class ProductImage(models.Model):
     image = models.ImageField(upload_to='products/')
     alt_text = models.CharField(max_length=200, blank=True)
     is_featured = models.BooleanField(default=False)
+    position = models.PositiveIntegerField('Position', default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True,blank=True,null=True)
+    # Déclinaisons WebP/JPEG générées par images.py (chemins relatifs à MEDIA_ROOT)
+    derivatives = models.JSONField('Déclinaisons', default=dict, blank=True, editable=False)
+    # Dimensions, couleur dominante et aperçu flou, renseignés à l'envoi
+    width = models.PositiveIntegerField('Largeur', null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField('Hauteur', null=True, blank=True, editable=False)
+    dominant_color = models.CharField('Couleur dominante', max_length=7, blank=True, editable=False)
+    placeholder = models.TextField('Aperçu flou', blank=True, editable=False)
     
     class Meta:
-        ordering = ['is_featured', 'created_at']
+        # L'image mise en avant d'abord (couverture), puis l'ordre choisi
+        ordering = ['-is_featured', 'position', 'id']
+        indexes = [
+            models.Index(fields=['product', 'position'], name='productimage_position_idx'),
+        ]
     
     def __str__(self):
         return f"Image of {self.product.name}"
 
+    def save(self, *args, **kwargs):
+        # Une nouvelle image sans position est ajoutée à la fin de la galerie
+        if self._state.adding and not self.position and self.product_id:
+            last = ProductImage.objects.filter(product_id=self.product_id).aggregate(last=models.Max('position'))['last']
+            self.position = 0 if last is None else last + 1
+        super().save(*args, **kwargs)
+
+    def derivative_url(self, width, fmt='jpeg'):
+        """URL de la déclinaison la plus proche de `width`, ou de l'original à défaut"""
+        from .images import derivative_url
+        return derivative_url(self.derivatives, width, fmt) or (self.image.url if self.image else '')
+
 class Review(models.Model):
     RATING_CHOICES = (
         (1, '1 - Très mauvais'),
@@ -326,7 +401,9 @@ class Review(models.Model):
             self.first_name = self.user.first_name
             self.last_name = self.user.last_name
             self.email = self.user.email
-        super().save(*args, **kwargs)
+        # Le résumé des notes (voir ratings.py) est mis à jour dans la même transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
 class Comment(models.Model):
     review = models.ForeignKey(Review, related_name='comments', on_delete=models.CASCADE)
@@ -63,6 +63,11 @@ class VideoBanner(models.Model):
         null=True,
         blank=True
     )
+    # Renseignés à l'envoi de l'image (voir images.update_image_metadata)
+    thumbnail_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    thumbnail_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    thumbnail_dominant_color = models.CharField(max_length=7, blank=True, editable=False)
+    thumbnail_placeholder = models.TextField(blank=True, editable=False)
     
     # Métadonnées
     created_at = models.DateTimeField(_('date de création'), auto_now_add=True)
@@ -0,0 +1,81 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models
+from django.utils import timezone
+from .models import Product
+
+
+class ProductCard(models.Model):
+    """
+    Projection dénormalisée d'un produit pour l'affichage en carte.
+    Permet de rendre une page complète de la boutique en une seule requête
+    (image principale, note moyenne, nombre d'avis, favoris, catégorie...).
+    Maintenue à jour par les signaux définis dans signals.py.
+    """
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='card',
+        verbose_name='Produit'
+    )
+    image_url = models.CharField('URL de l\'image principale', max_length=500, blank=True)
+    image_alt = models.CharField('Texte alternatif', max_length=200, blank=True)
+    image_derivatives = models.JSONField('Déclinaisons de l\'image', default=dict, blank=True)
+    image_width = models.PositiveIntegerField('Largeur de l\'image', null=True, blank=True)
+    image_height = models.PositiveIntegerField('Hauteur de l\'image', null=True, blank=True)
+    image_dominant_color = models.CharField('Couleur dominante', max_length=7, blank=True)
+    image_placeholder = models.TextField('Aperçu flou', blank=True)
+    average_rating = models.FloatField('Note moyenne', default=0)
+    review_count = models.PositiveIntegerField('Nombre d\'avis approuvés', default=0)
+    likes_count = models.PositiveIntegerField('Nombre de favoris', default=0)
+    category_name = models.CharField('Catégorie', max_length=100, blank=True)
+    discount_percentage = models.PositiveSmallIntegerField('Réduction (%)', default=0)
+    updated_at = models.DateTimeField('Dernière mise à jour', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Carte produit'
+        verbose_name_plural = 'Cartes produits'
+
+    def __str__(self):
+        return f"Carte de {self.product_id}"
+
+    @classmethod
+    def compute_fields(cls, product):
+        """Calcule les valeurs dénormalisées d'un produit"""
+        image = product.primary_image
+        # Notes recopiées du résumé des avis (ProductRatingSummary), seule source des notes
+        try:
+            summary = product.rating_summary
+        except ObjectDoesNotExist:
+            summary = None
+        return {
+            'image_url': image.image.url if image and image.image else '',
+            'image_alt': (image.alt_text if image else '') or product.name,
+            'image_derivatives': image.derivatives if image else {},
+            'image_width': image.width if image else None,
+            'image_height': image.height if image else None,
+            'image_dominant_color': image.dominant_color if image else '',
+            'image_placeholder': image.placeholder if image else '',
+            'average_rating': summary.average if summary else 0,
+            'review_count': summary.count if summary else 0,
+            'likes_count': product.favorited_by.count(),
+            'category_name': product.category.name if product.category else '',
+            'discount_percentage': product.discount_percentage,
+        }
+
+    @classmethod
+    def refresh(cls, product_id, create=True):
+        """
+        Recalcule la carte d'un produit.
+        Avec create=False, seule une carte existante est mise à jour : c'est le cas
+        des suppressions en cascade où le produit lui-même est en cours de suppression.
+        """
+        product = Product.objects.select_related('category', 'primary_image', 'rating_summary').filter(pk=product_id).first()
+        if product is None:
+            return None
+        fields = cls.compute_fields(product)
+        if create:
+            card, created = cls.objects.update_or_create(product=product, defaults=fields)
+            return card
+        cls.objects.filter(product=product).update(updated_at=timezone.now(), **fields)
+        return None
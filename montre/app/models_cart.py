@@ -1,6 +1,10 @@
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import F, Sum
 from django.conf import settings
 from django.core.validators import MinValueValidator
+from django.utils import timezone
+from django.utils.functional import cached_property
 from .models import Product
 
 class Cart(models.Model):
@@ -16,6 +20,10 @@ class Cart(models.Model):
         related_name='cart'
     )
     session_key = models.CharField(max_length=40, blank=True, null=True)
+    # Totaux dénormalisés, maintenus par des mises à jour F() à chaque modification
+    # d'un article (voir apply_delta) ; commande reconcile_carts en cas d'écart
+    item_count = models.PositiveIntegerField('Nombre d\'articles', default=0)
+    subtotal = models.DecimalField('Sous-total', max_digits=12, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -23,6 +31,13 @@ class Cart(models.Model):
         verbose_name = 'Panier'
         verbose_name_plural = 'Paniers'
         ordering = ['-updated_at']
+        indexes = [
+            # Purge des paniers anonymes abandonnés par plages de dates (purge_stale_carts)
+            models.Index(fields=['updated_at'], name='cart_updated_idx'),
+        ]
+    
+    # Résumé (nombre d'articles, sous-total) mis en cache par utilisateur pour le contexte des gabarits (voir cart.py)
+    SUMMARY_CACHE_KEY = 'cart_summary:%s'
     
     def __str__(self):
         if self.user:
@@ -32,12 +47,7 @@ class Cart(models.Model):
     @property
     def total_items(self):
         """Retourne le nombre total d'articles dans le panier"""
-        return sum(item.quantity for item in self.items.all())
-    
-    @property
-    def subtotal(self):
-        """Calcule le sous-total du panier (sans les frais de livraison)"""
-        return sum(item.total_price for item in self.items.all())
+        return self.item_count
     
     @property
     def total(self):
@@ -51,43 +61,134 @@ class Cart(models.Model):
         # Pour l'instant, retourne 0 ou un montant fixe
         return 0
     
+    def apply_delta(self, quantity, amount):
+        """
+        Répercute sur les totaux l'ajout (valeurs positives) ou le retrait
+        (valeurs négatives) d'articles, de manière atomique en base.
+        """
+        if not quantity and not amount:
+            return
+        updated = Cart.objects.filter(pk=self.pk).update(
+            item_count=F('item_count') + quantity,
+            subtotal=F('subtotal') + amount,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            self.refresh_from_db(fields=['item_count', 'subtotal', 'updated_at', 'user'])
+            self.invalidate_summary()
+    
+    def invalidate_summary(self):
+        """Supprime du cache le résumé du panier de l'utilisateur, une fois la modification validée"""
+        if self.user_id:
+            key = self.SUMMARY_CACHE_KEY % self.user_id
+            transaction.on_commit(lambda: cache.delete(key))
+    
     def add_item(self, product, quantity=1, update_quantity=False):
         """
         Ajoute un produit au panier ou met à jour sa quantité.
         """
-        # Vérifier si le produit est déjà dans le panier
-        cart_item, created = self.items.get_or_create(
-            product=product,
-            defaults={'quantity': 0}
-        )
-        
-        if update_quantity:
-            cart_item.quantity = quantity
-        else:
-            cart_item.quantity += quantity
-        
-        # Vérifier que la quantité ne dépasse pas le stock disponible
-        if cart_item.quantity > product.in_stock and product.track_inventory:
-            cart_item.quantity = product.in_stock
-        
-        cart_item.save()
+        with transaction.atomic():
+            # Vérifier si le produit est déjà dans le panier (ligne verrouillée jusqu'à l'enregistrement)
+            cart_item, created = self.items.select_for_update().get_or_create(
+                cart=self,
+                product=product,
+                defaults={'quantity': 0}
+            )
+            
+            if update_quantity:
+                cart_item.quantity = quantity
+            else:
+                cart_item.quantity += quantity
+            
+            # Vérifier que la quantité ne dépasse pas le stock disponible
+            if cart_item.quantity > product.in_stock and product.track_inventory:
+                cart_item.quantity = product.in_stock
+            
+            cart_item.save()
         return cart_item
     
     def remove_item(self, product):
         """Supprime un produit du panier"""
-        self.items.filter(product=product).delete()
+        with transaction.atomic():
+            items = self.items.select_for_update().filter(product=product)
+            removed = items.aggregate(removed_quantity=Sum('quantity'), removed_amount=Sum(F('price') * F('quantity')))
+            items.delete()
+            self.apply_delta(-(removed['removed_quantity'] or 0), -(removed['removed_amount'] or 0))
     
     def clear(self):
         """Vide complètement le panier"""
-        self.items.all().delete()
+        with transaction.atomic():
+            self.items.all().delete()
+            Cart.objects.filter(pk=self.pk).update(item_count=0, subtotal=0, updated_at=timezone.now())
+            self.item_count, self.subtotal = 0, 0
+            self.invalidate_summary()
+    
+    @cached_property
+    def lines(self):
+        """Articles avec leurs produits (même interface que le panier du cookie, voir cart.py)"""
+        return list(self.items.select_related('product', 'product__primary_image'))
+
+    def get_line(self, line_id):
+        return self.items.select_related('product').filter(id=line_id).first()
+
+    def update_line(self, line_id, quantity):
+        """Modifie la quantité d'un article ; retourne l'article ou None"""
+        with transaction.atomic():
+            # Ligne verrouillée dès la lecture : l'écart appliqué par save() part de sa valeur en base
+            line = self.items.select_for_update().select_related('product').filter(id=line_id).first()
+            if line is not None:
+                line.quantity = quantity
+                line.save()
+        return line
+
+    def remove_line(self, line_id):
+        """Retire un article ; retourne l'article retiré ou None"""
+        line = self.get_line(line_id)
+        if line is not None:
+            # Via self.items : l'article référence ce même panier, dont les totaux sont mis à jour par delete()
+            line.delete()
+        return line
+
+    def add_quantities(self, quantities):
+        """
+        Ajoute en une seule requête (INSERT ... ON CONFLICT DO UPDATE) les
+        quantités {id produit: quantité} aux articles du panier, bornées au stock,
+        puis recalcule les totaux.
+        """
+        with transaction.atomic():
+            products = Product.objects.filter(is_active=True).in_bulk(list(quantities))
+            existing = dict(
+                self.items.select_for_update().filter(product_id__in=products).values_list('product_id', 'quantity')
+            )
+            items = []
+            for product_id, product in products.items():
+                quantity = existing.get(product_id, 0) + quantities[product_id]
+                if product.track_inventory:
+                    quantity = min(quantity, product.in_stock)
+                if quantity > 0:
+                    items.append(CartItem(cart=self, product=product, quantity=quantity, price=product.price))
+            if items:
+                CartItem.objects.bulk_create(
+                    items,
+                    update_conflicts=True,
+                    unique_fields=['cart', 'product'],
+                    update_fields=['quantity', 'price', 'updated_at'],
+                )
+            self.refresh_totals()
+    
+    def refresh_totals(self):
+        """Recalcule les totaux dénormalisés à partir des articles (après des écritures en masse)"""
+        totals = self.items.aggregate(count=Sum('quantity'), amount=Sum(F('price') * F('quantity')))
+        self.item_count, self.subtotal = totals['count'] or 0, totals['amount'] or 0
+        Cart.objects.filter(pk=self.pk).update(item_count=self.item_count, subtotal=self.subtotal, updated_at=timezone.now())
+        self.invalidate_summary()
     
     def merge_cart(self, session_cart):
         """Fusionne le panier de session avec le panier utilisateur"""
         if session_cart and session_cart != self:
-            for item in session_cart.items.all():
-                self.add_item(item.product, item.quantity)
-            session_cart.delete()
-
+            with transaction.atomic():
+                self.add_quantities(dict(session_cart.items.values_list('product_id', 'quantity')))
+                session_cart.delete()
 
 class CartItem(models.Model):
     """
@@ -128,10 +229,31 @@ class CartItem(models.Model):
     def __str__(self):
         return f"{self.quantity} x {self.product.name}"
     
+    def stored_line(self):
+        """
+        (quantité, prix unitaire) enregistrés de l'article, ligne verrouillée
+        jusqu'à la fin de la transaction : l'écart répercuté sur le panier part de
+        la valeur en base, et non d'une copie en mémoire éventuellement périmée.
+        """
+        if self.pk is None:
+            return 0, 0
+        stored = CartItem.objects.select_for_update().filter(pk=self.pk).values_list('quantity', 'price').first()
+        return stored or (0, 0)
+    
     def save(self, *args, **kwargs):
         # Mettre à jour le prix à chaque sauvegarde
         self.price = self.product.price
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            old_quantity, old_price = self.stored_line()
+            super().save(*args, **kwargs)
+            self.cart.apply_delta(self.quantity - old_quantity, self.total_price - old_price * old_quantity)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            old_quantity, old_price = self.stored_line()
+            result = super().delete(*args, **kwargs)
+            self.cart.apply_delta(-old_quantity, -old_price * old_quantity)
+        return result
     
     @property
     def total_price(self):
@@ -146,13 +268,15 @@ class CartItem(models.Model):
         return self.quantity <= self.product.in_stock
     
     def increase_quantity(self, quantity=1):
-        """Augmente la quantité de l'article"""
-        self.quantity += quantity
-        if self.product.track_inventory and self.quantity > self.product.in_stock:
-            self.quantity = self.product.in_stock
-        self.save()
+        """Augmente la quantité de l'article (à partir de la quantité enregistrée)"""
+        with transaction.atomic():
+            self.quantity = self.stored_line()[0] + quantity
+            if self.product.track_inventory and self.quantity > self.product.in_stock:
+                self.quantity = self.product.in_stock
+            self.save()
     
     def decrease_quantity(self, quantity=1):
-        """Diminue la quantité de l'article"""
-        self.quantity = max(1, self.quantity - quantity)
-        self.save()
+        """Diminue la quantité de l'article (à partir de la quantité enregistrée)"""
+        with transaction.atomic():
+            self.quantity = max(1, self.stored_line()[0] - quantity)
+            self.save()
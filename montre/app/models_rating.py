@@ -0,0 +1,88 @@
+from django.db import models
+from django.db.models import Count, F, Q, Sum
+from .models import Product, Review
+
+STARS = (1, 2, 3, 4, 5)
+
+
+class ProductRatingSummary(models.Model):
+    """
+    Résumé des avis approuvés d'un produit : nombre, somme des notes et
+    répartition par étoile. Maintenu par app.ratings à chaque création,
+    modification, approbation ou suppression d'avis.
+    """
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rating_summary',
+        verbose_name='Produit'
+    )
+    count = models.PositiveIntegerField('Nombre d\'avis approuvés', default=0)
+    rating_sum = models.PositiveIntegerField('Somme des notes', default=0)
+    stars_1 = models.PositiveIntegerField('1 étoile', default=0)
+    stars_2 = models.PositiveIntegerField('2 étoiles', default=0)
+    stars_3 = models.PositiveIntegerField('3 étoiles', default=0)
+    stars_4 = models.PositiveIntegerField('4 étoiles', default=0)
+    stars_5 = models.PositiveIntegerField('5 étoiles', default=0)
+    updated_at = models.DateTimeField('Dernière mise à jour', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Résumé des avis'
+        verbose_name_plural = 'Résumés des avis'
+
+    def __str__(self):
+        return f"{self.product_id} : {self.average:.1f}/5 ({self.count} avis)"
+
+    @property
+    def average(self):
+        """Note moyenne des avis approuvés (0 s'il n'y en a aucun)"""
+        return self.rating_sum / self.count if self.count else 0
+
+    @property
+    def star_counts(self):
+        """Nombre d'avis par étoile, indexé par '1'..'5' (cf. filtre get_item)"""
+        return {str(star): getattr(self, f'stars_{star}') for star in STARS}
+
+    @classmethod
+    def apply(cls, product_id, rating, delta):
+        """Ajoute (delta=1) ou retire (delta=-1) un avis approuvé de note `rating`"""
+        if delta > 0:
+            # Lors d'une suppression en cascade du produit, le résumé ne doit pas être recréé
+            cls.objects.get_or_create(product_id=product_id)
+        cls.objects.filter(product_id=product_id).update(**{
+            'count': F('count') + delta,
+            'rating_sum': F('rating_sum') + delta * rating,
+            f'stars_{rating}': F(f'stars_{rating}') + delta,
+        })
+
+    @classmethod
+    def rebuild(cls, product_ids):
+        """Recalcule entièrement les résumés des produits donnés (une requête d'agrégat)"""
+        product_ids = set(product_ids)
+        stats = {
+            row['product_id']: row
+            for row in Review.objects.filter(product_id__in=product_ids, is_approved=True)
+            .values('product_id')
+            .annotate(
+                count=Count('id'),
+                rating_sum=Sum('rating'),
+                **{f'stars_{star}': Count('id', filter=Q(rating=star)) for star in STARS}
+            )
+        }
+        summaries = []
+        for product_id in Product.objects.filter(pk__in=product_ids).values_list('pk', flat=True):
+            row = stats.get(product_id, {})
+            summaries.append(cls(
+                product_id=product_id,
+                count=row.get('count', 0),
+                rating_sum=row.get('rating_sum') or 0,
+                **{f'stars_{star}': row.get(f'stars_{star}', 0) for star in STARS}
+            ))
+        cls.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['count', 'rating_sum'] + [f'stars_{star}' for star in STARS],
+        )
+        return len(summaries)
@@ -0,0 +1,38 @@
+from django.db import models
+from .models import Product
+
+
+class ProductRecommendation(models.Model):
+    """
+    Recommandation précalculée « Vous aimerez aussi » pour un produit.
+    Table reconstruite par la commande build_recommendations (voir recommendations.py).
+    """
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='Produit'
+    )
+    recommended = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='recommended_in',
+        verbose_name='Produit recommandé'
+    )
+    rank = models.PositiveSmallIntegerField('Rang')
+    score = models.FloatField('Score')
+    created_at = models.DateTimeField('Date de calcul', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Recommandation'
+        verbose_name_plural = 'Recommandations'
+        ordering = ['product', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'recommended'], name='unique_recommendation'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'rank'], name='recommendation_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} → {self.recommended_id} ({self.score:.3f})"
@@ -0,0 +1,205 @@
+"""
+Pagination par curseur (keyset) pour le catalogue.
+
+Plutôt que OFFSET/LIMIT, chaque page est obtenue en filtrant sur la clé de tri
+de la dernière ligne affichée (ex. `created_at`, `id`). Le coût d'une page reste
+constant quelle que soit sa profondeur et aucun COUNT(*) n'est nécessaire.
+"""
+import base64
+import hashlib
+import json
+import binascii
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# Clés de tri autorisées, par mode de tri du catalogue
+CURSOR_ORDERINGS = {
+    'newest': ('-created_at', '-id'),
+    'price_asc': ('price', 'id'),
+    'price_desc': ('-price', '-id'),
+    'popular': ('-popularity', '-id'),
+}
+DEFAULT_ORDERING = CURSOR_ORDERINGS['newest']
+# Tri par pertinence, disponible quand le queryset est annoté par app.search
+RELEVANCE_ORDERING = ('search_rank', 'id')
+
+# Durée de mise en cache du total approximatif (en secondes)
+APPROXIMATE_COUNT_TIMEOUT = 300
+
+
+def encode_cursor(value, pk, reverse=False):
+    """Encode une position dans un jeton opaque"""
+    payload = json.dumps([value, pk, 'p' if reverse else 'n'], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Décode un jeton. Retourne (valeur, pk, reverse) ou None si le jeton est invalide"""
+    if not token:
+        return None
+    try:
+        padding = '=' * (-len(token) % 4)
+        value, pk, direction = json.loads(base64.urlsafe_b64decode(token + padding))
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    # Jeton falsifié : la valeur de tri est toujours une chaîne (voir CursorPaginator._position)
+    if not isinstance(value, str) or not isinstance(pk, int) or isinstance(pk, bool) or direction not in ('n', 'p'):
+        return None
+    return value, pk, direction == 'p'
+
+
+def get_ordering(sort, searching=False):
+    """Retourne la clé de tri du paginateur pour un mode de tri donné"""
+    if sort in CURSOR_ORDERINGS:
+        return CURSOR_ORDERINGS[sort]
+    return RELEVANCE_ORDERING if searching else DEFAULT_ORDERING
+
+
+def approximate_count(queryset):
+    """
+    Retourne le nombre de résultats d'un queryset, mis en cache quelques minutes.
+    Le total n'est donc qu'approximatif mais le COUNT(*) n'est exécuté qu'une fois
+    par combinaison de filtres et par période de cache.
+    """
+    queryset = queryset.order_by()
+    try:
+        sql = str(queryset.query)
+    except EmptyResultSet:
+        return 0
+    key = 'approx_count:' + hashlib.md5(sql.encode()).hexdigest()
+    return cache.get_or_set(key, queryset.count, APPROXIMATE_COUNT_TIMEOUT)
+
+
+class CursorPage:
+    """Page de résultats obtenue par curseur"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, total=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Découpe un queryset en pages selon une clé de tri (champ, id).
+    L'ordre doit se terminer par la clé primaire pour garantir l'unicité de la position.
+    """
+
+    def __init__(self, queryset, per_page, ordering=DEFAULT_ORDERING, with_total=False):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+        self.with_total = with_total
+        self.field_name = ordering[0].lstrip('-')
+        self.descending = ordering[0].startswith('-')
+
+    def _field(self):
+        """Champ du modèle ou annotation servant de clé de tri"""
+        try:
+            return self.queryset.model._meta.get_field(self.field_name)
+        except FieldDoesNotExist:
+            return self.queryset.query.annotations[self.field_name].output_field
+
+    def _position(self, obj):
+        value = getattr(obj, self.field_name)
+        return (str(value) if value is not None else None), obj.pk
+
+    def _after(self, value, pk, forward):
+        """Filtre les lignes situées après (ou avant) la position donnée"""
+        value = self._field().to_python(value)
+        greater = forward != self.descending
+        op = 'gt' if greater else 'lt'
+        return Q(**{f'{self.field_name}__{op}': value}) | Q(**{self.field_name: value, f'pk__{op}': pk})
+
+    def page(self, cursor=None):
+        position = decode_cursor(cursor)
+        queryset = self.queryset
+        reverse = False
+
+        if position is not None:
+            value, pk, reverse = position
+            try:
+                queryset = queryset.filter(self._after(value, pk, forward=not reverse))
+            except (ValidationError, KeyError, TypeError, ValueError):
+                # Jeton falsifié ou périmé : on repart de la première page
+                position, reverse = None, False
+
+        if reverse:
+            ordering = [f[1:] if f.startswith('-') else f'-{f}' for f in self.ordering]
+        else:
+            ordering = list(self.ordering)
+
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                next_cursor = encode_cursor(*self._position(rows[-1]))
+            if position is not None and (has_more or not reverse):
+                previous_cursor = encode_cursor(*self._position(rows[0]), reverse=True)
+
+        total = approximate_count(self.queryset) if self.with_total else None
+        return CursorPage(rows, next_cursor, previous_cursor, total)
+
+
+class ProductCursorPagination(BasePagination):
+    """Pagination par curseur pour l'API REST des produits"""
+    page_size = 12
+    cursor_query_param = 'cursor'
+    sort_query_param = 'sort'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = get_ordering(
+            request.query_params.get(self.sort_query_param),
+            # Même règle que ProductSearchFilter : un `q` blanc n'est pas une recherche
+            searching=bool(request.query_params.get('q', '').strip())
+        )
+        paginator = CursorPaginator(queryset, self.page_size, ordering, with_total=True)
+        self.page = paginator.page(request.query_params.get(self.cursor_query_param))
+        return list(self.page)
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(self.page.next_cursor),
+            'previous': self.get_link(self.page.previous_cursor),
+            'next_cursor': self.page.next_cursor,
+            'previous_cursor': self.page.previous_cursor,
+            'approximate_count': self.page.total,
+            # Recherche limitée aux search.MAX_RESULTS produits les plus pertinents
+            'search_truncated': getattr(self.request, 'search_truncated', False),
+            'results': data,
+        })
@@ -0,0 +1,88 @@
+"""
+Score de popularité des produits.
+
+Chaque événement (commande, favori, avis approuvé) rapporte des points qui
+décroissent avec son ancienneté (demi-vie de HALF_LIFE_DAYS jours). Le score
+est stocké et indexé sur Product pour que le tri « popularité » soit un simple
+parcours d'index.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .catalog import bump_catalog_version
+from .models import Order, Product, Review
+from .models_favorite import Favorite
+
+HALF_LIFE_DAYS = 30
+# Au-delà de cette fenêtre, la contribution d'un événement est négligeable
+WINDOW_DAYS = 365
+
+ORDER_WEIGHT = 5.0      # par article commandé
+FAVORITE_WEIGHT = 2.0   # par favori
+REVIEW_WEIGHT = 1.0     # par avis approuvé, pondéré par sa note (/5)
+
+
+def decay(created_at, now):
+    """Coefficient de décroissance d'un événement selon son ancienneté"""
+    age_days = max((now - created_at).total_seconds() / 86400, 0)
+    return 0.5 ** (age_days / HALF_LIFE_DAYS)
+
+
+def compute_scores(product_ids=None, now=None):
+    """
+    Calcule les scores de popularité.
+    Retourne un dictionnaire {product_id: score} pour les produits demandés
+    (ou tous les produits ayant une activité récente si product_ids est None).
+    """
+    now = now or timezone.now()
+    since = now - timedelta(days=WINDOW_DAYS)
+    scores = defaultdict(float)
+
+    orders = Order.objects.filter(created_at__gte=since).exclude(status='cancelled')
+    favorites = Favorite.objects.filter(created_at__gte=since)
+    reviews = Review.objects.filter(created_at__gte=since, is_approved=True)
+    if product_ids is not None:
+        orders = orders.filter(product_id__in=product_ids)
+        favorites = favorites.filter(product_id__in=product_ids)
+        reviews = reviews.filter(product_id__in=product_ids)
+
+    for product_id, quantity, created_at in orders.values_list('product_id', 'quantity', 'created_at').iterator():
+        scores[product_id] += ORDER_WEIGHT * (quantity or 1) * decay(created_at, now)
+    for product_id, created_at in favorites.values_list('product_id', 'created_at').iterator():
+        scores[product_id] += FAVORITE_WEIGHT * decay(created_at, now)
+    for product_id, rating, created_at in reviews.values_list('product_id', 'rating', 'created_at').iterator():
+        scores[product_id] += REVIEW_WEIGHT * (rating / 5) * decay(created_at, now)
+
+    if product_ids is not None:
+        return {product_id: round(scores.get(product_id, 0.0), 4) for product_id in product_ids}
+    return {product_id: round(score, 4) for product_id, score in scores.items()}
+
+
+def update_scores(product_ids=None, batch_size=500):
+    """
+    Met à jour les scores stockés. Retourne le nombre de produits modifiés.
+    Seuls les produits dont le score a changé sont écrits.
+    """
+    scores = compute_scores(product_ids)
+    products = Product.objects.only('id', 'popularity')
+    if product_ids is not None:
+        products = products.filter(id__in=product_ids)
+
+    changed = []
+    for product in products.iterator():
+        score = scores.get(product.id, 0.0)
+        if product.popularity != score:
+            product.popularity = score
+            changed.append(product)
+    Product.objects.bulk_update(changed, ['popularity'], batch_size=batch_size)
+    return len(changed)
+
+
+def refresh_product(product_id):
+    """Recalcule le score d'un seul produit (appelé par les signaux)"""
+    score = compute_scores([product_id])[product_id]
+    if Product.objects.filter(pk=product_id).exclude(popularity=score).update(popularity=score):
+        # Tri « popularité », instantané du catalogue et fragments en cache à reconstruire
+        bump_catalog_version()
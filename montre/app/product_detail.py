@@ -0,0 +1,95 @@
+"""
+Chargement de la fiche produit.
+
+Toutes les données affichées sur la fiche (produit, images, premiers avis
+approuvés, résumé des notes, produits associés) sont chargées par
+get_product_detail en 5 requêtes :
+
+1. le produit, sa catégorie, sa carte et le résumé des avis approuvés ;
+2. ses images ;
+3. la première page d'avis approuvés et leurs auteurs ;
+4. les premiers commentaires de ces avis ;
+5. les produits recommandés, complétés dans la même requête par les produits
+   associés tant que les recommandations n'ont pas été calculées
+   (build_recommendations).
+
+Les pages d'avis suivantes et la suite des fils de commentaires sont chargées
+à la demande (HTMX) par reviews_page et comments_page, paginées par curseur.
+"""
+from django.db.models import Count, Prefetch
+from django.shortcuts import get_object_or_404
+
+from .models import Comment, Product, Review
+from .pagination import CursorPaginator, encode_cursor
+from . import recommendations
+
+# Nombre d'avis affichés sur la fiche, puis par page chargée au défilement
+REVIEWS_PAGE_SIZE = 3
+REVIEWS_ORDERING = ('-created_at', '-id')
+# Nombre de commentaires affichés sous chaque avis, puis par page de la suite du fil
+COMMENTS_PREVIEW = 3
+COMMENTS_PAGE_SIZE = 10
+COMMENTS_ORDERING = ('created_at', 'id')
+# Nombre de produits associés affichés
+RELATED_LIMIT = 4
+
+
+def related_products_for(product, limit=RELATED_LIMIT):
+    """
+    Produits recommandés (table précalculée, voir recommendations.py), complétés
+    par les produits associés puis ceux de la même catégorie (une requête).
+    """
+    return recommendations.related_products(product, limit, Product.objects.for_cards(images=False))
+
+
+def reviews_page(product_id, cursor=None, per_page=REVIEWS_PAGE_SIZE):
+    """
+    Page d'avis approuvés d'un produit (CursorPage), avec leurs auteurs et les
+    COMMENTS_PREVIEW premiers commentaires de chacun dans `comment_preview`
+    (3 requêtes). Les avis dont le fil est plus long reçoivent `comments_cursor`,
+    position de la suite du fil.
+    """
+    queryset = (
+        Review.objects.filter(product_id=product_id, is_approved=True)
+        .select_related('user')
+        .annotate(comment_count=Count('comments'))
+        .prefetch_related(Prefetch(
+            'comments',
+            queryset=Comment.objects.select_related('user').order_by(*COMMENTS_ORDERING)[:COMMENTS_PREVIEW],
+            to_attr='comment_preview'
+        ))
+    )
+    page = CursorPaginator(queryset, per_page, REVIEWS_ORDERING).page(cursor)
+    for review in page:
+        review.comments_cursor = None
+        if review.comment_count > len(review.comment_preview):
+            last = review.comment_preview[-1]
+            review.comments_cursor = encode_cursor(str(last.created_at), last.pk)
+    return page
+
+
+def comments_page(review_id, cursor=None, per_page=COMMENTS_PAGE_SIZE):
+    """Suite du fil de commentaires d'un avis approuvé (CursorPage), auteurs compris"""
+    queryset = Comment.objects.filter(review_id=review_id, review__is_approved=True).select_related('user')
+    return CursorPaginator(queryset, per_page, COMMENTS_ORDERING).page(cursor)
+
+
+def get_product_detail(slug, reviews_limit=REVIEWS_PAGE_SIZE):
+    """Retourne le contexte de la fiche d'un produit actif (Http404 s'il n'existe pas)"""
+    product = get_object_or_404(
+        Product.objects.for_cards().select_related('rating_summary'),
+        slug=slug,
+        is_active=True
+    )
+    summary = product.get_rating_summary()
+
+    reviews = reviews_page(product.pk, per_page=reviews_limit)
+
+    return {
+        'product': product,
+        'images': list(product.images.all()),
+        'reviews': reviews,
+        'review_avg': summary.average if summary else 0,
+        'review_count': summary.count if summary else 0,
+        'related_products': related_products_for(product),
+    }
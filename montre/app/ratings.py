@@ -0,0 +1,50 @@
+"""
+Maintenance du résumé des avis approuvés (ProductRatingSummary).
+
+Chaque enregistrement ou suppression d'avis ajuste le résumé par incréments
+atomiques (F()), dans la même transaction que l'avis. Les mises à jour en
+masse (actions d'administration utilisant queryset.update) ne déclenchent
+pas de signaux : elles doivent appeler reviews_changed.
+"""
+from django.db import transaction
+
+from .catalog import bump_catalog_version, bump_product_version
+from .models_card import ProductCard
+from .models_rating import ProductRatingSummary
+from . import popularity
+
+
+def review_state(review):
+    """Contribution d'un avis au résumé : (produit, note) s'il est approuvé, sinon None"""
+    if review is None or not review.is_approved:
+        return None
+    return review.product_id, review.rating
+
+
+def apply_change(before, after):
+    """Met à jour les résumés entre deux états d'un avis (cf. review_state)"""
+    if before == after:
+        return
+    with transaction.atomic():
+        if before is not None:
+            ProductRatingSummary.apply(*before, delta=-1)
+        if after is not None:
+            ProductRatingSummary.apply(*after, delta=1)
+
+
+def reviews_changed(product_ids):
+    """
+    Resynchronise tout ce qui dépend des avis des produits donnés : résumés,
+    cartes, popularité, versions du catalogue et des produits.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+    with transaction.atomic():
+        ProductRatingSummary.rebuild(product_ids)
+        for product_id in product_ids:
+            ProductCard.refresh(product_id)
+        popularity.update_scores(list(product_ids))
+    bump_catalog_version()
+    for product_id in product_ids:
+        bump_product_version(product_id)
@@ -0,0 +1,257 @@
+"""
+Recommandations de produits (« Vous aimerez aussi »).
+
+Le calcul est fait hors ligne par la commande build_recommendations :
+
+- co-achat : produits commandés par un même lead (commandes non annulées) ;
+- co-favori : produits mis en favori par un même utilisateur ;
+- similarité de catalogue : même catégorie, ou mieux, même sous-catégorie ;
+- associations manuelles (Product.related_products), toujours en tête.
+
+Chaque source produit une matrice creuse de paires (produit, produit) sous
+forme de tableaux NumPy ; les co-occurrences sont normalisées (cosinus) puis
+pondérées et additionnées. Un produit n'appartenant qu'à une catégorie, la
+similarité de catalogue vaut simplement le poids de la catégorie commune : elle
+est comparée directement pour chaque paire candidate, sans construire les n²
+paires d'une grande catégorie ; seuls les TOP_K premiers voisins de catégorie
+de chaque produit sont ajoutés aux candidats. Les TOP_K meilleurs voisins de chaque produit sont
+enregistrés dans ProductRecommendation, lue en une requête indexée. Les
+produits dont la liste change voient leur version incrémentée (fiche rapide
+voir_product mise en cache, voir catalog.py).
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Case, FilteredRelation, IntegerField, Q, Value, When
+
+from .catalog import bump_product_version
+from .models import Order, Product
+from .models_favorite import Favorite
+from .models_recommendation import ProductRecommendation
+
+TOP_K = 8
+
+ORDER_WEIGHT = 1.0
+FAVORITE_WEIGHT = 0.6
+SUBCATEGORY_WEIGHT = 0.15
+CATEGORY_WEIGHT = 0.05
+MANUAL_WEIGHT = 10.0
+
+# Les paniers plus grands (comptes de test, revendeurs...) sont ignorés :
+# ils n'apportent que du bruit et leur nombre de paires croît au carré
+MAX_BASKET_SIZE = 50
+
+
+def group_pairs(groups, items, max_size=MAX_BASKET_SIZE):
+    """
+    Retourne toutes les paires (i, j), i != j, d'éléments appartenant au même groupe.
+    `groups` et `items` sont deux tableaux de même longueur ; les doublons sont ignorés,
+    ainsi que les groupes de plus de `max_size` éléments (None : pas de limite).
+    """
+    if not len(items):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    pairs = np.unique(np.stack([groups, items], axis=1), axis=0)
+    groups, items = pairs[:, 0], pairs[:, 1]
+
+    # Taille et début de chaque groupe, ramenés à chaque élément
+    if max_size is not None:
+        _, sizes = np.unique(groups, return_counts=True)
+        keep = np.repeat(sizes <= max_size, sizes)
+        groups, items = groups[keep], items[keep]
+    _, starts, sizes = np.unique(groups, return_index=True, return_counts=True)
+    item_sizes = np.repeat(sizes, sizes)
+    item_starts = np.repeat(starts, sizes)
+
+    # Produit cartésien de chaque groupe avec lui-même
+    left = np.repeat(items, item_sizes)
+    offsets = np.arange(len(left)) - np.repeat(np.cumsum(item_sizes) - item_sizes, item_sizes)
+    right = items[np.repeat(item_starts, item_sizes) + offsets]
+    distinct = left != right
+    return left[distinct], right[distinct]
+
+
+def group_neighbours(groups, items, limit):
+    """
+    Retourne des paires (i, j), i != j, reliant chaque élément aux `limit` premiers
+    éléments (par indice croissant) de son groupe : au plus n * (limit + 1) paires,
+    quelle que soit la taille des groupes.
+    """
+    if not len(items):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    order = np.lexsort((items, groups))
+    groups, items = groups[order], items[order]
+    _, starts, sizes = np.unique(groups, return_index=True, return_counts=True)
+    # limit + 1 : l'élément lui-même peut figurer parmi les premiers de son groupe
+    counts = np.repeat(np.minimum(sizes, limit + 1), sizes)
+    item_starts = np.repeat(starts, sizes)
+    left = np.repeat(items, counts)
+    offsets = np.arange(len(left)) - np.repeat(np.cumsum(counts) - counts, counts)
+    right = items[np.repeat(item_starts, counts) + offsets]
+    distinct = left != right
+    return left[distinct], right[distinct]
+
+
+def cooccurrence_scores(groups, items, n, max_size=MAX_BASKET_SIZE):
+    """
+    Similarité cosinus entre produits (indices 0..n-1) à partir de leurs groupes
+    communs. Retourne (clés de paires i * n + j, scores).
+    """
+    left, right = group_pairs(groups, items, max_size)
+    if not len(left):
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    keys, counts = np.unique(left * n + right, return_counts=True)
+    # Nombre de groupes distincts contenant chaque produit
+    pairs = np.unique(np.stack([groups, items], axis=1), axis=0)
+    occurrences = np.bincount(pairs[:, 1], minlength=n)
+    i, j = keys // n, keys % n
+    return keys, counts / np.sqrt(occurrences[i] * occurrences[j])
+
+
+def compute_recommendations(top_k=TOP_K):
+    """
+    Calcule les recommandations des produits actifs.
+    Retourne une liste de tuples (product_id, recommended_id, rang, score).
+    """
+    products = list(Product.objects.filter(is_active=True).order_by('id').values_list(
+        'id', 'category_id', 'subcategory_id'
+    ))
+    if not products:
+        return []
+    ids = np.array([row[0] for row in products], dtype=np.int64)
+    n = len(ids)
+
+    def index_of(product_ids):
+        """Indices des produits actifs ; -1 pour les produits inconnus"""
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        positions = np.clip(np.searchsorted(ids, product_ids), 0, n - 1)
+        return np.where(ids[positions] == product_ids, positions, -1)
+
+    def source(rows):
+        """Tableaux (groupes, indices produits) d'une liste de couples (groupe, produit)"""
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        data = np.array(rows, dtype=np.int64)
+        items = index_of(data[:, 1])
+        known = items >= 0
+        return data[known, 0], items[known]
+
+    orders = source(list(
+        Order.objects.exclude(status='cancelled').filter(lead__isnull=False)
+        .values_list('lead_id', 'product_id')
+    ))
+    favorites = source(list(Favorite.objects.values_list('user_id', 'product_id')))
+    # Catégorie et sous-catégorie de chaque produit (0 : aucune)
+    categories = np.array([row[1] or 0 for row in products], dtype=np.int64)
+    subcategories = np.array([row[2] or 0 for row in products], dtype=np.int64)
+    manual = list(Product.related_products.through.objects.values_list('from_product_id', 'to_product_id'))
+
+    all_keys, all_scores = [], []
+    for (groups, items), weight in [(orders, ORDER_WEIGHT), (favorites, FAVORITE_WEIGHT)]:
+        keys, scores = cooccurrence_scores(groups, items, n)
+        all_keys.append(keys)
+        all_scores.append(scores * weight)
+    if manual:
+        pairs = index_of(np.array(manual, dtype=np.int64).ravel()).reshape(-1, 2)
+        pairs = pairs[(pairs >= 0).all(axis=1) & (pairs[:, 0] != pairs[:, 1])]
+        all_keys.append(pairs[:, 0] * n + pairs[:, 1])
+        all_scores.append(np.full(len(pairs), MANUAL_WEIGHT))
+    # Voisins de catalogue : les premiers de chaque groupe suffisent, les autres
+    # ayant un score égal ou inférieur et un indice plus grand (départage)
+    for groups in (categories, subcategories):
+        grouped = np.flatnonzero(groups)
+        left, right = group_neighbours(groups[grouped], grouped, top_k)
+        all_keys.append(left * n + right)
+        all_scores.append(np.zeros(len(left)))
+
+    keys = np.concatenate(all_keys)
+    if not len(keys):
+        return []
+    # Somme des scores par paire, puis similarité de catalogue de chaque paire candidate
+    keys, inverse = np.unique(keys, return_inverse=True)
+    scores = np.bincount(inverse, weights=np.concatenate(all_scores))
+    left, right = keys // n, keys % n
+    for groups, weight in [(categories, CATEGORY_WEIGHT), (subcategories, SUBCATEGORY_WEIGHT)]:
+        scores += weight * ((groups[left] == groups[right]) & (groups[left] != 0))
+
+    # Meilleurs voisins de chaque produit : tri par produit puis score décroissant
+    order = np.lexsort((right, -scores, left))
+    left, right, scores = left[order], right[order], scores[order]
+    _, starts, sizes = np.unique(left, return_index=True, return_counts=True)
+    ranks = np.arange(len(left)) - np.repeat(starts, sizes)
+    keep = ranks < top_k
+
+    return [
+        (int(ids[i]), int(ids[j]), int(rank), float(score))
+        for i, j, rank, score in zip(left[keep], right[keep], ranks[keep], scores[keep])
+    ]
+
+
+def recommendation_lists(rows):
+    """{product_id: [recommended_id, ...]} par rang croissant, à partir de tuples (produit, recommandé, rang)"""
+    lists = defaultdict(list)
+    for product_id, recommended_id, rank in sorted(rows, key=lambda row: (row[0], row[2])):
+        lists[product_id].append(recommended_id)
+    return lists
+
+
+@transaction.atomic
+def rebuild_recommendations(top_k=TOP_K, batch_size=1000):
+    """Remplace la table des recommandations. Retourne le nombre de lignes écrites."""
+    rows = compute_recommendations(top_k)
+    previous = recommendation_lists(ProductRecommendation.objects.values_list('product_id', 'recommended_id', 'rank'))
+    current = recommendation_lists([row[:3] for row in rows])
+    ProductRecommendation.objects.all().delete()
+    ProductRecommendation.objects.bulk_create(
+        [
+            ProductRecommendation(product_id=product_id, recommended_id=recommended_id, rank=rank, score=score)
+            for product_id, recommended_id, rank, score in rows
+        ],
+        batch_size=batch_size
+    )
+    for product_id in previous.keys() | current.keys():
+        if previous.get(product_id) != current.get(product_id):
+            bump_product_version(product_id)
+    return len(rows)
+
+
+def recommended_products(product, limit=4, queryset=None):
+    """
+    Produits recommandés pour un produit, en une requête sur l'index (produit, rang).
+    `queryset` permet de choisir le profil de chargement (ex. for_cards()).
+    """
+    queryset = queryset if queryset is not None else Product.objects.all()
+    return list(
+        queryset.filter(recommended_in__product=product, is_active=True)
+        .order_by('recommended_in__rank')[:limit]
+    )
+
+
+def related_products(product, limit=4, queryset=None):
+    """
+    Produits recommandés par rang, complétés par les produits associés
+    manuellement puis par ceux de la même catégorie (tant que les
+    recommandations n'ont pas été calculées, ou si elles sont trop peu
+    nombreuses). Une seule requête : jointure externe sur la recommandation
+    (au plus une ligne par paire) et tri par priorité.
+    """
+    queryset = queryset if queryset is not None else Product.objects.all()
+    recommended = Q(recommendation__rank__isnull=False)
+    explicit = Q(pk__in=product.related_products.values('pk'))
+    matches = recommended | explicit
+    if product.category_id:
+        matches |= Q(category_id=product.category_id)
+    return list(
+        queryset.annotate(recommendation=FilteredRelation(
+            'recommended_in', condition=Q(recommended_in__product=product)
+        ))
+        .filter(matches, is_active=True)
+        .exclude(pk=product.pk)
+        .annotate(priority=Case(
+            When(recommended, then=Value(0)), When(explicit, then=Value(1)),
+            default=Value(2), output_field=IntegerField()
+        ))
+        .order_by('priority', 'recommendation__rank', '-created_at', '-id')[:limit]
+    )
@@ -0,0 +1,162 @@
+"""
+Recherche plein texte sur le catalogue.
+
+Sous SQLite, l'index est une table virtuelle FTS5 (tokenizer unicode61 sans
+diacritiques) ; sous PostgreSQL, une table de tsvector 'french' + unaccent
+indexée en GIN. L'index est alimenté par les signaux de Product et Category
+(voir signals.py). Sur les autres bases, on retombe sur des `icontains`.
+
+Seuls les MAX_RESULTS produits les plus pertinents sont classés (leur rang est
+une expression CASE, voir filter_queryset) : au-delà, la liste, sa pagination,
+son nombre de résultats et les facettes s'arrêtent à cette limite.
+ranked_product_ids le signale (RankedIds.truncated) pour que l'appelant puisse
+l'indiquer (boutique : « 500+ » et invitation à préciser la recherche ; API :
+`search_truncated`).
+"""
+import re
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from rest_framework.filters import BaseFilterBackend
+
+SEARCH_TABLE = 'app_product_search'
+
+# Nombre maximum de résultats classés renvoyés par l'index
+MAX_RESULTS = 500
+
+
+class RankedIds(list):
+    """Ids classés par pertinence ; `truncated` : d'autres produits correspondent au-delà de la limite"""
+    truncated = False
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_table_exists = None
+
+
+def search_backend():
+    """Retourne le moteur d'index disponible ('sqlite', 'postgresql') ou None"""
+    global _table_exists
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return None
+    if _table_exists is None:
+        _table_exists = SEARCH_TABLE in connection.introspection.table_names()
+    return connection.vendor if _table_exists else None
+
+
+def tokenize(query):
+    """Découpe la saisie de l'utilisateur en termes sûrs pour le moteur d'index"""
+    return TOKEN_RE.findall(query or '')[:10]
+
+
+def ranked_product_ids(query, limit=None):
+    """
+    Retourne les ids (RankedIds) des `limit` (par défaut MAX_RESULTS) produits
+    les plus pertinents pour la recherche, du plus au moins pertinent, ou None
+    sans index disponible.
+    """
+    backend = search_backend()
+    terms = tokenize(query)
+    if backend is None or not terms:
+        return None
+    if limit is None:
+        limit = MAX_RESULTS
+
+    with connection.cursor() as cursor:
+        if backend == 'sqlite':
+            # Recherche par préfixe pour suivre la saisie ("chrono" trouve "chronographe")
+            match = ' '.join(f'"{term}"*' for term in terms)
+            cursor.execute(
+                f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+                f"ORDER BY bm25({SEARCH_TABLE}, 10.0, 1.0, 5.0) LIMIT %s",
+                # Un résultat de plus que la limite : indique s'il y en a d'autres
+                [match, limit + 1]
+            )
+        else:
+            tsquery = ' & '.join(f'{term}:*' for term in terms)
+            cursor.execute(
+                f"SELECT product_id FROM {SEARCH_TABLE} "
+                f"WHERE document @@ to_tsquery('french', unaccent(%s)) "
+                f"ORDER BY ts_rank(document, to_tsquery('french', unaccent(%s))) DESC LIMIT %s",
+                [tsquery, tsquery, limit + 1]
+            )
+        rows = cursor.fetchall()
+    ids = RankedIds(row[0] for row in rows[:limit])
+    ids.truncated = len(rows) > limit
+    return ids
+
+
+def filter_queryset(queryset, query, ids=None):
+    """
+    Filtre un queryset de produits selon la recherche et l'annote avec `search_rank`
+    (0 = plus pertinent), utilisable comme clé de tri.
+    `ids` permet de réutiliser un résultat de ranked_product_ids déjà calculé.
+    """
+    if ids is None:
+        ids = ranked_product_ids(query)
+    if ids is None:
+        # Pas d'index disponible : recherche simple
+        return queryset.filter(
+            Q(name__icontains=query) |
+            Q(description__icontains=query) |
+            Q(category__name__icontains=query)
+        ).annotate(search_rank=Value(0, output_field=IntegerField()))
+    if not ids:
+        return queryset.none().annotate(search_rank=Value(0, output_field=IntegerField()))
+    return queryset.filter(pk__in=ids).annotate(
+        search_rank=Case(
+            *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)],
+            output_field=IntegerField()
+        )
+    )
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    Filtre DRF utilisant l'index plein texte via le paramètre `q`. Les résultats
+    limités à MAX_RESULTS sont signalés par `request.search_truncated` (repris
+    par ProductCursorPagination).
+    """
+    search_param = 'q'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        ids = ranked_product_ids(query)
+        request.search_truncated = bool(ids and ids.truncated)
+        return filter_queryset(queryset, query, ids=ids)
+
+
+def index_product(product):
+    """Ajoute ou met à jour un produit dans l'index"""
+    backend = search_backend()
+    if backend is None:
+        return
+    category = product.category.name if product.category_id else ''
+    with connection.cursor() as cursor:
+        if backend == 'sqlite':
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [product.pk])
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, name, description, category) VALUES (%s, %s, %s, %s)",
+                [product.pk, product.name, product.description, category]
+            )
+        else:
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (product_id, document) VALUES (%s, "
+                f"setweight(to_tsvector('french', unaccent(%s)), 'A') || "
+                f"setweight(to_tsvector('french', unaccent(%s)), 'B') || "
+                f"setweight(to_tsvector('french', unaccent(%s)), 'C')) "
+                f"ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document",
+                [product.pk, product.name, category, product.description]
+            )
+
+
+def remove_product(product_id):
+    """Retire un produit de l'index"""
+    backend = search_backend()
+    if backend is None:
+        return
+    column = 'rowid' if backend == 'sqlite' else 'product_id'
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE {column} = %s", [product_id])
@@ -2,6 +2,8 @@ from rest_framework import serializers
 from .models import Product
 
 class ProductSerializer(serializers.ModelSerializer):
+    image = serializers.CharField(source='card.image_url', read_only=True, default='')
+
     class Meta:
         model = Product
         fields = [
@@ -15,6 +17,8 @@ class ProductSerializer(serializers.ModelSerializer):
         ]
         
 class ProductDetailSerializer(serializers.ModelSerializer):
+    image = serializers.CharField(source='card.image_url', read_only=True, default='')
+
     class Meta:
         model = Product
         fields = [
@@ -1,9 +1,20 @@
-from django.db.models.signals import post_save
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
-from .models import Order, Review
+from .models import Order, Review, Comment, Product, ProductImage, Category
+from .models_card import ProductCard
+from .models_favorite import Favorite
+from .models_recommendation import ProductRecommendation  # noqa: F401 (chargement du modèle)
+from .models_rating import ProductRatingSummary
+from .models_banner import VideoBanner
+from .models_cart import Cart, CartItem
+from . import search, popularity, ratings, images, guest
+from .catalog import bump_catalog_version, bump_product_version
 
 @receiver(post_save, sender=Order)
 def send_order_confirmation_email(sender, instance, created, **kwargs):
@@ -65,3 +76,178 @@ def notify_admin_review_submitted(sender, instance, created, **kwargs):
             recipient_list=[admin[1] for admin in settings.ADMINS],
             fail_silently=True
         )
+
+
+# Champs de Product sans incidence sur la carte (ex. décrément du stock à la commande)
+CARD_IGNORED_FIELDS = {'in_stock', 'updated_at'}
+
+@receiver(post_save, sender=Product)
+def refresh_card_on_product_save(sender, instance, update_fields=None, **kwargs):
+    """Recalcule la carte et l'index de recherche lorsqu'un produit est créé ou modifié."""
+    bump_catalog_version()
+    if update_fields and set(update_fields) <= CARD_IGNORED_FIELDS:
+        return
+    ProductCard.refresh(instance.pk)
+    search.index_product(instance)
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_search(sender, instance, **kwargs):
+    """Retire un produit supprimé de l'index de recherche."""
+    search.remove_product(instance.pk)
+    bump_catalog_version()
+
+# Enregistré avant le recalcul des cartes, qui lisent l'image principale
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def refresh_primary_image(sender, instance, raw=False, **kwargs):
+    """Met à jour l'image de couverture du produit lorsqu'une de ses images change."""
+    if not raw:
+        Product.refresh_primary_image(instance.product_id)
+
+# Enregistrés avant le recalcul des cartes, qui recopient le résumé des avis
+@receiver(pre_save, sender=Review)
+def remember_review_state(sender, instance, **kwargs):
+    """Mémorise l'état approuvé/note de l'avis avant modification."""
+    previous = None
+    if instance.pk:
+        previous = Review.objects.filter(pk=instance.pk).only('product_id', 'rating', 'is_approved').first()
+    instance._rating_state = ratings.review_state(previous)
+
+@receiver(post_save, sender=Review)
+def update_rating_summary(sender, instance, **kwargs):
+    """Répercute la création, la modification ou l'approbation d'un avis sur le résumé."""
+    ratings.apply_change(getattr(instance, '_rating_state', None), ratings.review_state(instance))
+    instance._rating_state = ratings.review_state(instance)
+
+@receiver(post_delete, sender=Review)
+def remove_from_rating_summary(sender, instance, **kwargs):
+    """Retire un avis supprimé du résumé."""
+    ratings.apply_change(ratings.review_state(instance), None)
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Favorite)
+def refresh_card_on_related_save(sender, instance, **kwargs):
+    """Recalcule la carte lorsqu'une image, un avis ou un favori est ajouté ou modifié."""
+    ProductCard.refresh(instance.product_id)
+
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Favorite)
+def refresh_card_on_related_delete(sender, instance, **kwargs):
+    """Recalcule la carte lorsqu'une image, un avis ou un favori est supprimé."""
+    ProductCard.refresh(instance.product_id, create=False)
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_delete, sender=Review)
+def bump_catalog_on_related_change(sender, instance, **kwargs):
+    """Invalide les fragments mis en cache lorsqu'une image ou un avis change."""
+    bump_catalog_version()
+
+@receiver(post_save, sender=Category)
+def refresh_cards_on_category_save(sender, instance, created, **kwargs):
+    """Propage le nom de la catégorie sur les cartes de ses produits."""
+    bump_catalog_version()
+    if not created:
+        ProductCard.objects.filter(product__category=instance).update(category_name=instance.name)
+        for product in instance.products.select_related('category'):
+            search.index_product(product)
+
+@receiver(post_delete, sender=Category)
+def bump_catalog_on_category_delete(sender, instance, **kwargs):
+    """Invalide les caches du catalogue lorsqu'une catégorie est supprimée."""
+    bump_catalog_version()
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Favorite)
+def refresh_popularity(sender, instance, **kwargs):
+    """Recalcule le score de popularité du produit concerné"""
+    if instance.product_id:
+        popularity.refresh_product(instance.product_id)
+
+@receiver(post_save, sender=Product)
+def create_rating_summary(sender, instance, created, **kwargs):
+    """Crée le résumé des avis d'un nouveau produit."""
+    if created:
+        ProductRatingSummary.objects.get_or_create(product=instance)
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_product_on_save(sender, instance, **kwargs):
+    """Invalide la fiche rapide mise en cache d'un produit modifié ou supprimé."""
+    bump_product_version(instance.pk)
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_delete, sender=Review)
+def bump_product_on_related_change(sender, instance, **kwargs):
+    """Invalide la fiche rapide lorsqu'une image ou un avis du produit change."""
+    bump_product_version(instance.product_id)
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_product_on_comment_change(sender, instance, **kwargs):
+    """Invalide la fiche rapide lorsqu'un commentaire d'un de ses avis change."""
+    product_id = Review.objects.filter(pk=instance.review_id).values_list('product_id', flat=True).first()
+    if product_id:
+        bump_product_version(product_id)
+
+@receiver(post_save, sender=ProductImage)
+def schedule_image_derivatives(sender, instance, raw=False, **kwargs):
+    """Génère en arrière-plan les déclinaisons d'une image nouvelle ou remplacée."""
+    if raw or not instance.image:
+        return
+    previous = (instance.derivatives or {}).get('source')
+    if previous == instance.image.name:
+        return
+    if previous:
+        transaction.on_commit(lambda: images.release_derivatives(previous))
+    images.schedule(instance)
+
+@receiver(post_delete, sender=ProductImage)
+def delete_image_derivatives(sender, instance, **kwargs):
+    """Supprime les déclinaisons d'une image supprimée si son fichier n'est plus utilisé."""
+    # Les déclinaisons sont enregistrées par update() : l'instance peut ne pas les connaître
+    source = (instance.derivatives or {}).get('source') or instance.image.name
+    transaction.on_commit(lambda: images.release_derivatives(source))
+
+@receiver(pre_save, sender=ProductImage)
+def store_product_image_metadata(sender, instance, raw=False, **kwargs):
+    """Dimensions, couleur dominante et aperçu flou d'une image produit envoyée."""
+    if not raw:
+        images.update_image_metadata(instance, 'image')
+
+@receiver(pre_save, sender=Category)
+def store_category_image_metadata(sender, instance, raw=False, **kwargs):
+    """Dimensions, couleur dominante et aperçu flou de l'image d'une catégorie."""
+    if not raw:
+        images.update_image_metadata(instance, 'image', prefix='image_')
+
+@receiver(pre_save, sender=VideoBanner)
+def store_banner_thumbnail_metadata(sender, instance, raw=False, **kwargs):
+    """Dimensions, couleur dominante et aperçu flou de la vignette d'une bannière."""
+    if not raw:
+        images.update_image_metadata(instance, 'thumbnail', prefix='thumbnail_')
+
+@receiver(post_delete, sender=CartItem)
+def update_cart_on_product_delete(sender, instance, origin=None, **kwargs):
+    """
+    Retire des totaux du panier les articles supprimés avec leur produit.
+    (Les autres suppressions passent par CartItem.delete(), Cart.remove_item() ou Cart.clear().)
+    """
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is Product:
+        Cart(pk=instance.cart_id).apply_delta(-instance.quantity, -instance.total_price)
+
+@receiver(user_logged_in)
+def migrate_guest_session_on_login(sender, request, user, **kwargs):
+    """Rattache au compte le panier, les favoris et les commandes passés sans être connecté."""
+    if request is not None and hasattr(request, 'session'):
+        guest.migrate_guest_session(request, user)
@@ -0,0 +1,216 @@
+"""
+Instantané du catalogue en mémoire partagée.
+
+Les colonnes utiles au filtrage et au tri des produits actifs (prix, statuts,
+catégorie, date de création, popularité) sont écrites dans un fichier NumPy
+versionné puis projetées en mémoire (mmap) : tous les workers partagent les
+mêmes pages du système de fichiers. Les filtres et tris de la boutique sont
+alors des opérations vectorisées, et seuls les produits de la page affichée
+sont chargés depuis la base.
+
+Le fichier est reconstruit à la première lecture qui suit un changement de
+version du catalogue (voir catalog.py).
+"""
+import glob
+import logging
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+
+from .catalog import get_catalog_version
+from .models import Product
+from .pagination import CursorPage, decode_cursor, encode_cursor
+from . import facets
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('price', np.float64),
+    ('is_new', np.bool_),
+    ('is_bestseller', np.bool_),
+    ('is_featured', np.bool_),
+    ('category_id', np.int64),
+    ('subcategory_id', np.int64),
+    ('created_at', np.int64),  # microsecondes depuis l'epoch (UTC)
+    ('popularity', np.float64),
+])
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+_snapshot = None
+
+
+def snapshot_dir():
+    return getattr(settings, 'CATALOG_SNAPSHOT_DIR', os.path.join(settings.BASE_DIR, 'cache', 'snapshots'))
+
+
+def to_timestamp(value):
+    """Convertit une date en microsecondes depuis l'epoch"""
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def from_timestamp(value):
+    return EPOCH + timedelta(microseconds=int(value))
+
+
+# Conversion des clés de tri : valeur du curseur -> colonne, colonne -> valeur du curseur
+CURSOR_CODECS = {
+    'created_at': (lambda value: to_timestamp(datetime.fromisoformat(value)), lambda x: str(from_timestamp(x))),
+    'price': (lambda value: float(Decimal(value)), lambda x: str(Decimal(repr(float(x))))),
+    'popularity': (float, lambda x: str(float(x))),
+    'search_rank': (int, lambda x: str(int(x))),
+}
+
+
+def build_snapshot(path):
+    """Écrit l'instantané des produits actifs dans `path` (écriture atomique)"""
+    rows = Product.objects.filter(is_active=True).order_by('id').values_list(
+        'id', 'price', 'is_new', 'is_bestseller', 'is_featured',
+        'category_id', 'subcategory_id', 'created_at', 'popularity'
+    )
+    data = np.fromiter(
+        (
+            (pk, float(price), is_new, is_bestseller, is_featured,
+             category_id or 0, subcategory_id or 0, to_timestamp(created_at), popularity)
+            for pk, price, is_new, is_bestseller, is_featured,
+            category_id, subcategory_id, created_at, popularity in rows.iterator()
+        ),
+        dtype=SNAPSHOT_DTYPE
+    )
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        np.save(f, data)
+    os.replace(tmp_path, path)
+
+
+def remove_old_snapshots(keep):
+    """Supprime les instantanés des versions précédentes"""
+    for path in glob.glob(os.path.join(snapshot_dir(), 'catalog-*.npy')):
+        if path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def get_snapshot():
+    """
+    Retourne l'instantané correspondant à la version courante du catalogue,
+    en le reconstruisant si nécessaire. Retourne None en cas d'échec : les
+    appelants se rabattent alors sur la base de données.
+    """
+    global _snapshot
+    version = get_catalog_version()
+    if _snapshot is not None and _snapshot.version == version:
+        return _snapshot
+
+    path = os.path.join(snapshot_dir(), f'catalog-{version}.npy')
+    try:
+        if not os.path.exists(path):
+            build_snapshot(path)
+            remove_old_snapshots(keep=path)
+        _snapshot = CatalogSnapshot(version, np.load(path, mmap_mode='r'))
+    except (OSError, ValueError) as e:
+        logger.error(f"Instantané du catalogue indisponible : {str(e)}")
+        return None
+    return _snapshot
+
+
+class CatalogSnapshot:
+    """Colonnes du catalogue projetées en mémoire, filtrables et triables"""
+
+    def __init__(self, version, data):
+        self.version = version
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def filter(self, ids=None, category_id=None, subcategory_id=None, status='', price=''):
+        """Retourne les positions des produits correspondant aux filtres"""
+        data = self.data
+        mask = np.ones(len(data), dtype=bool)
+        if ids is not None:
+            mask &= np.isin(data['id'], ids)
+        if category_id:
+            mask &= data['category_id'] == category_id
+        if subcategory_id:
+            mask &= data['subcategory_id'] == subcategory_id
+        if status in facets.STATUS_FIELDS:
+            mask &= data[facets.STATUS_FIELDS[status]]
+        for key, label, low, high in facets.PRICE_BUCKETS:
+            if key == price:
+                if low is not None:
+                    mask &= data['price'] >= float(low)
+                if high is not None:
+                    mask &= data['price'] < float(high)
+        return np.flatnonzero(mask)
+
+    def paginate(self, positions, ordering, cursor, per_page, queryset, ranks=None):
+        """
+        Trie les positions selon `ordering` (champ, id) et retourne une CursorPage
+        dont les produits sont chargés depuis `queryset`. Les jetons de curseur
+        sont compatibles avec ceux de CursorPaginator.
+        """
+        field = ordering[0].lstrip('-')
+        sign = -1 if ordering[0].startswith('-') else 1
+        ids = self.data['id'][positions]
+        if field == 'search_rank':
+            values = np.asarray([ranks[pk] for pk in ids], dtype=np.int64)
+        else:
+            values = self.data[field][positions]
+
+        # Clés signées : l'ordre décroissant devient un ordre croissant
+        keys = values * sign
+        id_keys = ids * sign
+        order = np.lexsort((id_keys, keys))
+        keys, id_keys = keys[order], id_keys[order]
+
+        position = decode_cursor(cursor)
+        reverse = False
+        start, end = 0, len(order)
+        if position is not None:
+            value, pk, reverse = position
+            try:
+                value = CURSOR_CODECS[field][0](value) * sign
+            except (KeyError, ValueError, TypeError, ArithmeticError):
+                # Jeton falsifié ou périmé : on repart de la première page
+                position, reverse = None, False
+            else:
+                pk *= sign
+                before = keys < value
+                if reverse:
+                    end = int(np.count_nonzero(before | ((keys == value) & (id_keys < pk))))
+                else:
+                    start = int(np.count_nonzero(before | ((keys == value) & (id_keys <= pk))))
+
+        if reverse:
+            selected = order[max(end - per_page, 0):end]
+            has_more = end > per_page
+        else:
+            selected = order[start:start + per_page]
+            has_more = len(order) - start > per_page
+
+        page_ids = [int(pk) for pk in ids[selected]]
+        products = queryset.in_bulk(page_ids)
+        rows = [products[pk] for pk in page_ids if pk in products]
+
+        next_cursor = previous_cursor = None
+        if len(selected):
+            encode = CURSOR_CODECS[field][1]
+            if has_more or reverse:
+                last = selected[-1]
+                next_cursor = encode_cursor(encode(values[last]), int(ids[last]))
+            if position is not None and (has_more or not reverse):
+                first = selected[0]
+                previous_cursor = encode_cursor(encode(values[first]), int(ids[first]), reverse=True)
+
+        return CursorPage(rows, next_cursor, previous_cursor, total=len(order))
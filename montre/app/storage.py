@@ -0,0 +1,66 @@
+"""
+Backends de stockage du projet.
+"""
+import hashlib
+import os
+import posixpath
+
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    Fichiers statiques renommés avec leur empreinte et précompressés, servis par
+    WhiteNoise avec un cache immuable. Un fichier absent de la collecte (ex. une
+    vidéo déposée directement sur le serveur) garde son URL non versionnée au
+    lieu de provoquer une erreur de rendu.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Fichiers envoyés nommés d'après l'empreinte SHA-256 de leur contenu, dans le
+    dossier prévu par upload_to (ex. products/3f2a…9c.jpg). Un fichier identique
+    déjà présent n'est pas réécrit : les deux enregistrements partagent le même
+    nom. Un nom ne désignant jamais qu'un seul contenu, les fichiers sont servis
+    avec un cache immuable (voir media.cache_control).
+
+    Les fichiers pouvant être partagés, ils ne doivent être supprimés qu'une fois
+    plus aucun enregistrement ne les référence.
+    """
+    hash_length = 32
+
+    def content_hash(self, content):
+        """Empreinte du contenu (tronquée à hash_length caractères)"""
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        return digest.hexdigest()[:self.hash_length]
+
+    def hashed_name(self, name, content):
+        """Nom définitif : dossier d'origine, empreinte et extension (en minuscules)"""
+        directory, filename = posixpath.split(name.replace(os.sep, '/'))
+        extension = os.path.splitext(filename)[1].lower()
+        return posixpath.join(directory, self.content_hash(content) + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Même contenu déjà stocké : on référence le fichier existant
+            return name
+        return super().save(name, content, max_length=max_length)
@@ -0,0 +1,95 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from app import images
+
+register = template.Library()
+
+# Préfixe des champs de métadonnées (width, height, dominant_color, placeholder)
+# selon le modèle : ProductImage, ProductCard/Category, VideoBanner
+METADATA_PREFIXES = ('', 'image_', 'thumbnail_')
+
+
+def _resolve(source):
+    """Retourne (déclinaisons, URL de l'original) d'une ProductImage ou d'une ProductCard."""
+    if source is None:
+        return {}, ''
+    if hasattr(source, 'image_derivatives'):
+        return source.image_derivatives, source.image_url
+    if hasattr(source, 'derivatives'):
+        return source.derivatives, source.image.url if source.image else ''
+    # Category, VideoBanner : pas de déclinaisons, image originale
+    field_file = getattr(source, 'image', None) or getattr(source, 'thumbnail', None)
+    return {}, field_file.url if field_file else ''
+
+
+def _metadata(source):
+    """Retourne (largeur, hauteur, couleur dominante, aperçu flou) d'une image."""
+    for prefix in METADATA_PREFIXES:
+        if hasattr(source, f'{prefix}placeholder'):
+            return tuple(getattr(source, f'{prefix}{key}') for key in ('width', 'height', 'dominant_color', 'placeholder'))
+    return None, None, '', ''
+
+
+@register.filter(name='derivative_url')
+def derivative_url(source, width=640):
+    """URL JPEG de la déclinaison adaptée à `width` (l'original à défaut)."""
+    derivatives, original = _resolve(source)
+    return images.derivative_url(derivatives, int(width)) or original
+
+
+@register.filter(name='srcset')
+def srcset(source, fmt='jpeg'):
+    """Attribut srcset des déclinaisons d'un format ('jpeg' ou 'webp')."""
+    derivatives, _ = _resolve(source)
+    return images.srcset(derivatives, fmt)
+
+
+@register.filter(name='placeholder_style')
+def placeholder_style(source):
+    """Style CSS d'attente : couleur dominante et aperçu flou en arrière-plan."""
+    if source is None:
+        return ''
+    _, _, color, placeholder = _metadata(source)
+    rules = []
+    if color:
+        rules.append(f'background-color: {color}')
+    if placeholder:
+        rules.append(f'background-image: url({placeholder}); background-size: cover; background-position: center')
+    return '; '.join(rules)
+
+
+@register.simple_tag
+def picture(source, sizes='100vw', width=640, **attrs):
+    """
+    Élément <picture> responsive : WebP pour les navigateurs qui le gèrent,
+    JPEG sinon. Les autres arguments (alt, class, loading, id...) sont
+    reportés sur la balise <img>, qui reçoit aussi ses dimensions (pas de
+    décalage de mise en page) et l'aperçu flou en attendant le chargement.
+        {% picture product.card sizes="(min-width: 768px) 33vw, 100vw" alt=product.name class="w-full" %}
+    """
+    derivatives, original = _resolve(source)
+    intrinsic_width, intrinsic_height, _, placeholder = _metadata(source)
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    if intrinsic_width and intrinsic_height:
+        attrs.setdefault('width', intrinsic_width)
+        attrs.setdefault('height', intrinsic_height)
+    style = placeholder_style(source)
+    if style:
+        attrs['style'] = '; '.join(filter(None, [attrs.get('style'), style]))
+        if placeholder:
+            # Retiré au chargement par static/js/placeholders.js
+            attrs['data-placeholder'] = ''
+    img_attrs = format_html_join('', ' {}="{}"', ((k, v) for k, v in attrs.items() if v is not None))
+    if not derivatives:
+        # Déclinaisons pas encore générées : image originale
+        return format_html('<img src="{}"{}>', original, img_attrs)
+    return format_html(
+        # display: contents laisse la mise en page (flex, absolute...) s'appliquer à l'<img>
+        '<picture style="display: contents"><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        images.srcset(derivatives, 'webp'), sizes,
+        images.derivative_url(derivatives, int(width)), images.srcset(derivatives, 'jpeg'), sizes,
+        img_attrs,
+    )
@@ -1,3 +1,1422 @@
-from django.test import TestCase
+import base64
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from PIL import Image
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+
+from . import catalog, facets, images, popularity, product_detail, ratings, recommendations, search
+from . import snapshot as catalog_snapshot
+from .context_processors import cart_context
+from .cart import COOKIE_SALT, CookieCart, get_cart, get_cookie_cart, persist_cart
+from .middleware import CartCookieMiddleware
+from .models import Category, Comment, CustomerLead, Order, Product, ProductImage, Review, SubCategory
+from .models_card import ProductCard
+from .models_rating import ProductRatingSummary
+from .models_recommendation import ProductRecommendation
+from .models_cart import Cart, CartItem
+from .models_favorite import Favorite
+from .pagination import CURSOR_ORDERINGS, decode_cursor, encode_cursor
+from .storage import StaticFilesStorage
+
+
+# Caches en mémoire : les tests ne touchent pas aux caches fichiers de l'instance locale
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+    'counters': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'counters'},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CatalogTestCase(TestCase):
+    """Caches vidés et instantanés du catalogue dans un répertoire temporaire, à chaque test"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        catalog.cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        snapshot_settings = override_settings(CATALOG_SNAPSHOT_DIR=directory)
+        snapshot_settings.enable()
+        self.addCleanup(snapshot_settings.disable)
+        catalog_snapshot._snapshot = None
+
+
+class MediaTestCase(CatalogTestCase):
+    """Médias envoyés dans un MEDIA_ROOT temporaire, déclinaisons générées dans la requête"""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=directory, IMAGE_DERIVATIVES_ASYNC=False)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def media_path(self, name):
+        return os.path.join(settings.MEDIA_ROOT, name)
+
+
+def make_upload(name='montre.jpg', size=(1000, 500), color=(200, 30, 30), exif=None):
+    """Image JPEG envoyée, générée en mémoire"""
+    buffer = BytesIO()
+    image = Image.new('RGB', size, color)
+    image.save(buffer, 'JPEG', exif=exif or Image.Exif())
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+def make_product(index, **fields):
+    """Crée un produit actif minimal"""
+    values = {
+        'name': f'Montre {index}',
+        'slug': f'montre-{index}',
+        'description': f'Description de la montre {index}',
+        'price': 1000 + index,
+    }
+    values.update(fields)
+    return Product.objects.create(**values)
+
+
+def forge_cursor(payload):
+    """Jeton de curseur bien formé (base64 JSON) mais au contenu arbitraire"""
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+class CursorPaginationTests(CatalogTestCase):
+    """Pagination par curseur de l'API des produits"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(15):
+            make_product(index)
+
+    def get_api(self, **params):
+        response = self.client.get('/api/products/', params, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_decode_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor('12.50', 3, reverse=True)), ('12.50', 3, True))
+
+    def test_pages_follow_each_other(self):
+        first = self.get_api(sort='price_asc')
+        second = self.get_api(sort='price_asc', cursor=first['next_cursor'])
+        ids = [p['id'] for p in first['results'] + second['results']]
+        self.assertEqual(len(ids), 15)
+        self.assertEqual(len(set(ids)), 15)
+        self.assertIsNone(second['next_cursor'])
+
+    def test_forged_cursors_fall_back_to_first_page(self):
+        payloads = [[[1], 1, 'n'], [None, 1, 'n'], ['abc', 1, 'n'], ['1', 'x', 'n'], ['1', True, 'n'], ['1', 1, 'z'], {'a': 1}, 'abc']
+        for sort in CURSOR_ORDERINGS:
+            first_page = [p['id'] for p in self.get_api(sort=sort)['results']]
+            for payload in payloads:
+                with self.subTest(sort=sort, payload=payload):
+                    results = self.get_api(sort=sort, cursor=forge_cursor(payload))['results']
+                    self.assertEqual([p['id'] for p in results], first_page)
+        newest = [p['id'] for p in self.get_api()['results']]
+        self.assertEqual([p['id'] for p in self.get_api(cursor='%%%')['results']], newest)
+
+
+class ProductSearchTests(CatalogTestCase):
+    """Recherche plein texte de l'API des produits (paramètre q)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        make_product(1, name='Chronographe Aviateur')
+        make_product(2, name='Montre Plongée')
+
+    def get_api(self, **params):
+        response = self.client.get('/api/products/', params, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_search_returns_matching_products(self):
+        names = [p['name'] for p in self.get_api(q='chronographe')['results']]
+        self.assertEqual(names, ['Chronographe Aviateur'])
+
+    def test_blank_query_lists_everything(self):
+        self.assertEqual(len(self.get_api(q='   ')['results']), 2)
+
+    def test_index_follows_products_and_categories(self):
+        self.assertIsNotNone(search.search_backend())
+        product = Product.objects.get(name='Montre Plongée')
+        product.name = 'Montre Squelette'
+        product.save()
+        self.assertEqual(search.ranked_product_ids('plongee'), [])
+        self.assertEqual(search.ranked_product_ids('squelette'), [product.pk])
+
+        product.category = Category.objects.create(name='Chronographe', slug='chronographe')
+        product.save()
+        self.assertEqual(search.ranked_product_ids('chronographe')[0], Product.objects.get(name='Chronographe Aviateur').pk)
+        self.assertEqual(len(search.ranked_product_ids('chronographe')), 2)
+
+        product.delete()
+        self.assertEqual(search.ranked_product_ids('squelette'), [])
+
+    def test_blank_query_lists_everything_in_shop(self):
+        response = self.client.get('/boutique/', {'q': '  '}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['products']), 2)
+        self.assertEqual(response.context['current_query'], '')
+        self.assertEqual(response.context['active_filters'], [])
+
+    def test_shop_query_is_stripped(self):
+        response = self.client.get('/boutique/', {'q': ' chronographe '}, secure=True)
+        self.assertEqual([p.name for p in response.context['products']], ['Chronographe Aviateur'])
+        self.assertEqual(response.context['current_query'], 'chronographe')
+
+    def test_truncated_results_are_reported(self):
+        make_product(3, name='Montre Squelette')
+        make_product(4, name='Montre Pilote')
+        ids = search.ranked_product_ids('montre', limit=3)
+        self.assertEqual((len(ids), ids.truncated), (3, True))
+        self.assertFalse(search.ranked_product_ids('montre', limit=4).truncated)
+        self.assertFalse(self.get_api(q='montre')['search_truncated'])
+
+        with mock.patch.object(search, 'MAX_RESULTS', 2):
+            api = self.get_api(q='montre')
+            self.assertTrue(api['search_truncated'])
+            self.assertEqual(len(api['results']), 2)
+            self.assertIsNone(api['next_cursor'])
+
+            response = self.client.get('/boutique/', {'q': 'montre'}, secure=True)
+            self.assertTrue(response.context['search_truncated'])
+            self.assertContains(response, 'Seuls les 2 résultats les plus pertinents')
+
+            cards = self.client.get('/boutique/cartes/', {'q': 'montre', 'limit': 1}, secure=True)
+            self.assertEqual(cards['X-Search-Truncated'], '1')
+            last = self.client.get(
+                '/boutique/cartes/', {'q': 'montre', 'limit': 1, 'cursor': cards['X-Next-Cursor']}, secure=True
+            )
+            self.assertContains(last, 'précisez votre recherche')
+
+
+class CatalogVersionTests(CatalogTestCase):
+    """Les versions du catalogue ne changent qu'après validation de la transaction"""
+
+    def test_bumps_wait_for_commit(self):
+        catalog_version = catalog.get_catalog_version()
+        product_version = catalog.get_product_version(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            catalog.bump_catalog_version()
+            catalog.bump_product_version(1)
+            self.assertEqual(catalog.get_catalog_version(), catalog_version)
+            self.assertEqual(catalog.get_product_version(1), product_version)
+        self.assertGreater(catalog.get_catalog_version(), catalog_version)
+        self.assertGreater(catalog.get_product_version(1), product_version)
+
+    def test_versions_survive_fragment_cache_purge(self):
+        catalog.cache.set(catalog.CATALOG_VERSION_KEY, 7, None)
+        catalog.cache.set(catalog.PRODUCT_VERSION_KEY % 1, 3, None)
+        cache.clear()
+        self.assertEqual(catalog.get_catalog_version(), 7)
+        self.assertEqual(catalog.get_product_version(1), 3)
+
+
+class GuestLoginMigrationTests(CatalogTestCase):
+    """Reprise du panier du visiteur dans son compte à la connexion"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', 'client@example.com', 'secret-pass')
+        cls.first = make_product(1, in_stock=10)
+        cls.second = make_product(2, in_stock=10)
+
+    def set_cookie_cart(self, value):
+        signer = signing.get_cookie_signer(salt=settings.CART_COOKIE_NAME + COOKIE_SALT)
+        self.client.cookies[settings.CART_COOKIE_NAME] = signer.sign(value)
+
+    def login(self):
+        response = self.client.post('/login/', {'username': 'client', 'password': 'secret-pass'}, secure=True)
+        self.assertEqual(response.status_code, 302)
+
+    def test_session_and_cookie_carts_are_merged(self):
+        session = self.client.session
+        session.save()
+        guest_cart = Cart.objects.create(session_key=session.session_key)
+        guest_cart.add_item(self.first, 2)
+        self.set_cookie_cart(f'{self.first.pk}:1|{self.second.pk}:3')
+
+        self.login()
+
+        cart = Cart.objects.get(user=self.user)
+        self.assertEqual(
+            dict(cart.items.values_list('product_id', 'quantity')),
+            {self.first.pk: 3, self.second.pk: 3},
+        )
+        self.assertEqual(cart.item_count, 6)
+        self.assertFalse(Cart.objects.filter(pk=guest_cart.pk).exists())
+        self.assertEqual(self.client.cookies[settings.CART_COOKIE_NAME].value, '')
+
+    def test_login_without_guest_data_creates_no_cart(self):
+        self.login()
+        self.assertFalse(Cart.objects.filter(user=self.user).exists())
+
+    def test_favorites_and_guest_orders_are_attached(self):
+        other_lead = CustomerLead.objects.create(email='autre@example.com', first_name='Autre')
+        guest_order = Order.objects.create(lead=other_lead, product=self.first)
+        Order.objects.filter(pk=guest_order.pk).update(lead=None)
+        foreign_order = Order.objects.create(lead=other_lead, product=self.second)
+        Favorite.objects.create(user=self.user, product=self.first)
+        session = self.client.session
+        session['favorites'] = [self.first.pk, self.second.pk, 999]
+        session['recent_orders'] = [guest_order.pk, foreign_order.pk]
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+        self.login()
+
+        self.assertEqual(
+            set(Favorite.objects.filter(user=self.user).values_list('product_id', flat=True)),
+            {self.first.pk, self.second.pk},
+        )
+        lead = CustomerLead.objects.get(email=self.user.email)
+        self.assertEqual(Order.objects.get(pk=guest_order.pk).lead, lead)
+        self.assertEqual(Order.objects.get(pk=foreign_order.pk).lead, other_lead)
+        session = self.client.session
+        self.assertNotIn('favorites', session)
+        self.assertNotIn('recent_orders', session)
+
+
+class PopularityTests(CatalogTestCase):
+    """Score de popularité maintenu par les signaux"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', 'client@example.com', 'secret-pass')
+        cls.product = make_product(1)
+
+    def test_new_favorite_updates_score_and_catalog_version(self):
+        version = catalog.get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.user, product=self.product)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.popularity, popularity.FAVORITE_WEIGHT)
+        self.assertGreater(catalog.get_catalog_version(), version)
+
+    def test_unchanged_score_keeps_catalog_version(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            popularity.refresh_product(self.product.pk)
+        self.assertEqual(callbacks, [])
+
+    def test_events_decay_and_cancelled_orders_are_ignored(self):
+        lead = CustomerLead.objects.create(email='lead@example.com')
+        order = Order.objects.create(lead=lead, product=self.product, quantity=2)
+        Order.objects.create(lead=lead, product=self.product, status='cancelled')
+        now = timezone.now()
+        Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(days=popularity.HALF_LIFE_DAYS))
+        score = popularity.compute_scores([self.product.pk], now=now)[self.product.pk]
+        self.assertAlmostEqual(score, popularity.ORDER_WEIGHT * 2 * 0.5, places=3)
+
+    def test_popular_sort_follows_stored_scores(self):
+        other = make_product(2)
+        Favorite.objects.create(user=self.user, product=other)
+        ids = [p['id'] for p in self.client.get('/api/products/', {'sort': 'popular'}, secure=True).json()['results']]
+        self.assertEqual(ids, [other.pk, self.product.pk])
+
+        Product.objects.update(popularity=0)
+        call_command('update_popularity', stdout=StringIO())
+        self.assertEqual(Product.objects.get(pk=other.pk).popularity, popularity.FAVORITE_WEIGHT)
+
+
+class QuickViewTests(CatalogTestCase):
+    """Fiche rapide voir_product mise en cache par version du produit"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Plongée', slug='plongee')
+        cls.first = make_product(1, category=category)
+        cls.second = make_product(2, category=category)
+
+    def test_unknown_product_creates_no_version(self):
+        response = self.client.get('/voir-produit/999999/', secure=True)
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(catalog.cache.get(catalog.PRODUCT_VERSION_KEY % 999999))
+
+    def test_quick_view_is_rendered(self):
+        response = self.client.get(f'/voir-produit/{self.first.pk}/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.first.name)
+
+    def test_quick_view_is_cached_until_product_changes(self):
+        path = f'/voir-produit/{self.first.pk}/'
+        etag = self.client.get(path, secure=True)['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(path, secure=True, headers={'If-None-Match': etag}).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.name = 'Montre renommée'
+            self.first.save()
+        response = self.client.get(path, secure=True, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Montre renommée')
+
+    def test_comment_is_not_hidden_by_if_modified_since(self):
+        path = f'/voir-produit/{self.first.pk}/'
+        response = self.client.get(path, secure=True)
+        self.assertNotIn('Last-Modified', response)
+        user = User.objects.create_user('client', 'client@example.com', 'secret-pass')
+        review = Review.objects.create(product=self.first, rating=5, title='Avis', comment='Belle', is_approved=True)
+        since = http_date(catalog.get_catalog_modified() + 60)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(review=review, user=user, content='Merci pour cet avis')
+        response = self.client.get(path, secure=True, headers={'If-Modified-Since': since})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Merci pour cet avis')
+
+    def test_recommended_cards_follow_their_products(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            recommendations.rebuild_recommendations()
+        path = f'/voir-produit/{self.first.pk}/'
+        response = self.client.get(path, secure=True)
+        self.assertContains(response, self.second.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.name = 'Voisine renommée'
+            self.second.save()
+        response = self.client.get(path, secure=True, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Voisine renommée')
+
+    def test_visitor_state_is_not_cached(self):
+        user = User.objects.create_user('client', 'client@example.com', 'secret-pass')
+        Favorite.objects.create(user=user, product=self.first)
+        self.client.force_login(user)
+        response = self.client.get(f'/voir-produit/{self.first.pk}/etat/', secure=True)
+        self.assertEqual(response.json()['is_favorite'], True)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_rebuilding_recommendations_bumps_changed_products(self):
+        version = catalog.get_product_version(self.first.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            recommendations.rebuild_recommendations()
+        self.assertGreater(catalog.get_product_version(self.first.pk), version)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            recommendations.rebuild_recommendations()
+        self.assertEqual(callbacks, [])
+
+
+class RecommendationTests(CatalogTestCase):
+    """Recommandations calculées hors ligne (co-favoris, catégories)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Plongée', slug='plongee')
+        cls.products = [make_product(index, category=category) for index in range(20)]
+
+    def test_category_neighbours_are_bounded(self):
+        groups = np.zeros(1000, dtype=np.int64)
+        left, right = recommendations.group_neighbours(groups, np.arange(1000), 3)
+        self.assertLessEqual(len(left), 1000 * 4)
+        self.assertFalse((left == right).any())
+
+    def test_co_favorites_rank_before_category(self):
+        user = User.objects.create_user('client', 'client@example.com', 'secret-pass')
+        first, last = self.products[0], self.products[-1]
+        Favorite.objects.create(user=user, product=first)
+        Favorite.objects.create(user=user, product=last)
+        rows = recommendations.compute_recommendations(top_k=3)
+        first_rows = [row[1] for row in rows if row[0] == first.pk]
+        self.assertEqual(first_rows, [last.pk, self.products[1].pk, self.products[2].pk])
+        self.assertEqual(len(rows), 3 * len(self.products))
+
+    def test_manual_associations_then_co_purchases(self):
+        first, bought, manual = self.products[0], self.products[10], self.products[15]
+        first.related_products.add(manual)
+        lead = CustomerLead.objects.create(email='lead@example.com')
+        Order.objects.create(lead=lead, product=first)
+        Order.objects.create(lead=lead, product=bought)
+        Order.objects.create(lead=lead, product=self.products[5], status='cancelled')
+        call_command('build_recommendations', top_k=3, stdout=StringIO())
+        self.assertEqual(
+            recommendations.recommended_products(first, limit=3),
+            [manual, bought, self.products[1]],
+        )
+
+
+class ProductCardTests(CatalogTestCase):
+    """Carte produit et résumé des avis maintenus par les signaux"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', 'client@example.com', 'secret-pass')
+        cls.product = make_product(1)
+
+    def add_review(self, rating, is_approved=True, product=None):
+        return Review.objects.create(
+            product=product or self.product, rating=rating, title='Avis', comment='Commentaire', is_approved=is_approved
+        )
+
+    def card(self):
+        return ProductCard.objects.get(product=self.product)
+
+    def test_card_copies_the_rating_summary(self):
+        self.add_review(4)
+        pending = self.add_review(1, is_approved=False)
+        self.add_review(2)
+        summary = ProductRatingSummary.objects.get(product=self.product)
+        self.assertEqual((summary.count, summary.rating_sum, summary.stars_4), (2, 6, 1))
+        self.assertEqual((self.card().review_count, self.card().average_rating), (2, 3.0))
+
+        pending.is_approved = True
+        pending.save()
+        self.assertEqual((self.card().review_count, self.card().average_rating), (3, 7 / 3))
+
+        pending.delete()
+        self.assertEqual((self.card().review_count, self.card().average_rating), (2, 3.0))
+
+    def test_rating_change_moves_review_between_stars(self):
+        review = self.add_review(5)
+        review.rating = 2
+        review.save()
+        summary = ProductRatingSummary.objects.get(product=self.product)
+        self.assertEqual(summary.star_counts, {'1': 0, '2': 1, '3': 0, '4': 0, '5': 0})
+        self.assertEqual(summary.average, 2)
+
+    def test_bulk_approval_is_resynchronised(self):
+        self.add_review(4, is_approved=False)
+        self.add_review(2, is_approved=False)
+        Review.objects.update(is_approved=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            ratings.reviews_changed([self.product.pk])
+        summary = ProductRatingSummary.objects.get(product=self.product)
+        self.assertEqual((summary.count, summary.rating_sum), (2, 6))
+        self.assertEqual((self.card().review_count, self.card().average_rating), (2, 3.0))
+        self.product.refresh_from_db()
+        self.assertGreater(self.product.popularity, 0)
+
+    def test_card_follows_product_and_favorites(self):
+        self.product.name = 'Montre renommée'
+        self.product.save()
+        Favorite.objects.create(user=self.user, product=self.product)
+        card = self.card()
+        self.assertEqual(card.image_alt, 'Montre renommée')
+        self.assertEqual(card.likes_count, 1)
+
+    def test_for_cards_needs_no_extra_queries(self):
+        self.add_review(4)
+        Favorite.objects.create(user=self.user, product=self.product)
+        with self.assertNumQueries(2):
+            products = list(Product.objects.for_cards())
+            values = [
+                (p.average_rating, p.review_count, p.likes_count, p.main_image, p.category, list(p.images.all()))
+                for p in products
+            ]
+        self.assertEqual(values, [(4.0, 1, 1, None, None, [])])
+
+    def test_category_rename_updates_cards(self):
+        category = Category.objects.create(name='Plongée', slug='plongee')
+        self.product.category = category
+        self.product.save()
+        self.assertEqual(self.card().category_name, 'Plongée')
+        category.name = 'Plongée profonde'
+        category.save()
+        self.assertEqual(self.card().category_name, 'Plongée profonde')
+
+    def test_listing_queries_do_not_grow_with_products(self):
+        def count_queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/boutique/', secure=True)
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        few = count_queries()
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(2, 10):
+                product = make_product(index)
+                self.add_review(5, product=product)
+                Favorite.objects.create(user=self.user, product=product)
+        self.assertEqual(count_queries(), few)
+
+
+class FacetTests(CatalogTestCase):
+    """Compteurs de la sidebar de la boutique"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Plongée', slug='plongee')
+        cls.other = Category.objects.create(name='Ville', slug='ville')
+        make_product(1, price=30000, is_new=True, category=cls.category)
+        make_product(2, price=75000, is_new=True, is_featured=True, category=cls.category)
+        make_product(3, price=75000, is_bestseller=True, category=cls.other)
+        make_product(4, price=600000, category=cls.other)
+        make_product(5, price=600000, is_new=True, is_active=False, category=cls.other)
+
+    def price_counts(self, result):
+        return {bucket['key']: bucket['count'] for bucket in result['price']}
+
+    def test_counts_without_filters(self):
+        result = facets.get_facets()
+        self.assertEqual(result['total'], 4)
+        self.assertEqual(self.price_counts(result), {
+            '0-50000': 1, '50000-100000': 2, '100000-200000': 0, '200000-500000': 0, '500000-': 1,
+        })
+        self.assertEqual(result['status'], {'new': 2, 'bestseller': 1, 'featured': 1})
+        self.assertEqual(result['categories'], {str(self.category.pk): 2, str(self.other.pk): 2})
+
+    def test_each_dimension_ignores_its_own_filter(self):
+        result = facets.get_facets(status='new', price='50000-100000')
+        self.assertEqual(result['total'], 1)
+        # Tranches comptées parmi les nouveautés, statuts parmi la tranche choisie
+        self.assertEqual(self.price_counts(result)['0-50000'], 1)
+        self.assertEqual(self.price_counts(result)['50000-100000'], 1)
+        self.assertEqual(result['status'], {'new': 1, 'bestseller': 1, 'featured': 1})
+        self.assertEqual(result['categories'], {str(self.category.pk): 1})
+
+    def test_category_filter(self):
+        result = facets.get_facets(category_id=self.other.pk)
+        self.assertEqual(result['total'], 2)
+        self.assertEqual(result['status'], {'new': 0, 'bestseller': 1, 'featured': 0})
+        self.assertEqual(result['categories'], {str(self.category.pk): 2, str(self.other.pk): 2})
+
+    def test_results_are_cached_per_catalog_version(self):
+        facets.get_facets(status='new')
+        with self.assertNumQueries(0):
+            facets.get_facets(status='new', price='inconnu')
+        with self.captureOnCommitCallbacks(execute=True):
+            make_product(6, price=30000, is_new=True)
+        self.assertEqual(facets.get_facets(status='new')['total'], 3)
+
+
+class CatalogSnapshotTests(CatalogTestCase):
+    """Boutique filtrée et triée depuis l'instantané du catalogue ou depuis la base"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Plongée', slug='plongee')
+        subcategory = SubCategory.objects.create(name='Automatique', slug='automatique', category=category)
+        for index in range(30):
+            make_product(
+                index, price=[30000, 75000, 75000, 150000, 600000][index % 5],
+                popularity=index % 4, is_new=index % 3 == 0,
+                category=category if index % 2 else None,
+                subcategory=subcategory if index % 4 == 1 else None,
+            )
+        # Dates identiques : le départage se fait sur l'id
+        Product.objects.filter(pk__in=Product.objects.order_by('id').values('pk')[:10]).update(
+            created_at=timezone.now() - timedelta(days=1)
+        )
+        make_product(99, is_active=False)
+
+    def walk(self, path='/boutique/', **params):
+        """Identifiants de chaque page en suivant les curseurs, puis en revenant en arrière"""
+        pages, cursor = [], None
+        while True:
+            page = self.client.get(path, dict(params, cursor=cursor or ''), secure=True).context['page_obj']
+            pages.append([product.pk for product in page])
+            if not page.next_cursor:
+                break
+            cursor = page.next_cursor
+        back = []
+        cursor = page.previous_cursor
+        while cursor:
+            page = self.client.get(path, dict(params, cursor=cursor), secure=True).context['page_obj']
+            back.insert(0, [product.pk for product in page])
+            cursor = page.previous_cursor
+        return pages, back
+
+    def test_snapshot_pages_match_database_pages(self):
+        cases = [{'sort': sort} for sort in CURSOR_ORDERINGS] + [
+            {'status': 'new', 'sort': 'price_desc'},
+            {'price': '50000-100000', 'sort': 'popular'},
+        ]
+        for params in cases:
+            with self.subTest(**params):
+                pages, back = self.walk(**params)
+                with mock.patch.object(catalog_snapshot, 'get_snapshot', return_value=None):
+                    self.assertEqual(self.walk(**params), (pages, back))
+                self.assertEqual(back, pages[:-1])
+                ids = sum(pages, [])
+                self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(len(sum(self.walk()[0], [])), 30)
+        self.assertEqual(len(sum(self.walk(status='new')[0], [])), 10)
+        # Page servie par l'instantané : pas de paginateur de queryset
+        self.assertIsNone(self.client.get('/boutique/', secure=True).context['paginator'])
+
+    def test_subcategory_listing_matches_database(self):
+        path = '/boutique/sous-categorie/plongee/automatique/'
+        pages, back = self.walk(path, sort='price_asc')
+        with mock.patch.object(catalog_snapshot, 'get_snapshot', return_value=None):
+            self.assertEqual(self.walk(path, sort='price_asc'), (pages, back))
+        self.assertEqual(len(sum(pages, [])), 8)
+
+    def test_snapshot_is_rebuilt_after_catalog_change(self):
+        first = catalog_snapshot.get_snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_product(100)
+        second = catalog_snapshot.get_snapshot()
+        self.assertNotEqual(second.version, first.version)
+        self.assertEqual(len(second), 31)
+
+
+class ProductListFragmentTests(CatalogTestCase):
+    """Fragment AJAX de la liste des produits, mis en cache par version du catalogue"""
+
+    @classmethod
+    def setUpTestData(cls):
+        make_product(1, name='Chronographe Aviateur')
+        make_product(2, name='Montre Plongée')
+
+    def get_fragment(self, **headers):
+        return self.client.get('/boutique/', secure=True, headers={'X-Requested-With': 'XMLHttpRequest', **headers})
+
+    def test_fragment_is_cached_and_revalidated(self):
+        response = self.get_fragment()
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Chronographe Aviateur')
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            cached = self.get_fragment()
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['ETag'], etag)
+
+        not_modified = self.get_fragment(**{'If-None-Match': etag})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+
+    def test_catalog_change_invalidates_fragment(self):
+        etag = self.get_fragment()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            make_product(3, name='Montre Squelette')
+        response = self.get_fragment(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Montre Squelette')
+
+    def test_gzip_and_filters_in_key(self):
+        response = self.get_fragment(**{'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Montre Plongée', gzip.decompress(response.content).decode())
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        searched = self.client.get(
+            '/boutique/', {'q': 'chronographe'}, secure=True, headers={'X-Requested-With': 'XMLHttpRequest'}
+        )
+        self.assertNotEqual(searched['ETag'], response['ETag'])
+        self.assertNotContains(searched, 'Montre Plongée')
+
+
+    def test_query_is_keyed_as_searched(self):
+        with mock.patch.object(search, 'ranked_product_ids', return_value=None):
+            exact = self.client.get(
+                '/boutique/', {'q': 'Aviateur'}, secure=True, headers={'X-Requested-With': 'XMLHttpRequest'}
+            )
+            punctuated = self.client.get(
+                '/boutique/', {'q': 'aviateur!'}, secure=True, headers={'X-Requested-With': 'XMLHttpRequest'}
+            )
+        self.assertContains(exact, 'Chronographe Aviateur')
+        self.assertNotEqual(punctuated['ETag'], exact['ETag'])
+        self.assertNotContains(punctuated, 'Chronographe Aviateur')
+
+
+class ProductCardsEndpointTests(CatalogTestCase):
+    """Cartes suivantes pour le défilement infini de la boutique"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(7):
+            make_product(index, name=f'Montre numéro {index}')
+
+    def get_cards(self, **params):
+        return self.client.get('/boutique/cartes/', params, secure=True)
+
+    def test_cursor_walks_through_all_cards(self):
+        names, cursor = [], ''
+        for _ in range(4):
+            response = self.get_cards(limit=3, sort='price_asc', cursor=cursor)
+            self.assertEqual(response.status_code, 200)
+            page = [p.name for p in response.context['products']]
+            names += page
+            cursor = response['X-Next-Cursor']
+            if not cursor:
+                break
+            self.assertContains(response, f'cursor={cursor}')
+        self.assertEqual(names, [f'Montre numéro {index}' for index in range(7)])
+        self.assertNotContains(response, 'hx-trigger="revealed"')
+
+    def test_limit_is_clamped(self):
+        self.assertEqual(len(self.get_cards(limit=0).context['products']), 1)
+        self.assertEqual(len(self.get_cards(limit='abc').context['products']), 7)
+
+    def test_conditional_get(self):
+        response = self.get_cards(limit=3)
+        not_modified = self.client.get(
+            '/boutique/cartes/', {'limit': 3}, secure=True,
+            headers={'If-Modified-Since': response['Last-Modified']},
+        )
+        self.assertEqual(not_modified.status_code, 304)
+        other_page = self.client.get(
+            '/boutique/cartes/', {'limit': 3, 'cursor': response['X-Next-Cursor']}, secure=True,
+            headers={'If-None-Match': response['ETag']},
+        )
+        self.assertEqual(other_page.status_code, 200)
+
+
+class ProductDetailTests(CatalogTestCase):
+    """Fiche produit chargée en un nombre fixe de requêtes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', 'client@example.com', 'secret-pass')
+        category = Category.objects.create(name='Plongée', slug='plongee')
+        cls.product = make_product(1, category=category)
+        cls.neighbour = make_product(2, category=category)
+
+    def add_reviews(self, count, comments=0):
+        for index in range(count):
+            review = Review.objects.create(
+                product=self.product, rating=5, title=f'Avis {index}', comment='Très belle montre', is_approved=True
+            )
+            for _ in range(comments):
+                Comment.objects.create(review=review, user=self.user, content='Merci')
+
+    def count_detail_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            context = product_detail.get_product_detail(self.product.slug)
+        return len(queries), context
+
+    def test_query_budget_does_not_depend_on_reviews(self):
+        self.add_reviews(1)
+        recommendations.rebuild_recommendations()
+        few, context = self.count_detail_queries()
+        self.assertLessEqual(few, 5)
+        self.add_reviews(6, comments=5)
+        many, context = self.count_detail_queries()
+        self.assertLessEqual(many, 5)
+        self.assertEqual(len(context['reviews']), product_detail.REVIEWS_PAGE_SIZE)
+        self.assertEqual(context['review_count'], 7)
+        self.assertEqual(context['related_products'], [self.neighbour])
+        first = context['reviews'][0]
+        self.assertEqual(len(first.comment_preview), product_detail.COMMENTS_PREVIEW)
+        self.assertIsNotNone(first.comments_cursor)
+
+    def test_fallback_products_before_recommendations_are_built(self):
+        self.add_reviews(1)
+        count, context = self.count_detail_queries()
+        self.assertLessEqual(count, 5)
+        self.assertEqual(context['related_products'], [self.neighbour])
+
+    def test_recommendations_come_first_then_manual_then_category(self):
+        manual = make_product(3)
+        cousin = make_product(4, category=self.product.category)
+        recommended = make_product(5)
+        self.product.related_products.add(manual)
+        ProductRecommendation.objects.create(product=self.product, recommended=recommended, rank=0, score=1)
+        with self.assertNumQueries(1):
+            related = product_detail.related_products_for(self.product)
+        self.assertEqual(related, [recommended, manual, cousin, self.neighbour])
+
+    def test_both_routes_render_the_same_product(self):
+        for path in (f'/produit/{self.product.slug}/', f'/produit/{self.product.slug}/avis/'):
+            response = self.client.get(path, secure=True)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['product'], self.product)
+
+    def test_inactive_product_is_not_found(self):
+        Product.objects.filter(pk=self.product.pk).update(is_active=False)
+        self.assertEqual(self.client.get(f'/produit/{self.product.slug}/', secure=True).status_code, 404)
+
+
+class ReviewThreadTests(CatalogTestCase):
+    """Avis et fils de commentaires chargés page par page (HTMX)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', 'client@example.com', 'secret-pass')
+        cls.product = make_product(1)
+        cls.reviews = [
+            Review.objects.create(product=cls.product, rating=4, title=f'Avis {index}', comment='Belle montre', is_approved=True)
+            for index in range(7)
+        ]
+        Review.objects.create(product=cls.product, rating=1, title='En attente', comment='...', is_approved=False)
+        cls.comments = [
+            Comment.objects.create(review=cls.reviews[0], user=cls.user, content=f'Commentaire {index}')
+            for index in range(15)
+        ]
+
+    def test_review_pages_follow_each_other(self):
+        titles, cursor = [], None
+        while True:
+            response = self.client.get(f'/produit/{self.product.pk}/avis/page/', {'cursor': cursor or ''}, secure=True)
+            page = response.context['reviews']
+            titles += [review.title for review in page]
+            if not page.next_cursor:
+                break
+            self.assertContains(response, f'cursor={page.next_cursor}')
+            cursor = page.next_cursor
+        self.assertEqual(titles, [f'Avis {index}' for index in reversed(range(7))])
+
+    def test_comment_thread_continues_after_preview(self):
+        review = next(r for r in product_detail.reviews_page(self.product.pk, per_page=10) if r.pk == self.reviews[0].pk)
+        self.assertEqual([c.content for c in review.comment_preview], ['Commentaire 0', 'Commentaire 1', 'Commentaire 2'])
+        contents, cursor = [], review.comments_cursor
+        while cursor:
+            page = self.client.get(f'/api/reviews/{review.pk}/comments/', {'cursor': cursor}, secure=True).context['comments']
+            contents += [comment.content for comment in page]
+            cursor = page.next_cursor
+        self.assertEqual(contents, [f'Commentaire {index}' for index in range(3, 15)])
+
+    def test_unapproved_review_thread_is_hidden(self):
+        pending = Review.objects.get(is_approved=False)
+        Comment.objects.create(review=pending, user=self.user, content='Caché')
+        response = self.client.get(f'/api/reviews/{pending.pk}/comments/', secure=True)
+        self.assertEqual(list(response.context['comments']), [])
+
+
+class StaticBundleTests(CatalogTestCase):
+    """Scripts et styles des pages servis par des fichiers statiques versionnés"""
+
+    def test_quick_view_has_no_inline_script(self):
+        product = make_product(1)
+        response = self.client.get(f'/voir-produit/{product.pk}/', secure=True)
+        self.assertNotContains(response, '<script')
+        self.assertNotContains(response, '<style')
+
+    def test_listing_loads_bundles(self):
+        response = self.client.get('/boutique/', secure=True)
+        self.assertContains(response, 'js/favorites.js')
+        self.assertContains(response, 'js/product-list.js')
+        self.assertContains(response, 'js/quick-view.js')
+
+    def test_files_missing_from_manifest_keep_their_name(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        storage = StaticFilesStorage(location=directory)
+        self.assertEqual(storage.stored_name('videos/banniere.mp4'), 'videos/banniere.mp4')
+
+
+class ImageDerivativeTests(MediaTestCase):
+    """Déclinaisons WebP/JPEG générées à l'envoi des images produits"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = make_product(1)
+
+    def add_image(self, **upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=self.product, image=make_upload(**upload))
+        image.refresh_from_db()
+        return image
+
+    def test_derivatives_are_generated_at_upload(self):
+        image = self.add_image()
+        self.assertEqual(image.derivatives['source'], image.image.name)
+        for fmt, extension in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+            self.assertEqual([width for width, path in image.derivatives[fmt]], [320, 640, 960, 1000])
+            for width, path in image.derivatives[fmt]:
+                with Image.open(self.media_path(path)) as derivative:
+                    self.assertEqual((derivative.format, derivative.width), (extension, width))
+        self.assertTrue(image.derivative_url(500).endswith('/640.jpg'))
+        self.assertTrue(image.derivative_url(2000, 'webp').endswith('/1000.webp'))
+        self.assertEqual(ProductCard.objects.get(product=self.product).image_derivatives, image.derivatives)
+
+    def test_small_image_is_never_enlarged(self):
+        image = self.add_image(size=(200, 100))
+        self.assertEqual([width for width, path in image.derivatives['jpeg']], [200])
+
+    def test_deleted_image_releases_its_derivatives(self):
+        image = self.add_image()
+        directory = os.path.dirname(self.media_path(image.derivatives['jpeg'][0][1]))
+        self.assertTrue(os.path.isdir(directory))
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+        self.assertFalse(os.path.exists(directory))
+
+    def test_fresh_instance_releases_its_derivatives(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=self.product, image=make_upload())
+        directory = self.media_path(images.derivative_dir(image.image.name))
+        self.assertTrue(os.path.isdir(directory))
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+        self.assertFalse(os.path.exists(directory))
+
+
+class ImagePlaceholderTests(MediaTestCase):
+    """Dimensions, couleur dominante et aperçu flou enregistrés à l'envoi"""
+
+    def assertColorClose(self, hex_color, rgb):
+        channels = [int(hex_color[i:i + 2], 16) for i in (1, 3, 5)]
+        for channel, expected in zip(channels, rgb):
+            self.assertAlmostEqual(channel, expected, delta=12)
+
+    def test_metadata_is_stored_at_upload(self):
+        image = ProductImage.objects.create(product=make_product(1), image=make_upload(color=(30, 60, 200)))
+        image.refresh_from_db()
+        self.assertEqual((image.width, image.height), (1000, 500))
+        self.assertColorClose(image.dominant_color, (30, 60, 200))
+        self.assertTrue(image.placeholder.startswith('data:image/webp;base64,'))
+        with Image.open(BytesIO(base64.b64decode(image.placeholder.split(',', 1)[1]))) as preview:
+            self.assertLessEqual(max(preview.size), 16)
+
+    def test_exif_orientation_swaps_dimensions(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        image = ProductImage.objects.create(product=make_product(1), image=make_upload(exif=exif))
+        self.assertEqual((image.width, image.height), (500, 1000))
+
+    def test_category_image_uses_prefixed_fields(self):
+        category = Category.objects.create(name='Plongée', image=make_upload(size=(300, 200)))
+        category.refresh_from_db()
+        self.assertEqual((category.image_width, category.image_height), (300, 200))
+        self.assertTrue(category.image_placeholder)
+
+    def test_backfill_command_fills_missing_metadata(self):
+        image = ProductImage.objects.create(product=make_product(1), image=make_upload())
+        ProductImage.objects.filter(pk=image.pk).update(width=None, height=None, dominant_color='', placeholder='')
+        call_command('build_image_placeholders', stdout=StringIO())
+        image.refresh_from_db()
+        self.assertEqual((image.width, image.height), (1000, 500))
+        self.assertTrue(image.placeholder)
+
+
+class PrimaryImageTests(MediaTestCase):
+    """Positions de la galerie et image de couverture tenue à jour sur le produit"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = make_product(1)
+
+    def add_image(self, **fields):
+        return ProductImage.objects.create(product=self.product, image=make_upload(size=(40, 40)), **fields)
+
+    def primary_image_id(self):
+        return Product.objects.values_list('primary_image_id', flat=True).get(pk=self.product.pk)
+
+    def test_new_images_are_appended_to_the_gallery(self):
+        images = [self.add_image() for _ in range(3)]
+        self.assertEqual([image.position for image in images], [0, 1, 2])
+        self.assertEqual(self.primary_image_id(), images[0].pk)
+
+    def test_featured_image_becomes_the_cover(self):
+        first = self.add_image()
+        featured = self.add_image(is_featured=True)
+        self.assertEqual(self.primary_image_id(), featured.pk)
+        featured.is_featured = False
+        featured.save()
+        self.assertEqual(self.primary_image_id(), first.pk)
+
+    def test_cover_follows_deletions(self):
+        first, second = self.add_image(), self.add_image()
+        first.delete()
+        self.assertEqual(self.primary_image_id(), second.pk)
+        second.delete()
+        self.assertIsNone(self.primary_image_id())
+
+    def test_cards_join_the_cover_image(self):
+        image = self.add_image()
+        product = Product.objects.for_cards(images=False).get(pk=self.product.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(product.main_image.pk, image.pk)
+
+
+class MediaServingTests(MediaTestCase):
+    """Service de MEDIA_URL : plages, revalidation et en-têtes de cache"""
+
+    content = bytes(range(256)) * 4
+
+    def setUp(self):
+        super().setUp()
+        self.write('videos/banniere.mp4', self.content)
+
+    def write(self, name, content):
+        path = self.media_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(content)
+
+    def get(self, path='videos/banniere.mp4', **headers):
+        response = self.client.get(settings.MEDIA_URL + path, headers=headers, secure=True)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_whole_file_without_queries(self):
+        with self.assertNumQueries(0):
+            response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}')
+
+    def test_range_requests_return_partial_content(self):
+        response, body = self.get(Range='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.content[100:200])
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '100')
+
+        response, body = self.get(Range='bytes=-24')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.content[-24:])
+
+        response, body = self.get(Range='bytes=1000-')
+        self.assertEqual(body, self.content[1000:])
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.get(Range=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_stale_if_range_sends_the_whole_file(self):
+        response, body = self.get(Range='bytes=0-9', **{'If-Range': '"autre"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+
+    def test_revalidation_returns_not_modified(self):
+        response, _ = self.get()
+        revalidated, body = self.get(**{'If-None-Match': response['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(body, b'')
+        self.assertEqual(revalidated['ETag'], response['ETag'])
+        revalidated, _ = self.get(**{'If-Modified-Since': response['Last-Modified']})
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_content_addressed_names_are_immutable(self):
+        name = 'products/' + 'a' * 32 + '.jpg'
+        self.write(name, b'jpeg')
+        response, _ = self.get(name)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_missing_files_and_traversal_are_not_found(self):
+        self.assertEqual(self.get('videos/absente.mp4')[0].status_code, 404)
+        self.assertEqual(self.get('../settings.py')[0].status_code, 404)
+        self.assertEqual(self.get('videos')[0].status_code, 404)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/')
+    def test_accel_redirect_delegates_to_nginx(self):
+        response, body = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/videos/banniere.mp4')
+        self.assertEqual(body, b'')
+
+
+class ContentAddressedStorageTests(MediaTestCase):
+    """Médias nommés d'après leur contenu, stockés une seule fois"""
+
+    def add_image(self, product, **upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ProductImage.objects.create(product=product, image=make_upload(**upload))
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.add_image(make_product(1), name='Montre.JPG')
+        second = self.add_image(make_product(2), name='copie.jpg')
+        self.assertRegex(first.image.name, r'^products/[0-9a-f]{32}\.jpg$')
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(os.listdir(self.media_path('products')), [os.path.basename(first.image.name)])
+
+    def test_different_content_gets_another_name(self):
+        first = self.add_image(make_product(1))
+        second = self.add_image(make_product(2), color=(10, 10, 10))
+        self.assertNotEqual(second.image.name, first.image.name)
+
+    def test_shared_derivatives_survive_until_the_last_reference(self):
+        first = self.add_image(make_product(1))
+        second = self.add_image(make_product(2))
+        directory = self.media_path(images.derivative_dir(first.image.name))
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.isdir(directory))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(os.path.exists(directory))
+
+    def test_hash_media_renames_and_deduplicates_legacy_files(self):
+        product = make_product(1)
+        image = self.add_image(product)
+        with open(self.media_path(image.image.name), 'rb') as file:
+            content = file.read()
+        for legacy in ('products/ancienne.jpg', 'products/doublon.jpg'):
+            with open(self.media_path(legacy), 'wb') as file:
+                file.write(content)
+        ProductImage.objects.filter(pk=image.pk).update(image='products/ancienne.jpg')
+        duplicate = ProductImage.objects.create(product=make_product(2), image=make_upload(color=(0, 0, 0)))
+        ProductImage.objects.filter(pk=duplicate.pk).update(image='products/doublon.jpg')
+
+        call_command('hash_media', stdout=StringIO())
+        names = set(ProductImage.objects.values_list('image', flat=True))
+        self.assertEqual(names, {image.image.name})
+        self.assertFalse(os.path.exists(self.media_path('products/ancienne.jpg')))
+        self.assertFalse(os.path.exists(self.media_path('products/doublon.jpg')))
+
+
+class CartTotalsTests(CatalogTestCase):
+    """Totaux dénormalisés du panier, tenus à jour par chaque opération"""
+
+    def setUp(self):
+        super().setUp()
+        self.cart = Cart.objects.create(session_key='invite')
+        self.first = make_product(1, in_stock=10)
+        self.second = make_product(2, in_stock=10)
+
+    def assertTotals(self, item_count, subtotal):
+        self.assertEqual((self.cart.item_count, self.cart.subtotal), (item_count, subtotal))
+        stored = Cart.objects.values_list('item_count', 'subtotal').get(pk=self.cart.pk)
+        self.assertEqual(stored, (item_count, subtotal))
+
+    def test_operations_keep_totals_in_sync(self):
+        line = self.cart.add_item(self.first, 2)
+        self.cart.add_item(self.second)
+        self.assertTotals(3, Decimal('3004.00'))
+        line.increase_quantity(3)
+        self.assertTotals(6, Decimal('6007.00'))
+        line.decrease_quantity(4)
+        self.assertTotals(2, Decimal('2003.00'))
+        self.cart.remove_item(self.second)
+        self.assertTotals(1, Decimal('1001.00'))
+        self.cart.update_line(line.pk, 4)
+        self.assertTotals(4, Decimal('4004.00'))
+        self.cart.remove_line(line.pk)
+        self.assertTotals(0, Decimal('0.00'))
+
+    def test_stale_copies_of_a_line_keep_totals_in_sync(self):
+        line = self.cart.add_item(self.first, 2)
+        first_copy, second_copy = CartItem.objects.get(pk=line.pk), CartItem.objects.get(pk=line.pk)
+        first_copy.increase_quantity()
+        second_copy.increase_quantity()
+        self.assertEqual(CartItem.objects.get(pk=line.pk).quantity, 4)
+        self.cart.refresh_from_db()
+        self.assertTotals(4, Decimal('4004.00'))
+
+        stale = CartItem.objects.get(pk=line.pk)
+        self.cart.update_line(line.pk, 1)
+        stale.decrease_quantity()
+        self.cart.refresh_from_db()
+        self.assertTotals(1, Decimal('1001.00'))
+
+    def test_deferred_quantity_is_not_counted_twice(self):
+        line = self.cart.add_item(self.first, 3)
+        deferred = CartItem.objects.only('id', 'cart', 'product').get(pk=line.pk)
+        deferred.save()
+        self.cart.refresh_from_db()
+        self.assertTotals(3, Decimal('3003.00'))
+        deferred.delete()
+        self.cart.refresh_from_db()
+        self.assertTotals(0, Decimal('0.00'))
+
+    def test_quantities_are_clamped_to_stock(self):
+        self.cart.add_item(self.first, 50)
+        self.cart.add_quantities({self.second.pk: 4, self.first.pk: 1})
+        self.assertTotals(14, Decimal('14018.00'))
+        self.cart.clear()
+        self.assertTotals(0, 0)
+
+    def test_deleted_product_leaves_the_totals(self):
+        self.cart.add_item(self.first, 2)
+        self.cart.add_item(self.second)
+        self.first.delete()
+        self.cart.refresh_from_db()
+        self.assertTotals(1, Decimal('1002.00'))
+
+    def test_reconcile_carts_fixes_drift(self):
+        self.cart.add_item(self.first, 2)
+        Cart.objects.filter(pk=self.cart.pk).update(item_count=9, subtotal=1)
+        out = StringIO()
+        call_command('reconcile_carts', '--dry-run', stdout=out)
+        self.assertIn('1 à corriger', out.getvalue())
+        self.assertEqual(Cart.objects.values_list('item_count', flat=True).get(pk=self.cart.pk), 9)
+
+        call_command('reconcile_carts', stdout=StringIO())
+        self.cart.refresh_from_db()
+        self.assertTotals(2, Decimal('2002.00'))
+        out = StringIO()
+        call_command('reconcile_carts', stdout=out)
+        self.assertIn('0 corrigé(s)', out.getvalue())
+
+
+class CookieCartTests(CatalogTestCase):
+    """Panier des visiteurs anonymes conservé dans un cookie signé"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.first = make_product(1, in_stock=10)
+        cls.second = make_product(2, in_stock=10)
+
+    def make_request(self, cookie=None):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        if cookie is not None:
+            request.COOKIES[settings.CART_COOKIE_NAME] = cookie
+        return request
+
+    def round_trip(self, cart):
+        """Cookie écrit par le middleware, relu par une nouvelle requête"""
+        response = CartCookieMiddleware(lambda request: HttpResponse())(cart.request)
+        morsel = response.cookies[settings.CART_COOKIE_NAME]
+        return get_cart(self.make_request(morsel.value)), morsel
+
+    def test_guest_cart_writes_nothing_to_the_database(self):
+        request = self.make_request()
+        with self.assertNumQueries(0):
+            cart = get_cart(request)
+            cart.add_item(self.first, 2)
+            cart.add_item(self.second)
+        self.assertIsInstance(cart, CookieCart)
+        self.assertIsNone(request.session.session_key)
+        self.assertFalse(Cart.objects.exists())
+
+        restored, morsel = self.round_trip(cart)
+        self.assertTrue(morsel['httponly'])
+        self.assertEqual(restored.quantities, {self.first.pk: 2, self.second.pk: 1})
+        with self.assertNumQueries(1):
+            self.assertEqual(restored.subtotal, Decimal('3004.00'))
+            self.assertEqual([line.product for line in restored.lines], [self.first, self.second])
+        self.assertEqual(restored.item_count, 3)
+
+    def test_quantities_are_clamped_and_lines_capped(self):
+        cart = get_cart(self.make_request())
+        cart.add_item(self.first, 50)
+        self.assertEqual(cart.quantities, {self.first.pk: 10})
+        with override_settings(CART_COOKIE_MAX_LINES=1):
+            cart.add_item(self.second)
+        self.assertNotIn(self.second.pk, cart.quantities)
+        cart.update_line(self.first.pk, 0)
+        self.assertEqual(cart.quantities, {})
+
+    def test_tampered_cookie_is_ignored(self):
+        cart = get_cart(self.make_request(f'{self.first.pk}:5'))
+        self.assertEqual(cart.quantities, {})
+        self.assertFalse(cart.modified)
+
+    def test_unavailable_products_are_dropped(self):
+        cart = get_cart(self.make_request())
+        cart.add_item(self.first)
+        cart.add_item(self.second)
+        restored, _ = self.round_trip(cart)
+        Product.objects.filter(pk=self.second.pk).update(is_active=False)
+        self.assertEqual([line.product for line in restored.lines], [self.first])
+        self.assertTrue(restored.modified)
+        self.assertEqual(restored.encode(), f'{self.first.pk}:1')
+
+    def test_emptied_cart_deletes_the_cookie(self):
+        cart = get_cart(self.make_request())
+        cart.add_item(self.first)
+        cart.remove_item(self.first)
+        _, morsel = self.round_trip(cart)
+        self.assertEqual(morsel.value, '')
+        self.assertEqual(morsel['max-age'], 0)
+
+    def test_persist_creates_a_session_cart(self):
+        request = self.make_request()
+        get_cart(request).add_item(self.first, 3)
+        cart = persist_cart(request)
+        self.assertEqual(cart.session_key, request.session.session_key)
+        self.assertEqual(cart.item_count, 3)
+        self.assertEqual(get_cookie_cart(request).quantities, {})
+        self.assertEqual(get_cart(request), cart)
+
+
+class CartContextTests(CatalogTestCase):
+    """Panier du contexte des gabarits, calculé seulement à l'usage"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', 'client@example.com', 'secret-pass')
+        cls.product = make_product(1, in_stock=10)
+
+    def make_request(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        request.session = SessionStore()
+        return request
+
+    def test_unused_context_runs_no_query(self):
+        with self.assertNumQueries(0):
+            context = cart_context(self.make_request(self.user))
+        self.assertFalse(Cart.objects.exists())
+        with self.assertNumQueries(1):
+            self.assertEqual(context['cart_count'], 0)
+            self.assertEqual(f"{context['cart_total']:.2f}", '0.00')
+        self.assertFalse(Cart.objects.exists())
+
+    def test_summary_is_cached_until_the_cart_changes(self):
+        cart = Cart.objects.create(user=self.user)
+        cart.add_item(self.product, 2)
+        context = cart_context(self.make_request(self.user))
+        self.assertEqual(Template('{{ cart_count }}/{{ cart_total }}').render(Context(context)), '2/2002,00')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(cart_context(self.make_request(self.user))['cart_count'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cart.add_item(self.product)
+        with self.assertNumQueries(1):
+            self.assertEqual(cart_context(self.make_request(self.user))['cart_count'], 3)
+
+    def test_guest_count_reads_the_cookie(self):
+        request = self.make_request(AnonymousUser())
+        get_cart(request).add_item(self.product, 4)
+        with self.assertNumQueries(0):
+            self.assertEqual(cart_context(request)['cart_count'], 4)
+
+
+class PurgeStaleCartsTests(CatalogTestCase):
+    """Purge par lots des paniers anonymes abandonnés et des sessions expirées"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', 'client@example.com', 'secret-pass')
+        cls.product = make_product(1, in_stock=10)
+
+    def setUp(self):
+        super().setUp()
+        old = timezone.now() - timedelta(days=60)
+        self.stale = []
+        for index in range(5):
+            cart = Cart.objects.create(session_key=f'ancien-{index}')
+            cart.add_item(self.product)
+            self.stale.append(cart.pk)
+        self.recent = Cart.objects.create(session_key='recent')
+        self.owned = Cart.objects.create(user=self.user)
+        Cart.objects.filter(pk__in=self.stale + [self.owned.pk]).update(updated_at=old)
+        self.expired = SessionStore()
+        self.expired.set_expiry(-60)
+        self.expired.create()
+        self.active = SessionStore()
+        self.active.create()
+
+    def purge(self, *args):
+        out = StringIO()
+        call_command('purge_stale_carts', '--days', '30', '--batch-size', '2', '--pause', '0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_stale_guest_carts_and_expired_sessions_are_deleted(self):
+        output = self.purge()
+        self.assertIn('5 panier(s) (5 article(s)) et 1 session(s)', output)
+        self.assertEqual(set(Cart.objects.values_list('pk', flat=True)), {self.recent.pk, self.owned.pk})
+        self.assertFalse(CartItem.objects.exists())
+        self.assertFalse(Session.objects.filter(session_key=self.expired.session_key).exists())
+        self.assertTrue(Session.objects.filter(session_key=self.active.session_key).exists())
+
+    def test_dry_run_deletes_nothing(self):
+        output = self.purge('--dry-run')
+        self.assertIn('5 panier(s) anonyme(s) abandonné(s), 1 session(s) expirée(s)', output)
+        self.assertEqual(Cart.objects.count(), 7)
+        self.assertEqual(Session.objects.count(), 2)
@@ -1,10 +1,9 @@
 from django.urls import path, include
 from django.contrib.auth import views as auth_views
-from .views import capture_lead, landing_page, product_detail_page, add_review, add_comment, voir_product, contact_view, about_view, faq_view, toggle_favorite, terms_view, privacy_view, register_view
+from .views import ProductListView as ProductListAPIView
+from .views import capture_lead, landing_page, add_review, add_comment, product_reviews, review_comments, voir_product, voir_product_state, contact_view, about_view, faq_view, toggle_favorite, terms_view, privacy_view, register_view
 from .views_orders import OrderCreateView, OrderDetailView, OrderListView, OrderSuccessView
-from .views_products import ProductListView, product_detail, products_by_category
-from django.conf import settings
-from django.conf.urls.static import static
+from .views_products import ProductListView, ProductCardsView, product_detail, products_by_category
 
 urlpatterns = [
     # Pages principales
@@ -18,11 +17,18 @@ urlpatterns = [
     path('boutique/categorie/<slug:slug>/', products_by_category, name='products_by_category'),
     path('boutique/sous-categorie/<slug:category_slug>/<slug:subcategory_slug>/', 
          ProductListView.as_view(), name='product_list_by_subcategory'),
-    path('produit/<slug:slug>/', product_detail_page, name='product_detail'),
+    path('boutique/cartes/', ProductCardsView.as_view(), name='product_cards'),
+    path('boutique/sous-categorie/<slug:category_slug>/<slug:subcategory_slug>/cartes/', 
+         ProductCardsView.as_view(), name='product_cards_by_subcategory'),
+    path('produit/<slug:slug>/', product_detail, name='product_detail'),
+    
+    # API
+    path('api/products/', ProductListAPIView.as_view(), name='api_product_list'),
     
     # Panier et commandes
     path('panier/', landing_page, name='cart'),  # À implémenter
     path('voir-produit/<int:product_id>/', voir_product, name='voir_product'),
+    path('voir-produit/<int:product_id>/etat/', voir_product_state, name='voir_product_state'),
     path('commande/creer/<slug:product_slug>/', OrderCreateView.as_view(), name='order_create'),
     path('commande/<int:order_id>/', OrderDetailView.as_view(), name='order_detail'),
     path('mes-commandes/', OrderListView.as_view(), name='order_list'),
@@ -34,9 +40,11 @@ urlpatterns = [
     # Avis
     path('produit/<slug:slug>/avis/', product_detail, name='product_review'),
     path('produit/<slug:product_slug>/ajouter-avis/', add_review, name='add_review'),
+    path('produit/<int:product_id>/avis/page/', product_reviews, name='product_reviews'),
     
     # Commentaires
     path('api/reviews/<int:review_id>/comment/', add_comment, name='add_comment'),
+    path('api/reviews/<int:review_id>/comments/', review_comments, name='review_comments'),
     
     # Favoris
     path('products/<int:product_id>/toggle-favorite/', toggle_favorite, name='toggle_favorite'),
@@ -49,4 +57,4 @@ urlpatterns = [
     # Pages légales
     path('conditions-utilisation/', terms_view, name='terms'),
     path('confidentialite/', privacy_view, name='privacy'),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
@@ -48,6 +48,13 @@ from django.contrib import messages
 from .models import Product, ProductImage, Review, Comment
 from .forms import ReviewForm, CommentForm, ContactForm
 from .serializers import ProductSerializer, ProductDetailSerializer
+from .pagination import ProductCursorPagination
+from .search import ProductSearchFilter
+from .recommendations import recommended_products
+from .product_detail import reviews_page, comments_page
+from .catalog import get_product_version
+from . import fragments
+from django.middleware.csrf import get_token
 from .models_banner import VideoBanner
 from .models_favorite import Favorite
 from django.views.decorators.http import require_http_methods
@@ -67,15 +74,16 @@ def about_view(request):
 logger = logging.getLogger(__name__)
 
 class ProductListView(generics.ListAPIView):
-    queryset = Product.objects.all()
+    queryset = Product.objects.select_related('card')
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend]
+    pagination_class = ProductCursorPagination
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter]
     filterset_fields = ['category', 'is_featured', 'is_bestseller', 'is_new', 'is_active']
     
     def get_queryset(self):
         queryset = super().get_queryset()
-        # Filtrage supplémentaire si nécessaire
-        return queryset.filter(is_active=True).order_by('-created_at')
+        # Filtrage supplémentaire si nécessaire (le tri est appliqué par la pagination)
+        return queryset.filter(is_active=True)
 
 
 @require_http_methods(["POST"])
@@ -105,6 +113,23 @@ def add_comment(request, review_id):
     return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
 
 
+def product_reviews(request, product_id):
+    """Page suivante des avis d'un produit (fragment HTMX chargé au défilement)"""
+    page = reviews_page(product_id, request.GET.get('cursor'))
+    return render(request, 'components/reviews_page.html', {
+        'product_id': product_id,
+        'reviews': page,
+    })
+
+
+def review_comments(request, review_id):
+    """Suite du fil de commentaires d'un avis (fragment HTMX)"""
+    page = comments_page(review_id, request.GET.get('cursor'))
+    return render(request, 'components/comments_page.html', {
+        'review_id': review_id,
+        'comments': page,
+    })
+
 
 
 def get_watch_image_url(product):
@@ -112,77 +137,10 @@ def get_watch_image_url(product):
     # Si vous avez des images spécifiques pour chaque combinaison, vous pouvez les générer ici
     # Par exemple: f"{product.id}_{cadran}_{bracelet}_{finition}.jpg"
     # Pour l'instant, nous utilisons l'image de base du produit
-    if product.images.exists():
-        return product.images.first().image.url
+    if product.primary_image:
+        return product.primary_image.image.url
     return ''
 
-def product_detail_page(request, slug):
-    """Vue pour afficher les détails d'un produit et gérer les avis"""
-    try:
-        product = get_object_or_404(Product, slug=slug, is_active=True)
-        
-        # Récupérer les images du produit
-        images = product.images.all()
-        
-        # Récupérer les produits associés (limité à 4)
-        related_products = product.related_products.filter(is_active=True)[:4]
-        
-        # Si pas assez de produits associés, compléter avec des produits de la même catégorie
-        if related_products.count() < 4 and product.category:
-            related_from_category = product.category.products.filter(
-                is_active=True
-            ).exclude(id=product.id).distinct()
-            
-            # Éviter les doublons
-            existing_ids = [p.id for p in related_products]
-            related_from_category = related_from_category.exclude(id__in=existing_ids)
-            
-            # Ajouter jusqu'à avoir 4 produits au total
-            related_products = list(related_products) + list(related_from_category[:4 - related_products.count()])
-        
-        # Gestion du formulaire d'avis
-        if request.method == 'POST':
-            form = ReviewForm(request.POST, user=request.user)
-            if form.is_valid():
-                review = form.save(commit=False)
-                review.product = product
-                if request.user.is_authenticated:
-                    review.user = request.user
-                review.is_approved = False  # Les avis nécessitent une modération
-                review.save()
-                messages.success(request, _("Merci pour votre avis ! Il sera publié après modération."))
-                return redirect('product_detail', slug=product.slug)
-        else:
-            form = ReviewForm(user=request.user)
-        
-        # Récupérer les avis approuvés
-        reviews = product.reviews.filter(is_approved=True).order_by('-created_at')
-        
-        # Calculer la note moyenne
-        avg_rating = reviews.aggregate(avg_rating=Avg('rating'))['avg_rating']
-        
-        context = {
-            'product': product,
-            'images': images,
-            'related_products': related_products,
-            'reviews': reviews,
-            'review_form': form,
-            'review_avg': avg_rating,
-        }
-        
-        return render(request, 'products/product_detail_page.html', context)
-        
-    except Exception as e:
-        # Log l'erreur pour le débogage
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Erreur dans la vue product_detail: {str(e)}")
-        
-        # Afficher une page d'erreur générique
-        return render(request, 'error.html', 
-                     {'message': _("Une erreur est survenue lors du chargement du produit.")}, 
-                     status=500)
-
 @require_POST
 def capture_lead(request):
     """Capture les leads depuis le formulaire de contact"""
@@ -306,7 +264,7 @@ def landing_page(request):
         video_banner = VideoBanner.objects.filter(is_active=True).first()
         
         # Récupérer les produits en vedette
-        featured_products = Product.objects.filter(is_featured=True)[:4]
+        featured_products = Product.objects.filter(is_featured=True).for_cards(images=False)[:4]
         
         # Récupérer toutes les catégories actives
         categories = Category.objects.all()
@@ -324,7 +282,7 @@ def landing_page(request):
         # Si une commande est en cours et qu'un produit est spécifié
         if order_started and product_id:
             try:
-                product = Product.objects.get(id=product_id)
+                product = Product.objects.select_related('primary_image').get(id=product_id)
                 context.update({
                     'show_order_modal': True,
                     'product': product
@@ -360,9 +318,49 @@ def select_model(request, model_id):
     })
     
 def voir_product(request, product_id):
-    """Voir un produit"""
-    product = get_object_or_404(Product, id=product_id)
-    return render(request, 'components/voir_produit.html', {'product': product})
+    """
+    Voir un produit (fiche rapide). Le HTML, identique pour tous les visiteurs,
+    est mis en cache par produit et version du produit (voir catalog.py) ; la
+    clé inclut aussi la version du catalogue (fragments.fragment_key), qui suit
+    les cartes des produits recommandés affichées dans la fiche. Pas de
+    Last-Modified : la date du catalogue ignore les changements propres au
+    produit (commentaires, recommandations). Les données propres au visiteur
+    sont fournies par voir_product_state.
+    """
+    # Vérifié avant de lire la version : sinon chaque identifiant inexistant
+    # créerait une clé de version permanente dans le cache
+    if not Product.objects.filter(pk=product_id).exists():
+        raise Http404("Produit introuvable")
+    params = {'product': product_id, 'version': get_product_version(product_id)}
+    return fragments.cached_fragment(
+        request, 'voir_product', params, lambda: render_quick_view(product_id), send_last_modified=False
+    )
+
+def render_quick_view(product_id):
+    """Rend la fiche rapide d'un produit sans utilisateur ni jeton CSRF"""
+    product = get_object_or_404(
+        Product.objects.select_related('rating_summary', 'primary_image').prefetch_related('images'), id=product_id
+    )
+    recommended = recommended_products(product, queryset=Product.objects.for_cards(images=False))
+    return HttpResponse(render_to_string('components/voir_produit.html', {
+        'product': product,
+        'reviews': reviews_page(product.pk),
+        'recommended_products': recommended,
+        'deferred_user': True,
+    }))
+
+@never_cache
+def voir_product_state(request, product_id):
+    """Données propres au visiteur pour la fiche rapide mise en cache"""
+    if request.user.is_authenticated:
+        is_favorite = Favorite.objects.filter(user=request.user, product_id=product_id).exists()
+    else:
+        is_favorite = str(product_id) in request.session.get('favorites', [])
+    return JsonResponse({
+        'is_authenticated': request.user.is_authenticated,
+        'is_favorite': is_favorite,
+        'csrf_token': get_token(request),
+    })
 
 # Vue pour la page de contact
 from django.core.mail import send_mail, BadHeaderError
@@ -2,26 +2,9 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_POST
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from .models import Product
-from .models_cart import Cart, CartItem
-
-def get_cart(request):
-    """
-    Récupère le panier de l'utilisateur ou en crée un nouveau.
-    Gère à la fois les utilisateurs connectés et les invités.
-    """
-    if request.user.is_authenticated:
-        # Pour les utilisateurs connectés, on utilise leur panier
-        cart, created = Cart.objects.get_or_create(user=request.user)
-    else:
-        # Pour les invités, on utilise le panier de session
-        if not request.session.session_key:
-            request.session.create()
-        session_key = request.session.session_key
-        cart, created = Cart.objects.get_or_create(session_key=session_key, user=None)
-    
-    return cart
+from .cart import get_cart, persist_cart
 
 @require_POST
 def add_to_cart(request, product_id):
@@ -47,7 +30,7 @@ def add_to_cart(request, product_id):
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
         return JsonResponse({
             'success': True,
-            'cart_total_items': cart.total_items,
+            'cart_total_items': cart.item_count,
             'message': 'Produit ajouté au panier avec succès!'
         })
     
@@ -58,14 +41,15 @@ def add_to_cart(request, product_id):
 def remove_from_cart(request, item_id):
     """Supprime un article du panier."""
     cart = get_cart(request)
-    cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
+    cart_item = cart.remove_line(item_id)
+    if cart_item is None:
+        raise Http404("Article introuvable dans le panier")
     product_name = cart_item.product.name
-    cart_item.delete()
     
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
         return JsonResponse({
             'success': True,
-            'cart_total_items': cart.total_items - 1,
+            'cart_total_items': cart.item_count,
             'message': f'"{product_name}" a été retiré de votre panier.'
         })
     
@@ -75,7 +59,10 @@ def remove_from_cart(request, item_id):
 @require_POST
 def update_cart_item(request, item_id):
     """Met à jour la quantité d'un article dans le panier."""
-    cart_item = get_object_or_404(CartItem, id=item_id, cart=get_cart(request))
+    cart = get_cart(request)
+    cart_item = cart.get_line(item_id)
+    if cart_item is None:
+        raise Http404("Article introuvable dans le panier")
     quantity = int(request.POST.get('quantity', 1))
     
     if quantity < 1:
@@ -84,8 +71,7 @@ def update_cart_item(request, item_id):
     if cart_item.product.track_inventory and quantity > cart_item.product.in_stock:
         messages.warning(request, f"Stock insuffisant. Il ne reste que {cart_item.product.in_stock} pièce(s) disponible(s).")
     else:
-        cart_item.quantity = quantity
-        cart_item.save()
+        cart.update_line(item_id, quantity)
         messages.success(request, 'Quantité mise à jour avec succès!')
     
     return redirect('cart_detail')
@@ -98,9 +84,10 @@ def cart_detail(request):
 @login_required
 def checkout(request):
     """Affiche la page de paiement."""
-    cart = get_cart(request)
+    # Le panier du cookie n'est enregistré en base qu'ici (ou à la connexion)
+    cart = persist_cart(request)
     
-    if cart.total_items == 0:
+    if cart.item_count == 0:
         messages.warning(request, 'Votre panier est vide.')
         return redirect('product_list')
     
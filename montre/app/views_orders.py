@@ -31,7 +31,7 @@ class OrderCreateView(CreateView):
     def get_context_data(self, **kwargs):
         """Ajoute le produit et d'autres données au contexte"""
         context = super().get_context_data(**kwargs)
-        product = get_object_or_404(Product, slug=self.kwargs['product_slug'], is_active=True)
+        product = get_object_or_404(Product.objects.select_related('primary_image'), slug=self.kwargs['product_slug'], is_active=True)
         context['product'] = product
         context['step'] = 2  # Étape de livraison
         
@@ -235,7 +235,7 @@ class OrderCreateView(CreateView):
             context = {
                 'order': order,
                 'product': order.product,
-                'image': order.product.images.first(),  # Première image du produit
+                'image': order.product.primary_image,  # Image principale du produit
                 'site_name': getattr(settings, "SITE_NAME", "Notre Boutique"),
                 'first_name': order.customer_first_name or (order.lead.first_name if order.lead else ''),
                 'last_name': order.customer_last_name or (order.lead.last_name if order.lead else ''),
@@ -243,7 +243,6 @@ class OrderCreateView(CreateView):
                 'domain': self.request.get_host(),
                 'site_url': settings.SITE_URL,
             }
-            print(order.product.images.first())
             
             # Email HTML
             html_message = render_to_string('emails/order_confirmation.html', context)
@@ -294,7 +293,7 @@ class OrderSuccessView(TemplateView):
         
         if order_id:
             try:
-                order = Order.objects.get(id=order_id)
+                order = Order.objects.select_related('product__primary_image').get(id=order_id)
                 context['order'] = order
                 # Nettoyer la session
                 if 'order_id' in self.request.session:
@@ -315,6 +314,7 @@ class OrderSuccessView(TemplateView):
       
 class OrderDetailView(DetailView):
     model = Order
+    queryset = Order.objects.select_related('product__primary_image')
     template_name = 'orders/order_detail.html'
     context_object_name = 'order'
     pk_url_kwarg = 'order_id'  # Cela correspond à <int:order_id> dans l'URL
@@ -347,7 +347,7 @@ class OrderListView(LoginRequiredMixin, ListView):
         return Order.objects.filter(
             Q(user=self.request.user) | 
             Q(lead__email=self.request.user.email)
-        ).order_by('-created_at')
+        ).select_related('product__primary_image').order_by('-created_at')
 
 @require_http_methods(["POST"])
 def create_order_from_configuration(request, configuration_id):
@@ -1,38 +1,35 @@
 from django.shortcuts import get_object_or_404, render, redirect
+from django.urls import reverse
+from django.http import Http404
 from django.views.generic import DetailView, ListView
-from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
+from django.utils.functional import cached_property
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
 from django.utils.translation import gettext_lazy as _
 from .models import Product, Category, Review, SubCategory
-from django.db import models
 from .forms import ReviewForm
+from .product_detail import get_product_detail
+from .pagination import CURSOR_ORDERINGS, CursorPaginator, get_ordering
+from . import search
+from . import facets
+from . import snapshot as catalog_snapshot
+from . import fragments
 import logging
 
+def pagination_query(params):
+    """Retourne la query string courante sans les paramètres de pagination"""
+    query = params.copy()
+    for key in ('cursor', 'page'):
+        query.pop(key, None)
+    return query.urlencode()
+
 def product_detail(request, slug):
     """Vue pour afficher les détails d'un produit et gérer les avis"""
     try:
-        product = get_object_or_404(Product, slug=slug, is_active=True)
-        
-        # Récupérer les images du produit
-        images = product.images.all()
-        
-        # Récupérer les produits associés (limité à 4)
-        related_products = product.related_products.filter(is_active=True)[:4]
-        
-        # Si pas assez de produits associés, compléter avec des produits de la même catégorie
-        if related_products.count() < 4 and product.category:
-            related_from_category = product.category.products.filter(
-                is_active=True
-            ).exclude(id=product.id).distinct()
-            
-            # Éviter les doublons
-            existing_ids = [p.id for p in related_products]
-            related_from_category = related_from_category.exclude(id__in=existing_ids)
-            
-            # Ajouter jusqu'à avoir 4 produits au total
-            related_products = list(related_products) + list(related_from_category[:4 - related_products.count()])
+        # Produit, images, avis, résumé des notes et produits associés (5 requêtes au plus)
+        context = get_product_detail(slug)
+        product = context['product']
         
         # Gestion du formulaire d'avis
         if request.method == 'POST':
@@ -49,23 +46,12 @@ def product_detail(request, slug):
         else:
             form = ReviewForm(user=request.user)
         
-        # Récupérer les avis approuvés
-        reviews = product.reviews.filter(is_approved=True).order_by('-created_at')
-        
-        # Calculer la note moyenne
-        avg_rating = reviews.aggregate(avg_rating=models.Avg('rating'))['avg_rating']
-        
-        context = {
-            'product': product,
-            'images': images,
-            'related_products': related_products,
-            'reviews': reviews,
-            'review_form': form,
-            'review_avg': avg_rating,
-        }
+        context['review_form'] = form
         
         return render(request, 'products/product_detail_page.html', context)
         
+    except Http404:
+        raise
     except Exception as e:
         # Log l'erreur pour le débogage
         import logging
@@ -84,112 +70,140 @@ class ProductListView(ListView):
     context_object_name = 'products'
     paginate_by = 12
     
+    @cached_property
+    def search_query(self):
+        """Terme recherché (q), sans espaces superflus : un q blanc n'est pas une recherche"""
+        return (self.request.GET.get('q') or '').strip()
+    
     def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True)
+        queryset = Product.objects.filter(is_active=True).for_cards()
         
         # Récupérer les paramètres de requête
-        query = self.request.GET.get('q')
+        query = self.search_query
         status = self.request.GET.get('status')
         price = self.request.GET.get('price')
-        sort = self.request.GET.get('sort')
         
-        # Filtrage par recherche
+        # Filtrage par recherche (index plein texte, résultats classés par pertinence)
+        self.search_ids = None
         if query:
-            queryset = queryset.filter(
-                models.Q(name__icontains=query) |
-                models.Q(description__icontains=query) |
-                models.Q(category__name__icontains=query)
-            )
+            self.search_ids = search.ranked_product_ids(query)
+            queryset = search.filter_queryset(queryset, query, ids=self.search_ids)
         
         # Filtrage par catégorie
+        self.category = self.subcategory = None
         category_slug = self.kwargs.get('category_slug')
         if category_slug:
-            category = get_object_or_404(Category, slug=category_slug)
-            queryset = queryset.filter(category=category)
+            self.category = get_object_or_404(Category, slug=category_slug)
+            queryset = queryset.filter(category=self.category)
         
         # Filtrage par sous-catégorie
         subcategory_slug = self.kwargs.get('subcategory_slug')
         if subcategory_slug:
-            subcategory = get_object_or_404(SubCategory, slug=subcategory_slug)
-            queryset = queryset.filter(subcategory=subcategory)
+            self.subcategory = get_object_or_404(SubCategory, slug=subcategory_slug)
+            queryset = queryset.filter(subcategory=self.subcategory)
         
         # Filtrage par statut
-        if status == 'new':
-            queryset = queryset.filter(is_new=True)
-        elif status == 'bestseller':
-            queryset = queryset.filter(is_bestseller=True)
-        elif status == 'featured':
-            queryset = queryset.filter(is_featured=True)
+        if status in facets.STATUS_FIELDS:
+            queryset = queryset.filter(**{facets.STATUS_FIELDS[status]: True})
         
         # Filtrage par prix
-        if price:
-            if price == '0-50000':
-                queryset = queryset.filter(price__lte=50000)
-            elif price == '50000-100000':
-                queryset = queryset.filter(price__gte=50000, price__lte=100000)
-            elif price == '100000-200000':
-                queryset = queryset.filter(price__gte=100000, price__lte=200000)
-            elif price == '200000-500000':
-                queryset = queryset.filter(price__gte=200000, price__lte=500000)
-            elif price == '500000-':
-                queryset = queryset.filter(price__gte=500000)
-        
-        # Tri des résultats
-        if sort == 'price_asc':
-            queryset = queryset.order_by('price')
-        elif sort == 'price_desc':
-            queryset = queryset.order_by('-price')
-        elif sort == 'newest':
-            queryset = queryset.order_by('-created_at')
-        elif sort == 'popular':
-            # Ici, vous pourriez trier par popularité si vous avez ce champ
-            queryset = queryset.order_by('?')  # Tri aléatoire en attendant
+        price_q = facets.price_filter(price)
+        if price_q is not None:
+            queryset = queryset.filter(price_q)
         
+        # Le tri est appliqué par le paginateur (voir paginate_queryset)
         return queryset.distinct()
 
+    @property
+    def search_truncated(self):
+        """Indique si la recherche compte plus de résultats que search.MAX_RESULTS (liste limitée)"""
+        return bool(self.search_ids and self.search_ids.truncated)
+
+    def paginate_queryset(self, queryset, page_size):
+        """Pagination par curseur selon le mode de tri demandé"""
+        ordering = get_ordering(self.request.GET.get('sort'), searching=bool(self.search_query))
+        page = self.snapshot_page(ordering, page_size)
+        if page is not None:
+            return (None, page, page.object_list, page.has_other_pages())
+        paginator = CursorPaginator(queryset, page_size, ordering, with_total=True)
+        page = paginator.page(self.request.GET.get('cursor'))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def snapshot_page(self, ordering, page_size):
+        """
+        Filtre et trie à partir de l'instantané du catalogue : seuls les produits
+        de la page sont chargés depuis la base. Retourne None si l'instantané
+        ne peut pas être utilisé (recherche sans index plein texte, erreur...).
+        """
+        ranks = None
+        if self.search_query:
+            if self.search_ids is None:
+                return None
+            ranks = {pk: position for position, pk in enumerate(self.search_ids)}
+        snapshot = catalog_snapshot.get_snapshot()
+        if snapshot is None:
+            return None
+        positions = snapshot.filter(
+            ids=self.search_ids,
+            category_id=self.category.pk if self.category else None,
+            subcategory_id=self.subcategory.pk if self.subcategory else None,
+            status=self.request.GET.get('status', ''),
+            price=self.request.GET.get('price', ''),
+        )
+        return snapshot.paginate(
+            positions, ordering, self.request.GET.get('cursor'), page_size,
+            Product.objects.for_cards(), ranks=ranks
+        )
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['categories'] = Category.objects.all()
         
         # Ajouter les paramètres de recherche actuels au contexte
-        context['current_query'] = self.request.GET.get('q', '')
+        context['current_query'] = self.search_query
         context['current_status'] = self.request.GET.get('status', '')
         context['current_price'] = self.request.GET.get('price', '')
         context['current_sort'] = self.request.GET.get('sort', '')
+        context['pagination_query'] = pagination_query(self.request.GET)
+        context['approximate_total'] = context['page_obj'].total
+        # Recherche limitée aux search.MAX_RESULTS produits les plus pertinents
+        context['search_truncated'] = self.search_truncated
+        context['search_limit'] = search.MAX_RESULTS
+        if self.subcategory:
+            context['cards_url'] = reverse('product_cards_by_subcategory', kwargs=self.kwargs)
+        else:
+            context['cards_url'] = reverse('product_cards')
+        
+        # Compteurs des filtres de la sidebar
+        context['facets'] = facets.get_facets(
+            query=self.search_query,
+            status=self.request.GET.get('status', ''),
+            price=self.request.GET.get('price', ''),
+            category_id=self.category.pk if self.category else None,
+            subcategory_id=self.subcategory.pk if self.subcategory else None,
+        )
         
         # Ajouter les filtres actifs
         active_filters = []
         
-        if self.request.GET.get('q'):
+        if self.search_query:
             active_filters.append({
                 'name': 'recherche',
-                'value': self.request.GET.get('q'),
+                'value': self.search_query,
                 'url_param': 'q'
             })
             
         if self.request.GET.get('status'):
-            status_display = {
-                'new': 'Nouveautés',
-                'bestseller': 'Meilleures ventes',
-                'featured': 'En vedette'
-            }
             active_filters.append({
                 'name': 'statut',
-                'value': status_display.get(self.request.GET.get('status'), self.request.GET.get('status')),
+                'value': facets.STATUS_LABELS.get(self.request.GET.get('status'), self.request.GET.get('status')),
                 'url_param': 'status'
             })
             
         if self.request.GET.get('price'):
-            price_ranges = {
-                '0-50000': 'Moins de 50 000 FCFA',
-                '50000-100000': '50 000 - 100 000 FCFA',
-                '100000-200000': '100 000 - 200 000 FCFA',
-                '200000-500000': '200 000 - 500 000 FCFA',
-                '500000-': 'Plus de 500 000 FCFA'
-            }
             active_filters.append({
                 'name': 'prix',
-                'value': price_ranges.get(self.request.GET.get('price'), self.request.GET.get('price')),
+                'value': facets.PRICE_LABELS.get(self.request.GET.get('price'), self.request.GET.get('price')),
                 'url_param': 'price'
             })
         
@@ -201,46 +215,115 @@ class ProductListView(ListView):
         """
         Surcharge de la méthode get pour gérer les requêtes AJAX
         """
-        # Appel à la méthode parente pour obtenir le contexte
-        self.object_list = self.get_queryset()
-        context = self.get_context_data()
-        
-        # Si c'est une requête AJAX, on ne renvoie que le HTML des produits
+        # Si c'est une requête AJAX, on ne renvoie que le HTML des produits,
+        # mis en cache par combinaison de filtres et par version du catalogue
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return render(request, 'products/partials/product_list.html', {
-                'products': context['page_obj'],
-                'is_paginated': context['is_paginated'],
-                'page_obj': context['page_obj'],
-                'paginator': context['paginator'],
-                'categories': context.get('categories', []),  # Ajout des catégories au contexte
-                'category': context.get('category'),  # Ajout de la catégorie actuelle si elle existe
-                'current_query': context.get('current_query', ''),
-                'current_status': context.get('current_status', ''),
-                'current_price': context.get('current_price', ''),
-                'current_sort': context.get('current_sort', '')
-            })
+            return fragments.cached_fragment(
+                request, 'product_list', self.fragment_params(), self.render_partial,
+                vary=('X-Requested-With',)
+            )
             
         # Sinon, on renvoie le template complet
+        self.object_list = self.get_queryset()
+        context = self.get_context_data()
         return self.render_to_response(context)
 
+    def fragment_params(self):
+        """Paramètres normalisés identifiant le fragment de la liste"""
+        sort = self.request.GET.get('sort', '')
+        return {
+            'filters': facets.normalize_filters(
+                status=self.request.GET.get('status', ''),
+                price=self.request.GET.get('price', ''),
+            ),
+            # Terme tel qu'utilisé par le queryset (icontains sans index) et affiché
+            # par le fragment : sa forme normalisée regrouperait des recherches différentes
+            'q': self.search_query,
+            'category': self.kwargs.get('category_slug'),
+            'subcategory': self.kwargs.get('subcategory_slug'),
+            'sort': sort if sort in CURSOR_ORDERINGS else '',
+            'cursor': self.request.GET.get('cursor', ''),
+        }
+
+    def render_partial(self):
+        """Rend le fragment HTML de la liste des produits"""
+        self.object_list = self.get_queryset()
+        context = self.get_context_data()
+        response = render(self.request, 'products/partials/product_list.html', {
+            'products': context['page_obj'],
+            'is_paginated': context['is_paginated'],
+            'page_obj': context['page_obj'],
+            'paginator': context['paginator'],
+            'categories': context.get('categories', []),  # Ajout des catégories au contexte
+            'category': context.get('category'),  # Ajout de la catégorie actuelle si elle existe
+            'current_query': context.get('current_query', ''),
+            'current_status': context.get('current_status', ''),
+            'current_price': context.get('current_price', ''),
+            'current_sort': context.get('current_sort', ''),
+            'pagination_query': context['pagination_query'],
+            'approximate_total': context['approximate_total'],
+            'search_truncated': context['search_truncated'],
+            'search_limit': context['search_limit'],
+            'cards_url': context['cards_url'],
+        })
+        # Jetons de pagination exposés au client HTMX/AJAX
+        response['X-Next-Cursor'] = context['page_obj'].next_cursor or ''
+        response['X-Previous-Cursor'] = context['page_obj'].previous_cursor or ''
+        response['X-Search-Truncated'] = '1' if self.search_truncated else ''
+        return response
+
+class ProductCardsView(ProductListView):
+    """
+    Renvoie uniquement les N cartes suivantes et un jeton de continuation,
+    pour le défilement infini (HTMX) de la boutique.
+    """
+    template_name = 'products/partials/product_cards.html'
+    max_paginate_by = 48
+
+    def get_paginate_by(self, queryset):
+        try:
+            limit = int(self.request.GET.get('limit', self.paginate_by))
+        except ValueError:
+            limit = self.paginate_by
+        return max(1, min(limit, self.max_paginate_by))
+
+    def get(self, request, *args, **kwargs):
+        params = self.fragment_params()
+        params['limit'] = self.get_paginate_by(None)
+        return fragments.cached_fragment(request, 'product_cards', params, self.render_cards)
+
+    def render_cards(self):
+        """Rend les cartes de la page et le déclencheur de la suivante"""
+        self.object_list = self.get_queryset()
+        paginator, page, products, is_paginated = self.paginate_queryset(
+            self.object_list, self.get_paginate_by(self.object_list)
+        )
+        next_url = None
+        if page.next_cursor:
+            query = self.request.GET.copy()
+            query['cursor'] = page.next_cursor
+            next_url = f"{self.request.path}?{query.urlencode()}"
+        response = render(self.request, self.template_name, {
+            'products': products,
+            'next_cursor': page.next_cursor,
+            'next_url': next_url,
+            'search_truncated': self.search_truncated,
+            'search_limit': search.MAX_RESULTS,
+        })
+        response['X-Next-Cursor'] = page.next_cursor or ''
+        response['X-Search-Truncated'] = '1' if self.search_truncated else ''
+        return response
+
 def products_by_category(request, slug):
     """Affiche les produits d'une catégorie spécifique"""
     try:
         category = get_object_or_404(Category, slug=slug)
-        products = Product.objects.filter(category=category, is_active=True)
+        products = Product.objects.filter(category=category, is_active=True).for_cards()
         
-        # Pagination
-        paginator = Paginator(products, 12)  # 12 produits par page
-        page = request.GET.get('page')
-        
-        try:
-            products = paginator.page(page)
-        except PageNotAnInteger:
-            # Si le paramètre page n'est pas un entier, afficher la première page
-            products = paginator.page(1)
-        except EmptyPage:
-            # Si la page est hors de portée, afficher la dernière page de résultats
-            products = paginator.page(paginator.num_pages)
+        # Pagination par curseur (12 produits par page)
+        ordering = get_ordering(request.GET.get('sort'))
+        paginator = CursorPaginator(products, 12, ordering, with_total=True)
+        products = paginator.page(request.GET.get('cursor'))
         
         context = {
             'category': category,
@@ -248,7 +331,10 @@ def products_by_category(request, slug):
             'title': f"{category.name} - BoutiLuxe",
             'description': category.description[:160] if category.description else f"Découvrez notre sélection de {category.name} - BoutiLuxe",
             'is_paginated': products.has_other_pages(),
-            'page_obj': products  # Pour la pagination
+            'page_obj': products,  # Pour la pagination
+            'pagination_query': pagination_query(request.GET),
+            'approximate_total': products.total,
+            'facets': facets.get_facets(category_id=category.pk),
         }
         
         # Utiliser le même template que la liste des produits
@@ -61,6 +61,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'app.middleware.MediaMiddleware',  # Fichiers envoyés (voir app/media.py)
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -70,6 +71,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django_htmx.middleware.HtmxMiddleware',
     'app.middleware.RecentOrdersMiddleware',  # Notre middleware personnalisé
+    'app.middleware.CartCookieMiddleware',  # Panier des visiteurs anonymes (voir app/cart.py)
 ]
 
 ROOT_URLCONF = 'montre.urls'
@@ -106,6 +108,41 @@ DATABASES = {
 }
 
 
+# Cache partagé entre les workers (facettes, fragments, comptages...). Au-delà de
+# MAX_ENTRIES fichiers, 1/CULL_FREQUENCY des entrées est supprimé au hasard.
+#
+# Les compteurs de version du catalogue et des produits (app/catalog.py) ont
+# leur propre cache, jamais purgé par le premier : avec REDIS_URL (paquet redis
+# requis), Redis et son incr() atomique entre workers ; sinon un second
+# FileBasedCache, dont l'incr() n'est pas atomique.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+            'CULL_FREQUENCY': 10,
+        },
+    },
+    'counters': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'counters'),
+        'OPTIONS': {
+            # Une entrée par produit : à ajuster si le catalogue dépasse ce nombre
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+if os.getenv('REDIS_URL'):
+    CACHES['counters'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    }
+
+# Instantanés NumPy du catalogue, partagés par les workers via mmap (voir app/snapshot.py)
+CATALOG_SNAPSHOT_DIR = os.path.join(BASE_DIR, 'cache', 'snapshots')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -145,11 +182,42 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Fichiers statiques renommés avec leur empreinte (ex. quick-view.3f2a1c.js) et
+# précompressés : WhiteNoise les sert avec un cache immuable (voir app/storage.py).
+# (STATICFILES_STORAGE n'est plus lu depuis Django 5.1.)
+STORAGES = {
+    # Médias nommés d'après l'empreinte de leur contenu : dédoublonnés et immuables
+    'default': {
+        'BACKEND': 'app.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'app.storage.StaticFilesStorage',
+    },
+}
 
 # Media files (Uploaded images)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Service des médias par Django (app/media.py) : plages (vidéos), ETag et cache.
+# MEDIA_ACCEL_REDIRECT délègue l'envoi à nginx (location interne, ex. '/protected-media/').
+SERVE_MEDIA = os.getenv('SERVE_MEDIA', 'True') == 'True'
+MEDIA_ACCEL_REDIRECT = os.getenv('MEDIA_ACCEL_REDIRECT') or None
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24
+
+# Déclinaisons WebP/JPEG des images produits (app/images.py) : processus du pool
+# de traitement ; IMAGE_DERIVATIVES_ASYNC = False les génère dans la requête.
+IMAGE_DERIVATIVE_WORKERS = int(os.getenv('IMAGE_DERIVATIVE_WORKERS', '2'))
+IMAGE_DERIVATIVES_ASYNC = True
+
+# Panier des visiteurs anonymes : cookie signé (app/cart.py), enregistré en base
+# seulement à la connexion ou au passage en caisse. Nombre de produits borné
+# pour rester sous la limite de taille d'un cookie.
+CART_COOKIE_NAME = 'cart'
+CART_COOKIE_AGE = 60 * 60 * 24 * 30
+CART_COOKIE_MAX_LINES = 50
+# Durée de cache du résumé du panier (nombre d'articles, sous-total) par utilisateur
+CART_SUMMARY_CACHE_TIMEOUT = 60 * 15
 # Security settings
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
@@ -43,7 +43,9 @@ urlpatterns = [
     
     # URLs de l'application
     path('', include('app.urls')),  # Pour les endpoints API
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+
+# Les médias (MEDIA_URL) sont servis par app.middleware.MediaMiddleware
 
 # Serve static files in development
 if settings.DEBUG:
@@ -0,0 +1,163 @@
+/*
+ * Favoris : bascule d'un produit dans les favoris (boutons .favorite-button
+ * des cartes de la boutique), notifications et lecture du jeton CSRF.
+ */
+// Fonction pour ajouter/supprimer un produit des favoris
+function toggleFavorite(productId, button) {
+    console.log('toggleFavorite appelé avec productId:', productId);
+    // Vérifier si l'utilisateur est connecté
+    const isAuthenticated = document.body.getAttribute('data-is-authenticated') === 'true';
+    console.log('Utilisateur authentifié:', isAuthenticated);
+    
+    // Si l'utilisateur n'est pas connecté, afficher la modale de connexion
+    if (!isAuthenticated) {
+        console.log('Utilisateur non connecté, affichage de la modale');
+        if (typeof window.showLoginModal === 'function') {
+            window.showLoginModal();
+        } else {
+            console.error('showLoginModal is not defined');
+            // Rediriger vers la page de connexion en cas d'échec
+            window.location.href = '/login?next=' + encodeURIComponent(window.location.pathname);
+        }
+        return false;
+    }
+    
+    const url = `/products/${productId}/toggle-favorite/`;
+    console.log('URL de la requête:', url);
+    const csrftoken = getCookie('csrftoken');
+    console.log('Token CSRF:', csrftoken ? 'présent' : 'absent');
+    const heartIcon = document.getElementById(`favorite-${productId}`);
+    console.log('Élément heartIcon trouvé:', heartIcon !== null);
+    const likeCount = document.getElementById(`like-count-${productId}`);
+    console.log('Élément likeCount trouvé:', likeCount !== null);
+    
+    // Désactiver le bouton pendant la requête
+    const originalHTML = button.innerHTML;
+    button.disabled = true;
+    button.innerHTML = '<span class="loading loading-spinner loading-xs"></span>';
+    
+    console.log('Envoi de la requête AJAX...');
+    fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': csrftoken,
+            'X-Requested-With': 'XMLHttpRequest'
+        },
+        credentials: 'same-origin'
+    })
+    .then(response => {
+        console.log('Réponse reçue, statut:', response.status);
+        if (!response.ok) {
+            return response.json().then(err => { 
+                // Si la réponse est du JSON mais avec un statut d'erreur
+                if (err && err.message) {
+                    throw new Error(err.message);
+                } else {
+                    throw new Error('Une erreur est survenue lors de la mise à jour des favoris');
+                }
+            });
+        }
+        return response.json();
+    })
+    .then(data => {
+        console.log('Données reçues du serveur:', data);
+        if (data.status === 'success') {
+            // Mettre à jour l'icône de cœur
+            const isFavorite = data.is_favorite;
+            console.log('Nouvel état du favori:', isFavorite);
+            
+            // Mise à jour du style de l'icône
+            console.log('Mise à jour du style de l\'icône, isFavorite:', isFavorite);
+            
+            if (isFavorite) {
+                heartIcon.classList.remove('text-gray-300', 'fill-none');
+                heartIcon.classList.add('text-red-500', 'fill-current');
+                console.log('Classes après ajout:', heartIcon.className);
+            } else {
+                heartIcon.classList.remove('text-red-500', 'fill-current');
+                heartIcon.classList.add('text-gray-300', 'fill-none');
+                console.log('Classes après suppression:', heartIcon.className);
+            }
+            
+            console.log('Classes après mise à jour:', heartIcon.className);
+            console.log('Fill après mise à jour:', heartIcon.getAttribute('fill'));
+            
+            // Mettre à jour le compteur avec la valeur du serveur
+            if (data.likes_count !== undefined) {
+                likeCount.textContent = data.likes_count;
+                console.log('Compteur de likes mis à jour:', data.likes_count);
+            }
+        } else if (data.status === 'error' && data.message) {
+            // Afficher le message d'erreur du serveur
+            showToast(data.message, 'error');
+        }
+    })
+    .catch(error => {
+        console.error('Erreur lors de la mise à jour des favoris:', error);
+        // Afficher un message d'erreur à l'utilisateur
+        showToast(error.message || 'Une erreur est survenue lors de la mise à jour des favoris', 'error');
+    })
+    .finally(() => {
+        // Réactiver le bouton
+        button.disabled = false;
+        button.innerHTML = originalHTML;
+        console.log('Bouton réactivé');
+    });
+    
+    console.log('Fin de la fonction toggleFavorite');
+}
+
+// Fonction utilitaire pour afficher des notifications
+function showToast(message, type = 'info') {
+    // Vérifier si une notification existe déjà
+    let toast = document.getElementById('toast-notification');
+    if (!toast) {
+        // Créer la notification si elle n'existe pas
+        toast = document.createElement('div');
+        toast.id = 'toast-notification';
+        toast.className = 'fixed bottom-4 right-4 z-50 max-w-xs';
+        document.body.appendChild(toast);
+    }
+    
+    // Créer le contenu de la notification
+    const toastContent = document.createElement('div');
+    toastContent.className = `p-4 rounded-lg shadow-lg ${type === 'error' ? 'bg-red-100 text-red-700' : 'bg-blue-100 text-blue-700'}`;
+    toastContent.textContent = message;
+    
+    // Ajouter la notification
+    toast.innerHTML = '';
+    toast.appendChild(toastContent);
+    
+    // Supprimer la notification après 5 secondes
+    setTimeout(() => {
+        toast.remove();
+    }, 5000);
+}
+
+// Fonction utilitaire pour récupérer le token CSRF
+function getCookie(name) {
+    let cookieValue = null;
+    if (document.cookie && document.cookie !== '') {
+        const cookies = document.cookie.split(';');
+        for (let i = 0; i < cookies.length; i++) {
+            const cookie = cookies[i].trim();
+            if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                break;
+            }
+        }
+    }
+    return cookieValue;
+}
+
+// Initialisation des gestionnaires d'événements pour les boutons de favoris
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.favorite-button').forEach(button => {
+        button.addEventListener('click', function() {
+            const productId = this.getAttribute('data-product-id');
+            console.log('Bouton cliqué, productId:', productId);
+            toggleFavorite(productId, this);
+        });
+    });
+});
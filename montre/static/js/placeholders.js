@@ -0,0 +1,24 @@
+/*
+ * Aperçus flous des images (balise {% picture %}) : l'arrière-plan d'attente
+ * (couleur dominante + vignette floue) est retiré dès que l'image est chargée,
+ * pour ne pas apparaître autour des images transparentes ou en object-contain.
+ */
+function clearPlaceholder(img) {
+    img.style.backgroundImage = '';
+    img.style.backgroundColor = '';
+    img.removeAttribute('data-placeholder');
+}
+
+// L'événement load ne remonte pas : écoute en phase de capture (y compris pour les fragments HTMX)
+document.addEventListener('load', function(event) {
+    if (event.target.tagName === 'IMG' && event.target.hasAttribute('data-placeholder')) {
+        clearPlaceholder(event.target);
+    }
+}, true);
+
+// Images déjà chargées avant l'exécution de ce script (cache du navigateur)
+document.querySelectorAll('img[data-placeholder]').forEach(function(img) {
+    if (img.complete && img.naturalWidth) {
+        clearPlaceholder(img);
+    }
+});
@@ -0,0 +1,444 @@
+/*
+ * Fiche produit : galerie, quantité, modale d'ajout au panier et formulaire d'avis.
+ */
+// Fonctions pour le modal d'ajout au panier
+function showAddToCartModal() {
+    const modal = document.getElementById('add-to-cart-modal');
+    if (modal) {
+        modal.classList.remove('hidden');
+        document.body.style.overflow = 'hidden';
+    }
+}
+
+function closeAddToCartModal() {
+    const modal = document.getElementById('add-to-cart-modal');
+    if (modal) {
+        modal.classList.add('hidden');
+        document.body.style.overflow = 'auto';
+    }
+}
+
+// Fermer le modal en cliquant en dehors
+document.addEventListener('click', function(event) {
+    const modal = document.getElementById('add-to-cart-modal');
+    if (event.target === modal) {
+        closeAddToCartModal();
+    }
+});
+
+// Gestionnaire d'événement pour le bouton "Ajouter au panier"
+document.addEventListener('DOMContentLoaded', function() {
+    const addToCartButtons = document.querySelectorAll('.add-to-cart');
+    
+    addToCartButtons.forEach(button => {
+        button.addEventListener('click', function(e) {
+            e.preventDefault();
+            const productId = this.dataset.productId;
+            
+            // Ici, vous pouvez ajouter la logique pour ajouter le produit au panier
+            // via une requête AJAX, puis appeler showAddToCartModal() en cas de succès
+            
+            // Pour l'instant, on affiche simplement le modal
+            showAddToCartModal();
+            
+            // Exemple de code pour l'ajout au panier (à décommenter et adapter) :
+            /*
+            fetch('/panier/ajouter/', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value,
+                    'X-Requested-With': 'XMLHttpRequest'
+                },
+                body: JSON.stringify({
+                    product_id: productId,
+                    quantity: 1
+                })
+            })
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    showAddToCartModal();
+                    // Mettre à jour le compteur du panier si nécessaire
+                    const cartCount = document.getElementById('cart-count');
+                    if (cartCount) {
+                        cartCount.textContent = data.cart_item_count || '0';
+                    }
+                } else {
+                    showMessage(data.message || 'Une erreur est survenue', true);
+                }
+            })
+            .catch(error => {
+                console.error('Erreur:', error);
+                showMessage('Une erreur est survenue lors de l\'ajout au panier', true);
+            });
+            */
+        });
+    });
+});
+
+// Fonction pour afficher un message de succès ou d'erreur
+function showMessage(message, isError = false) {
+    const messageDiv = document.getElementById('form-message');
+    if (!messageDiv) return;
+    
+    messageDiv.textContent = message;
+    messageDiv.className = `p-4 mb-4 rounded ${isError ? 'bg-red-100 text-red-700' : 'bg-green-100 text-green-700'}`;
+    messageDiv.style.display = 'block';
+    
+    // Masquer le message après 5 secondes
+    setTimeout(() => {
+        messageDiv.style.display = 'none';
+    }, 5000);
+}
+
+// Fonction pour réinitialiser le formulaire
+function resetReviewForm() {
+    const form = document.querySelector('#review-form form');
+    if (form) {
+        form.reset();
+        setRating(5); // Réinitialiser la notation à 5 étoiles
+        
+        // Réinitialiser manuellement les champs si nécessaire
+        const titleInput = form.querySelector('#title');
+        const commentInput = form.querySelector('#comment');
+        
+        if (titleInput) titleInput.value = '';
+        if (commentInput) commentInput.value = '';
+    }
+}
+
+// Gestionnaire de soumission du formulaire d'avis
+document.addEventListener('DOMContentLoaded', function() {
+    const reviewForm = document.querySelector('#review-form form');
+    
+    if (reviewForm) {
+        reviewForm.addEventListener('submit', function(e) {
+            e.preventDefault(); // Empêcher la soumission normale du formulaire
+            
+            // Récupérer la note sélectionnée
+            const ratingInput = document.querySelector('input[name="rating"]');
+            if (!ratingInput || !ratingInput.value) {
+                showMessage('Veuillez sélectionner une note', true);
+                return;
+            }
+            
+            const formData = new FormData(this);
+            const url = this.action;
+            const csrftoken = document.querySelector('[name=csrfmiddlewaretoken]').value;
+            
+            // Désactiver le bouton de soumission
+            const submitButton = this.querySelector('button[type="submit"]');
+            const originalButtonText = submitButton.textContent;
+            submitButton.disabled = true;
+            submitButton.textContent = 'Envoi en cours...';
+            
+            fetch(url, {
+                method: 'POST',
+                body: formData,
+                headers: {
+                    'X-CSRFToken': csrftoken,
+                    'X-Requested-With': 'XMLHttpRequest'
+                }
+            })
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    // Afficher le message de succès
+                    showMessage(data.message, false);
+                    
+                    // Réinitialiser le formulaire
+                    resetReviewForm();
+                    
+                    // Ajouter le nouvel avis à la liste
+                    const reviewsList = document.querySelector('#reviews-list');
+                    if (reviewsList) {
+                        // Créer un nouvel élément d'avis
+                        const reviewElement = document.createElement('div');
+                        reviewElement.className = 'border-b border-gray-200 pb-6 last:border-0 last:pb-0';
+                        
+                        // Construire le HTML de l'avis
+                        reviewElement.innerHTML = `
+                            <div class="bg-slate-800/50 rounded-2xl p-6 border border-slate-700/50 hover:shadow-lg hover:border-amber-500/30 transition-all duration-300">
+                                <div class="flex items-start space-x-4">
+                                    <div class="flex-shrink-0">
+                                        <div class="w-12 h-12 rounded-full bg-gradient-to-br from-amber-500 to-amber-700 flex items-center justify-center text-white font-bold text-xl">
+                                            ${data.review.first_name ? data.review.first_name.charAt(0).toUpperCase() : 'V'}
+                                        </div>
+                                    </div>
+                                    <div class="flex-1 min-w-0">
+                                        <div class="flex items-center justify-between">
+                                            <div>
+                                                <h4 class="text-lg font-bold text-white">
+                                                    ${data.review.first_name || ''} ${data.review.last_name ? data.review.last_name.toUpperCase() : '' || 'Visiteur'}
+                                                </h4>
+                                                <div class="flex items-center text-sm text-slate-400 mt-1">
+                                                    <span class="flex items-center" title="${data.review.created_at}" data-timestamp="${data.review.timestamp}">
+                                                        <svg xmlns="http://www.w3.org/2000/svg" class="h-4 w-4 mr-1 flex-shrink-0" fill="none" viewBox="0 0 24 24" stroke="currentColor">
+                                                            <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M12 8v4l3 3m6-3a9 9 0 11-18 0 9 9 0 0118 0z" />
+                                                        </svg>
+                                                        <span class="time-ago">À l'instant</span>
+                                                    </span>
+                                                </div>
+                                            </div>
+                                            <div class="bg-amber-500/10 px-3 py-1 rounded-full flex items-center">
+                                                <span class="text-amber-400 font-bold mr-1">${data.review.rating}</span>
+                                                <span class="text-amber-400">/</span>
+                                                <span class="text-slate-400 ml-1">5</span>
+                                            </div>
+                                        </div>
+                                        
+                                        ${data.review.title ? `<h5 class="text-lg font-semibold text-white mt-3">${data.review.title}</h5>` : ''}
+                                        
+                                        <div class="flex items-center mt-2 mb-4">
+                                            <div class="flex">
+                                                ${Array(5).fill().map((_, i) => 
+                                                    `<svg class="w-5 h-5 ${i < data.review.rating ? 'text-amber-400' : 'text-slate-600'}" 
+                                                         fill="currentColor" 
+                                                         viewBox="0 0 20 20">
+                                                        <path d="M9.049 2.927c.3-.921 1.603-.921 1.902 0l1.07 3.292a1 1 0 00.95.69h3.462c.969 0 1.371 1.24.588 1.81l-2.8 2.034a1 1 0 00-.364 1.118l1.07 3.292c.3.921-.755 1.688-1.54 1.118l-2.8-2.034a1 1 0 00-1.175 0l-2.8 2.034c-.784.57-1.838-.197-1.539-1.118l1.07-3.292a1 1 0 00-.364-1.118L2.98 8.72c-.783-.57-.38-1.81.588-1.81h3.461a1 1 0 00.951-.69l1.07-3.292z"/>
+                                                    </svg>`
+                                                ).join('')}
+                                            </div>
+                                            <span class="text-sm text-slate-400 ml-2">${data.review.rating_display}</span>
+                                        </div>
+                                        
+                                        <div class="bg-slate-800/70 rounded-lg p-4 border border-slate-700/50">
+                                            <p class="text-slate-300 leading-relaxed">${data.review.comment.replace(/\n/g, '<br>')}</p>
+                                        </div>
+                                    </div>
+                                </div>
+                            </div>
+                        `;
+                        
+                        // Ajouter le nouvel avis en haut de la liste
+                        reviewsList.prepend(reviewElement);
+                        
+                        // Mettre à jour les horodatages
+                        updateTimestamps();
+                    }
+                } else {
+                    // Afficher les erreurs de validation
+                    let errorMessage = 'Veuillez corriger les erreurs ci-dessous.';
+                    if (data.errors) {
+                        errorMessage = Object.values(data.errors).join('\n');
+                    }
+                    showMessage(errorMessage, true);
+                }
+            })
+            .catch(error => {
+                console.error('Erreur:', error);
+                showMessage('Une erreur est survenue lors de l\'envoi de votre avis. Veuillez réessayer.', true);
+            })
+            .finally(() => {
+                // Réactiver le bouton de soumission
+                submitButton.disabled = false;
+                submitButton.textContent = originalButtonText;
+                
+                // Faire défiler jusqu'au formulaire pour afficher les messages d'erreur
+                reviewForm.scrollIntoView({ behavior: 'smooth' });
+            });
+        });
+    }
+});
+
+// Fonction pour changer l'image principale
+function changeMainImage(src) {
+    document.getElementById('main-product-image').src = src;
+}
+
+// Gestion de la quantité
+function incrementQuantity() {
+    const quantityInput = document.getElementById('quantity');
+    const max = parseInt(quantityInput.max);
+    if (parseInt(quantityInput.value) < max) {
+        quantityInput.value = parseInt(quantityInput.value) + 1;
+    }
+}
+
+function decrementQuantity() {
+    const quantityInput = document.getElementById('quantity');
+    if (parseInt(quantityInput.value) > 1) {
+        quantityInput.value = parseInt(quantityInput.value) - 1;
+    }
+}
+
+// Gestion de la notation
+function setRating(rating) {
+    const stars = document.querySelectorAll('#rating-stars button');
+    stars.forEach((star, index) => {
+        if (index < rating) {
+            star.classList.remove('text-gray-300');
+            star.classList.add('text-yellow-400');
+        } else {
+            star.classList.remove('text-yellow-400');
+            star.classList.add('text-gray-300');
+        }
+    });
+    document.getElementById('rating').value = rating;
+}
+
+// Fonction pour ouvrir le modal
+function openReviewModal() {
+    const modal = document.getElementById('review-drawer');
+    const modalContent = modal ? modal.querySelector('.bg-white') : null;
+    const overlay = document.getElementById('review-overlay');
+    
+    if (!modal || !modalContent || !overlay) {
+        console.error('Éléments du modal non trouvés', {modal, modalContent, overlay});
+        return;
+    }
+    
+    console.log('Ouverture du modal...');
+    
+    // Afficher le modal
+    modal.classList.remove('hidden');
+    
+    // Forcer le recalcul du style pour activer la transition
+    void modal.offsetHeight;
+    
+    // Désactiver le défilement de la page
+    document.body.style.overflow = 'hidden';
+    
+    // Animation d'ouverture
+    setTimeout(() => {
+        overlay.classList.remove('opacity-0');
+        overlay.classList.add('opacity-100');
+        modalContent.classList.remove('opacity-0', 'translate-y-4', 'sm:scale-95');
+        modalContent.classList.add('opacity-100', 'translate-y-0', 'sm:scale-100');
+    }, 10);
+}
+
+// Fonction pour fermer le modal
+function closeReviewModal() {
+    const modal = document.getElementById('review-drawer');
+    const modalContent = modal ? modal.querySelector('.bg-white') : null;
+    const overlay = document.getElementById('review-overlay');
+    
+    if (!modal || !modalContent || !overlay) {
+        console.error('Éléments du modal non trouvés');
+        return;
+    }
+    
+    console.log('Fermeture du modal...');
+    
+    // Animation de fermeture
+    overlay.classList.remove('opacity-100');
+    overlay.classList.add('opacity-0');
+    modalContent.classList.remove('opacity-100', 'translate-y-0', 'sm:scale-100');
+    modalContent.classList.add('opacity-0', 'translate-y-4', 'sm:scale-95');
+    
+    // Cacher le modal après l'animation
+    setTimeout(() => {
+        modal.classList.add('hidden');
+        document.body.style.overflow = 'auto';
+    }, 200);
+}
+
+// Initialisation au chargement de la page
+document.addEventListener('DOMContentLoaded', function() {
+    console.log('DOM chargé, initialisation...');
+    
+    // Initialiser la notation à 5 étoiles par défaut
+    setRating(5);
+    
+    // Gestionnaire d'événement pour le bouton d'ouverture
+    const openButton = document.getElementById('open-review-modal');
+    if (openButton) {
+        console.log('Bouton d\'ouverture trouvé');
+        openButton.addEventListener('click', function(e) {
+            e.preventDefault();
+            openReviewModal();
+        });
+    } else {
+        console.error('Bouton d\'ouverture non trouvé');
+    }
+    
+    // Gestionnaire d'événement pour le bouton de fermeture
+    const closeButton = document.querySelector('[data-drawer-hide="review-drawer"]');
+    if (closeButton) {
+        closeButton.addEventListener('click', function(e) {
+            e.preventDefault();
+            closeReviewModal();
+        });
+    }
+    
+    // Fermer en cliquant sur l'overlay
+    const overlay = document.getElementById('review-overlay');
+    if (overlay) {
+        overlay.addEventListener('click', function(e) {
+            if (e.target === overlay) {
+                closeReviewModal();
+            }
+        });
+    }
+    
+    // Fermer avec la touche Échap
+    document.addEventListener('keydown', function(e) {
+        if (e.key === 'Escape') {
+            const modal = document.getElementById('review-drawer');
+            if (modal && !modal.classList.contains('hidden')) {
+                closeReviewModal();
+            }
+        }
+    });
+    
+    console.log('Initialisation terminée');
+    
+    // Gestion de l'affichage des avis supplémentaires
+    const toggleButton = document.getElementById('toggle-reviews');
+    const moreReviews = document.getElementById('more-reviews');
+    const toggleIcon = document.getElementById('toggle-icon');
+    const toggleText = document.getElementById('toggle-text');
+    
+    if (toggleButton && moreReviews && toggleIcon && toggleText) {
+        let isExpanded = false;
+        const totalReviews = parseInt(document.getElementById('reviews-list').dataset.reviewCount) || 0;
+        
+        toggleButton.addEventListener('click', function() {
+            if (isExpanded) {
+                // Réduire
+                moreReviews.classList.add('hidden');
+                toggleIcon.classList.remove('rotate-180');
+                toggleText.textContent = `Afficher les ${totalReviews - 3} autres avis`;
+            } else {
+                // Développer
+                moreReviews.classList.remove('hidden');
+                toggleIcon.classList.add('rotate-180');
+                toggleText.textContent = 'Réduire les avis';
+            }
+            isExpanded = !isExpanded;
+        });
+        
+        // Mettre à jour le texte du bouton si des avis sont ajoutés dynamiquement
+        const updateToggleButtonText = () => {
+            const currentReviews = document.querySelectorAll('.review-item').length;
+            if (currentReviews > 3) {
+                toggleButton.style.display = 'flex';
+                toggleText.textContent = `Afficher les ${currentReviews - 3} autres avis`;
+            }
+        };
+        
+        // Mettre à jour le bouton après l'ajout d'un nouvel avis
+        window.addEventListener('reviewAdded', updateToggleButtonText);
+        
+        // Initialiser le texte du bouton
+        updateToggleButtonText();
+    }
+});
+
+// Fonction pour mettre à jour le compteur d'avis
+function updateReviewsCount(change) {
+    const countElement = document.getElementById('reviews-count');
+    if (countElement) {
+        const currentCount = parseInt(countElement.textContent) || 0;
+        const newCount = currentCount + change;
+        countElement.textContent = newCount;
+        
+        // Mettre à jour le texte "Aucun avis" si nécessaire
+        const noReviewsText = document.querySelector('#reviews-list .no-reviews');
+        if (noReviewsText && newCount > 0) {
+            noReviewsText.remove();
+        }
+    }
+}
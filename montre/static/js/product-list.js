@@ -0,0 +1,215 @@
+/*
+ * Boutique : recherche en temps réel, pagination AJAX, filtres dépliables
+ * et modale de connexion. Nécessite favorites.js.
+ */
+// Script pour la recherche en temps réel, la pagination AJAX et les filtres dépliables
+document.addEventListener('DOMContentLoaded', function() {
+    // Éléments de recherche
+    const searchInput = document.getElementById('search-input');
+    const searchForm = document.getElementById('search-form');
+    const productsGrid = document.querySelector('.grid.grid-cols-1');
+    const productsContainer = document.querySelector('.mt-6.lg\:col-span-3');
+    let searchTimeout;
+    
+    // Vérifier si les éléments nécessaires existent
+    if (!productsGrid) {
+        console.error('La grille des produits n\'a pas été trouvée');
+        return;
+    }
+
+    // Fonction pour effectuer la recherche
+    function performSearch(url) {
+        // Afficher un indicateur de chargement
+        if (productsGrid) {
+            const originalContent = productsGrid.innerHTML;
+            productsGrid.innerHTML = `
+                <div class="col-span-full flex justify-center py-12">
+                    <div class="animate-spin rounded-full h-12 w-12 border-b-2 border-gray-900"></div>
+                </div>`;
+            
+            // Effectuer la requête AJAX
+            const fetchUrl = new URL(url, window.location.origin);
+            
+            // S'assurer que le paramètre X-Requested-With est bien envoyé
+            fetch(fetchUrl, {
+                headers: {
+                    'X-Requested-With': 'XMLHttpRequest',
+                    'Accept': 'text/html'
+                },
+                credentials: 'same-origin' // Important pour les cookies de session
+            })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Erreur réseau');
+                }
+                return response.text();
+            })
+            .then(html => {
+                // Mettre à jour l'URL sans recharger la page
+                window.history.pushState({}, '', fetchUrl);
+                
+                // Mettre à jour uniquement la grille des produits
+                if (productsGrid) {
+                    // Créer un élément temporaire pour parser le HTML
+                    const tempDiv = document.createElement('div');
+                    tempDiv.innerHTML = html;
+                    
+                    // Extraire le contenu de la grille de produits
+                    const newGrid = tempDiv.querySelector('.grid.grid-cols-1');
+                    if (newGrid) {
+                        productsGrid.innerHTML = newGrid.innerHTML;
+                    } else {
+                        // Si la réponse ne contient pas de grille, utiliser tout le contenu
+                        productsGrid.innerHTML = html;
+                    }
+                    // Activer le défilement infini des nouvelles cartes
+                    if (window.htmx) {
+                        htmx.process(productsGrid);
+                    }
+                }
+                
+                // Ajouter les écouteurs d'événements aux nouveaux liens de pagination
+                setupPaginationLinks();
+            })
+            .catch(error => {
+                console.error('Erreur lors de la recherche:', error);
+                if (productsGrid) {
+                    productsGrid.innerHTML = originalContent;
+                }
+            });
+        }
+    }
+
+    // Fonction pour configurer les écouteurs d'événements de pagination
+    function setupPaginationLinks() {
+        const paginationLinks = document.querySelectorAll('.pagination-link');
+        paginationLinks.forEach(link => {
+            link.addEventListener('click', function(e) {
+                e.preventDefault();
+                const url = this.getAttribute('href');
+                if (url) {
+                    performSearch(url);
+                    // Faire défiler vers le haut de la liste des produits
+                    if (productsContainer) {
+                        productsContainer.scrollIntoView({ behavior: 'smooth' });
+                    }
+                }
+            });
+        });
+    }
+
+    // Configuration initiale des écouteurs de pagination
+    document.addEventListener('DOMContentLoaded', function() {
+        setupPaginationLinks();
+
+        // Gestion de la recherche en temps réel
+    if (searchInput) {
+        searchInput.addEventListener('input', function(e) {
+            clearTimeout(searchTimeout);
+            const query = e.target.value.trim();
+            
+            searchTimeout = setTimeout(() => {
+                const url = new URL(window.location.href);
+                
+                // Mettre à jour le paramètre de recherche
+                if (query) {
+                    url.searchParams.set('q', query);
+                } else {
+                    url.searchParams.delete('q');
+                }
+                
+                // Réinitialiser la pagination
+                url.searchParams.delete('cursor');
+                
+                // Effectuer la recherche
+                performSearch(url.toString());
+            }, 300);
+        });
+    }
+
+    // Empêcher la soumission du formulaire
+    if (searchForm) {
+        searchForm.addEventListener('submit', function(e) {
+            e.preventDefault();
+            const query = searchInput ? searchInput.value.trim() : '';
+            const url = new URL(window.location.href);
+            if (query) {
+                url.searchParams.set('q', query);
+            } else {
+                url.searchParams.delete('q');
+            }
+            // Réinitialiser la pagination à la première page lors d'une nouvelle recherche
+            url.searchParams.delete('cursor');
+            performSearch(url.toString());
+        });
+    }
+
+    // Gérer les boutons de navigation arrière/avant
+    window.addEventListener('popstate', function() {
+        performSearch(window.location.href);
+    });
+
+    // Gestion des boutons de filtre
+    const filterButtons = document.querySelectorAll('[aria-controls^="filter-section-"]');
+    
+    filterButtons.forEach(button => {
+        const targetId = button.getAttribute('aria-controls');
+        const target = document.getElementById(targetId);
+        
+        // Cacher tous les panneaux de filtre par défaut
+        if (target) {
+            target.style.display = 'none';
+        }
+        
+        button.addEventListener('click', function() {
+            if (target) {
+                if (target.style.display === 'none' || !target.style.display) {
+                    target.style.display = 'block';
+                    button.setAttribute('aria-expanded', 'true');
+                    const svg = button.querySelector('svg');
+                    if (svg) {
+                        svg.classList.add('rotate-45');
+                    }
+                } else {
+                    target.style.display = 'none';
+                    button.setAttribute('aria-expanded', 'false');
+                    const svg = button.querySelector('svg');
+                    if (svg) {
+                        svg.classList.remove('rotate-45');
+                    }
+                }
+            }
+        });
+    });
+    
+        // Configuration initiale
+    setupPaginationLinks();
+    });
+});
+
+// Déclarer les fonctions globales au niveau de la fenêtre
+window.showLoginModal = function() {
+    const modal = document.getElementById('loginModal');
+    if (modal) {
+        modal.classList.remove('hidden');
+        document.body.style.overflow = 'hidden'; // Empêcher le défilement
+    } else {
+        console.error('Élément loginModal non trouvé');
+    }
+};
+
+window.closeModal = function() {
+    const modal = document.getElementById('loginModal');
+    if (modal) {
+        modal.classList.add('hidden');
+        document.body.style.overflow = ''; // Rétablir le défilement
+    }
+};
+
+// Gestion du clic en dehors de la modale
+document.addEventListener('click', function(event) {
+    const modal = document.getElementById('loginModal');
+    if (event.target === modal) {
+        closeModal();
+    }
+});
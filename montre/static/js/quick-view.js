@@ -0,0 +1,467 @@
+/*
+ * Fiche rapide d'un produit (components/voir_produit.html), chargée par HTMX
+ * dans #configuration-modal : état du visiteur, galerie, partage.
+ * Les données de la fiche sont lues sur #config-modal-container (data-*).
+ */
+
+// Donnée de la fiche ouverte (attribut data-* de #config-modal-container)
+function quickViewData(name) {
+    const modal = document.getElementById('config-modal-container');
+    return modal ? modal.dataset[name] || '' : '';
+}
+
+// Adresse absolue de la fiche produit, pour le partage
+function quickViewShareUrl() {
+    return new URL(quickViewData('shareUrl') || window.location.href, window.location.origin).href;
+}
+
+// La fiche est mise en cache et identique pour tous les visiteurs : les données
+// propres au visiteur (connexion, favori, jeton CSRF) sont chargées à part
+function loadQuickViewState(modal) {
+    if (!modal.dataset.stateUrl) return;
+    fetch(modal.dataset.stateUrl, {
+        headers: { 'X-Requested-With': 'XMLHttpRequest' },
+        credentials: 'same-origin'
+    })
+        .then(response => response.json())
+        .then(state => {
+            modal.setAttribute('hx-headers', JSON.stringify({ 'X-CSRFToken': state.csrf_token }));
+            modal.dataset.favorite = state.is_favorite;
+            if (state.is_authenticated) {
+                modal.querySelectorAll('[data-auth-only]').forEach(el => el.classList.remove('hidden'));
+            }
+            modal.dispatchEvent(new CustomEvent('quickview:state', { detail: state, bubbles: true }));
+        })
+        .catch(console.error);
+}
+
+// Fonction pour partager via l'API Web Share si disponible
+function initShareButton() {
+    const shareButton = document.getElementById('native-share-button');
+    if (shareButton && navigator.share) {
+        shareButton.style.display = 'flex';
+        shareButton.addEventListener('click', async () => {
+            try {
+                await navigator.share({
+                    title: quickViewData('productName'),
+                    text: 'Découvrez ce produit exceptionnel : ' + quickViewData('productName'),
+                    url: quickViewShareUrl(),
+                });
+            } catch (err) {
+                console.log('Erreur de partage:', err);
+            }
+        });
+    }
+}
+
+// Fonction pour fermer la modale
+function closeQuickView() {
+    const modal = document.getElementById('config-modal-container');
+    if (modal) {
+        modal.style.opacity = '0';
+        document.body.style.overflow = 'auto';
+        
+        // Supprimer la modal après l'animation
+        setTimeout(() => {
+            modal.remove();
+        }, 300);
+    }
+}
+
+// Gestionnaire pour la touche Échap
+document.addEventListener('keydown', function(e) {
+    if (e.key === 'Escape' && document.getElementById('config-modal-container')) {
+        closeQuickView();
+    }
+});
+
+// Fonction pour masquer l'indicateur de chargement
+function hideLoading() {
+    const loadingOverlay = document.getElementById('loading-overlay');
+    if (loadingOverlay) {
+        loadingOverlay.classList.add('hidden');
+        loadingOverlay.classList.remove('flex');
+    }
+}
+
+// État de la galerie de la fiche ouverte (voir initializeGallery)
+let galleryState = null;
+
+// Initialisation de la galerie à partir des miniatures de la fiche
+function initializeGallery(modal) {
+    if (galleryState && galleryState.autoPlayInterval) {
+        clearInterval(galleryState.autoPlayInterval);
+    }
+    const thumbnails = modal.querySelectorAll('.thumbnail-button');
+    galleryState = {
+        currentIndex: 0,
+        totalImages: thumbnails.length,
+        productImages: Array.from(thumbnails, thumb => thumb.dataset.imageUrl),
+        isAutoPlaying: false,
+        autoPlayInterval: null,
+        zoomLevel: 1,
+        isFullscreen: false,
+        isLoading: false
+    };
+    setupGalleryEventListeners();
+    preloadAllImages();
+    updateGalleryProgress();
+}
+
+// Défilement des miniatures
+function scrollThumbnails(direction) {
+    const container = document.getElementById('thumbnails-container');
+    if (container) {
+        container.scrollBy({ left: direction === 'left' ? -200 : 200, behavior: 'smooth' });
+    }
+}
+
+// Configuration des événements de la galerie
+function setupGalleryEventListeners() {
+    // Navigation des images
+    document.getElementById('prev-image')?.addEventListener('click', showPreviousImage);
+    document.getElementById('next-image')?.addEventListener('click', showNextImage);
+    
+    // Zoom et plein écran
+    document.getElementById('zoom-in')?.addEventListener('click', zoomIn);
+    document.getElementById('zoom-out')?.addEventListener('click', zoomOut);
+    document.getElementById('fullscreen')?.addEventListener('click', toggleFullscreen);
+    
+    // Lecture automatique
+    document.getElementById('auto-play')?.addEventListener('click', toggleAutoPlay);
+    
+    // Navigation des miniatures
+    document.getElementById('scroll-thumbnails-left')?.addEventListener('click', () => scrollThumbnails('left'));
+    document.getElementById('scroll-thumbnails-right')?.addEventListener('click', () => scrollThumbnails('right'));
+    
+    // Gestes tactiles pour mobile
+    setupTouchGestures();
+}
+
+// Fonction pour changer d'image principale avec effets avancés
+function changeMainImage(imageUrl, index) {
+    if (!galleryState || galleryState.isLoading || galleryState.currentIndex === index) return;
+    
+    galleryState.isLoading = true;
+    galleryState.currentIndex = index;
+    
+    const watchImage = document.getElementById('watch-image');
+    const loadingOverlay = document.getElementById('loading-overlay');
+    const imageWrapper = document.getElementById('image-wrapper');
+    
+    if (!watchImage) return;
+    
+    // Afficher l'overlay de chargement
+    if (loadingOverlay) {
+        loadingOverlay.classList.remove('hidden');
+        loadingOverlay.classList.add('flex');
+        document.getElementById('loading-progress').textContent = 'Chargement...';
+    }
+    
+    // Transition de fondu améliorée
+    watchImage.style.opacity = '0';
+    watchImage.style.transition = 'opacity 0.3s ease';
+    
+    // Déclinaisons responsives de l'image choisie (voir la balise {% picture %})
+    const thumbnail = document.querySelector(`.thumbnail-button[data-image-index="${index}"]`);
+    const srcset = thumbnail?.dataset.imageSrcset || '';
+    const webpSource = watchImage.parentElement.tagName === 'PICTURE'
+        ? watchImage.parentElement.querySelector('source[type="image/webp"]')
+        : null;
+    
+    // Préchargement intelligent
+    const img = new Image();
+    img.sizes = watchImage.sizes;
+    img.srcset = srcset;
+    
+    img.onload = function() {
+        // Mettre à jour le compteur
+        updateImageCounter();
+        
+        // Appliquer la nouvelle image avec animation
+        requestAnimationFrame(() => {
+            if (webpSource) webpSource.srcset = thumbnail?.dataset.imageWebpSrcset || srcset;
+            watchImage.srcset = srcset;
+            watchImage.src = imageUrl;
+            watchImage.style.opacity = '1';
+            
+            // Effet de transition
+            if (imageWrapper) {
+                imageWrapper.style.transform = 'scale(1.1) rotate(1deg)';
+                setTimeout(() => {
+                    imageWrapper.style.transform = 'scale(1) rotate(0deg)';
+                }, 300);
+            }
+            
+            // Masquer l'overlay de chargement
+            setTimeout(() => {
+                if (loadingOverlay) {
+                    loadingOverlay.classList.add('hidden');
+                    loadingOverlay.classList.remove('flex');
+                }
+                galleryState.isLoading = false;
+            }, 500);
+            
+            // Mettre à jour la sélection des miniatures
+            updateThumbnailSelection();
+            updateGalleryProgress();
+        });
+    };
+    
+    img.onerror = function() {
+        watchImage.style.opacity = '1';
+        if (loadingOverlay) {
+            loadingOverlay.classList.add('hidden');
+            loadingOverlay.classList.remove('flex');
+        }
+        galleryState.isLoading = false;
+        console.error('Erreur de chargement de l\'image:', imageUrl);
+    };
+    
+    img.src = imageUrl;
+}
+
+// Navigation des images
+function showNextImage() {
+    if (!galleryState || !galleryState.totalImages) return;
+    const nextIndex = (galleryState.currentIndex + 1) % galleryState.totalImages;
+    const nextImageUrl = galleryState.productImages[nextIndex];
+    changeMainImage(nextImageUrl, nextIndex);
+}
+
+function showPreviousImage() {
+    if (!galleryState || !galleryState.totalImages) return;
+    const prevIndex = (galleryState.currentIndex - 1 + galleryState.totalImages) % galleryState.totalImages;
+    const prevImageUrl = galleryState.productImages[prevIndex];
+    changeMainImage(prevImageUrl, prevIndex);
+}
+
+// Fonctions de zoom
+function zoomIn() {
+    if (galleryState.zoomLevel < 3) {
+        galleryState.zoomLevel += 0.25;
+        applyZoom();
+    }
+}
+
+function zoomOut() {
+    if (galleryState.zoomLevel > 1) {
+        galleryState.zoomLevel -= 0.25;
+        applyZoom();
+    }
+}
+
+function applyZoom() {
+    const imageWrapper = document.getElementById('image-wrapper');
+    if (imageWrapper) {
+        imageWrapper.style.transform = `scale(${galleryState.zoomLevel})`;
+    }
+}
+
+// Mode plein écran
+function toggleFullscreen() {
+    const imageContainer = document.getElementById('image-container');
+    if (!galleryState.isFullscreen) {
+        imageContainer.classList.add('fullscreen-mode');
+        document.body.style.overflow = 'hidden';
+    } else {
+        imageContainer.classList.remove('fullscreen-mode');
+        document.body.style.overflow = 'auto';
+    }
+    galleryState.isFullscreen = !galleryState.isFullscreen;
+}
+
+// Lecture automatique
+function toggleAutoPlay() {
+    const autoPlayButton = document.getElementById('auto-play');
+    
+    if (!galleryState.isAutoPlaying) {
+        galleryState.autoPlayInterval = setInterval(showNextImage, 3000);
+        autoPlayButton.classList.add('text-amber-400');
+        galleryState.isAutoPlaying = true;
+    } else {
+        clearInterval(galleryState.autoPlayInterval);
+        autoPlayButton.classList.remove('text-amber-400');
+        galleryState.isAutoPlaying = false;
+    }
+}
+
+// Mise à jour de la sélection des miniatures
+function updateThumbnailSelection() {
+    const thumbnails = document.querySelectorAll('.thumbnail-button');
+    thumbnails.forEach((thumb, index) => {
+        if (index === galleryState.currentIndex) {
+            thumb.classList.add('border-amber-500', 'scale-110', 'shadow-amber-500/30', 'ring-2', 'ring-amber-400', 'ring-opacity-50');
+            thumb.classList.remove('border-transparent', 'hover:border-amber-400/50');
+        } else {
+            thumb.classList.remove('border-amber-500', 'scale-110', 'shadow-amber-500/30', 'ring-2', 'ring-amber-400', 'ring-opacity-50');
+            thumb.classList.add('border-transparent', 'hover:border-amber-400/50');
+        }
+    });
+}
+
+// Mise à jour de la barre de progression
+function updateGalleryProgress() {
+    const progress = document.getElementById('gallery-progress');
+    if (progress) {
+        const progressPercent = ((galleryState.currentIndex + 1) / galleryState.totalImages) * 100;
+        progress.style.width = `${progressPercent}%`;
+    }
+}
+
+// Mise à jour du compteur d'images
+function updateImageCounter() {
+    const counter = document.getElementById('image-counter');
+    if (counter) {
+        counter.textContent = `${galleryState.currentIndex + 1} / ${galleryState.totalImages}`;
+    }
+}
+
+// Navigation au clavier (hors champs de saisie)
+function handleKeyboardNavigation(e) {
+    if (!galleryState || !document.getElementById('config-modal-container')) return;
+    if (e.target.closest('input, textarea, select')) return;
+    if (e.key === 'ArrowLeft') showPreviousImage();
+    if (e.key === 'ArrowRight') showNextImage();
+    if (e.key === 'Escape' && galleryState.isFullscreen) toggleFullscreen();
+    if (e.key === ' ') toggleAutoPlay();
+}
+
+// Gestes tactiles pour mobile
+function setupTouchGestures() {
+    const imageContainer = document.getElementById('image-container');
+    if (!imageContainer) return;
+    let startX = 0;
+    
+    imageContainer.addEventListener('touchstart', (e) => {
+        startX = e.touches[0].clientX;
+    });
+    
+    imageContainer.addEventListener('touchend', (e) => {
+        const endX = e.changedTouches[0].clientX;
+        const diff = startX - endX;
+        
+        if (Math.abs(diff) > 50) { // Seuil de glissement
+            if (diff > 0) {
+                showNextImage();
+            } else {
+                showPreviousImage();
+            }
+        }
+    });
+}
+
+// Préchargement de toutes les images
+function preloadAllImages() {
+    galleryState.productImages.forEach((url, index) => {
+        if (index !== galleryState.currentIndex) {
+            const img = new Image();
+            img.src = url;
+        }
+    });
+}
+
+// Raccourcis clavier de la galerie (un seul écouteur pour toutes les fiches)
+document.addEventListener('keydown', handleKeyboardNavigation);
+
+// Initialisation de la fiche insérée par HTMX dans #configuration-modal
+function initQuickView(modal) {
+    loadQuickViewState(modal);
+    initializeGallery(modal);
+    
+    // Configurer le partage si l'API est disponible
+    initShareButton();
+    
+    // Masquer l'overlay de chargement une fois l'image principale chargée
+    const watchImage = document.getElementById('watch-image');
+    if (watchImage && !watchImage.complete) {
+        watchImage.addEventListener('load', hideLoading, { once: true });
+        setTimeout(hideLoading, 3000);
+    } else {
+        hideLoading();
+    }
+}
+
+document.addEventListener('htmx:afterSettle', function(event) {
+    const modal = event.detail.elt.querySelector
+        ? event.detail.elt.querySelector('#config-modal-container')
+        : null;
+    if (modal) {
+        initQuickView(modal);
+    }
+});
+
+
+// Menu de partage (composant Alpine)
+function shareMenu() {
+    return {
+        isOpen: false,
+        isCopied: false,
+        shareUrl: quickViewShareUrl(),
+        productName: quickViewData('productName'),
+        init() {
+            // Vérifier si Alpine est chargé
+            if (typeof Alpine === 'undefined') {
+                console.error('Alpine.js n\'est pas chargé');
+                return;
+            }
+            
+            this.$watch('isOpen', (value) => {
+                if (value && this.$refs.shareMenu) {
+                    this.$nextTick(() => {
+                        this.$refs.shareMenu.style.display = 'block';
+                    });
+                }
+            });
+        },
+        copyLink() {
+            try {
+                if (!this.shareUrl) return;
+                
+                navigator.clipboard.writeText(this.shareUrl)
+                    .then(() => {
+                        this.isCopied = true;
+                        setTimeout(() => {
+                            this.isCopied = false;
+                        }, 2000);
+                    })
+                    .catch(err => {
+                        console.error('Erreur lors de la copie:', err);
+                    });
+            } catch (error) {
+                console.error('Erreur dans copyLink:', error);
+            }
+        },
+        shareOnSocial(platform) {
+            try {
+                if (!this.shareUrl) return;
+                
+                const url = new URL(this.shareUrl);
+                const text = `Découvrez ${this.productName} sur Montres de Luxe`;
+                let shareUrl = '';
+                
+                switch(platform) {
+                    case 'facebook':
+                        shareUrl = `https://www.facebook.com/sharer/sharer.php?u=${encodeURIComponent(url)}`;
+                        break;
+                    case 'twitter':
+                        shareUrl = `https://twitter.com/intent/tweet?url=${encodeURIComponent(url)}&text=${encodeURIComponent(text)}`;
+                        break;
+                    case 'whatsapp':
+                        shareUrl = `https://wa.me/?text=${encodeURIComponent(`${text} ${url}`)}`;
+                        break;
+                    case 'email':
+                        shareUrl = `mailto:?subject=${encodeURIComponent(text)}&body=${encodeURIComponent(url)}`;
+                        break;
+                    default:
+                        return;
+                }
+                
+                window.open(shareUrl, '_blank');
+                this.isOpen = false;
+            } catch (error) {
+                console.error('Erreur dans shareOnSocial:', error);
+            }
+        }
+    };
+}